@@ -1,11 +1,15 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.cache import LRUCache, MISSING
+from app.database import get_db, settings
 from app.models.user import User
 from app.schemas.user import TokenData
 
@@ -14,19 +18,109 @@ SECRET_KEY = "your-secret-key-here-change-in-production-min-32-chars"  # Изм
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 дней
 
-# Контекст для хеширования паролей
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Контекст для хеширования паролей. Хеши с другим числом раундов
+# считаются устаревшими и пересчитываются при входе
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 # OAuth2 схема
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Кэш пользователей по id: снимок полей, без привязки к сессии
+user_cache = LRUCache(maxsize=settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_TTL)
+
+def _user_snapshot(user: User) -> User:
+    return User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+
+# Сброс кэша после изменения пользователя (роль, активность, удаление)
+def invalidate_user(user_id: int) -> None:
+    user_cache.delete(user_id)
+
+# Функции, которые выполняются в процессах пула
+def _hash_in_worker(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_in_worker(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+class PasswordHasher:
+    """
+    bcrypt в отдельном пуле процессов.
+
+    Хеш занимает сотни миллисекунд CPU: в пуле процессов он не держит GIL
+    воркера приложения. Одновременно принимается не больше
+    workers + queue_size задач, остальные сразу получают 503, чтобы
+    всплеск входов не занял все потоки пула.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(max(1, workers + queue_size))
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: fork процесса с потоками может унести в дочерний захваченные блокировки
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent password operations, retry later",
+                headers={"Retry-After": "1"},
+            )
+        with self._lock:
+            self.in_flight += 1
+        try:
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_size,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE)
+
 # Хеширование пароля
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_hasher.run(_hash_in_worker, password)
 
 # Проверка пароля
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return verify_and_update_password(plain_password, hashed_password)[0]
+
+# Проверка пароля и новый хеш, если параметры bcrypt изменились
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return password_hasher.run(_verify_in_worker, plain_password, hashed_password)
 
 # Создание JWT токена
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -54,13 +148,23 @@ async def get_current_user(
         user_id: int = payload.get("user_id")
         if user_id is None:
             raise credentials_exception
-        token_data = TokenData(user_id=user_id)
+        token_data = TokenData(user_id=user_id, username=payload.get("username"))
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == token_data.user_id).first()
-    if user is None:
-        raise credentials_exception
+    # Stateless: роль уже подписана в токене (см. login), БД не нужна
+    if settings.AUTH_STATELESS:
+        if payload.get("role") is None:
+            raise credentials_exception
+        return User(id=token_data.user_id, username=token_data.username, role=payload["role"], is_active=True)
+    
+    user = user_cache.get(token_data.user_id)
+    if user is MISSING:
+        db_user = db.query(User).filter(User.id == token_data.user_id).first()
+        if db_user is None:
+            raise credentials_exception
+        user = _user_snapshot(db_user)
+        user_cache.set(token_data.user_id, user)
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return user
@@ -81,6 +185,10 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
     user = db.query(User).filter(User.username == username).first()
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = verify_and_update_password(password, user.hashed_password)
+    if not verified:
         return None
+    # Хеш со старой стоимостью: заменяем, сохранит commit в login
+    if new_hash:
+        user.hashed_password = new_hash
     return user
@@ -0,0 +1,272 @@
+"""
+Импорт клиентов и контактов из CSV/XLSX.
+
+Файл читается построчно (csv.reader / openpyxl в режиме read_only), строки
+проверяются схемами ClientCreate/ContactCreate и вставляются пачками по
+IMPORT_CHUNK_SIZE: одна транзакция и один многострочный INSERT на пачку
+(до INSERT_BATCH_SIZE строк). Импорт идет в фоновом потоке, состояние
+задания хранится в памяти процесса.
+
+Формат: первая строка - заголовки. Поля клиента называются как в
+ClientCreate (name, contact_person, phone, ...), поля контакта - с
+префиксом contact_ (contact_name, contact_phone, ...). Строка без name,
+но с contact_name - дополнительный контакт предыдущего клиента.
+"""
+import csv
+import io
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+
+from app import schemas
+from app.cache import LRUCache
+from app.database import SessionLocal, settings
+from app.models import Client, Contact
+from app.summary import bump, deltas_for_rows
+from app.search import index_documents
+from app.response_cache import invalidate
+
+logger = logging.getLogger(__name__)
+
+CONTACT_PREFIX = "contact_"
+CLIENT_FIELDS = tuple(schemas.ClientCreate.model_fields)
+CONTACT_FIELDS = tuple(schemas.ContactCreate.model_fields)
+
+# Поддерживаемые форматы по расширению файла
+FORMATS = ("csv", "xlsx")
+
+# Строк в одном INSERT клиентов: 14 параметров на строку, у SQLite предел 32766
+INSERT_BATCH_SIZE = 1000
+
+
+class ImportJob:
+    """Состояние задания импорта (читается обработчиком опроса)"""
+
+    def __init__(self, filename: str, file_format: str):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.format = file_format
+        self.status = "queued"  # queued, running, done, failed
+        self.progress: Optional[float] = None
+        self.rows_processed = 0
+        self.clients_created = 0
+        self.contacts_created = 0
+        self.error_count = 0
+        # Не больше IMPORT_MAX_ERRORS строк отчета, остальные только считаются
+        self.errors: List[dict] = []
+        self.detail: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+
+    def add_error(self, row: int, errors: List[dict]) -> None:
+        self.error_count += 1
+        if len(self.errors) < settings.IMPORT_MAX_ERRORS:
+            self.errors.append({"row": row, "errors": errors})
+
+
+jobs = LRUCache(maxsize=settings.IMPORT_JOBS_KEPT, ttl=settings.IMPORT_JOB_TTL)
+executor = ThreadPoolExecutor(max_workers=settings.IMPORT_WORKERS, thread_name_prefix="client-import")
+
+
+def detect_format(filename: str) -> Optional[str]:
+    extension = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    return extension if extension in FORMATS else None
+
+
+def _cell(value) -> Optional[str]:
+    # Телефоны и ИНН в XLSX приходят числами: 79001234567.0 -> "79001234567"
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def _header(values) -> List[str]:
+    return [(_cell(value) or "").lower() for value in values]
+
+
+def read_csv(path: str) -> Tuple[Iterator[Tuple[int, dict]], Callable[[], Optional[float]]]:
+    """Строки CSV (номер строки файла, значения) и функция прогресса по байтам"""
+    size = os.path.getsize(path) or 1
+    raw = open(path, "rb")
+    text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    sample = text.read(64 * 1024)
+    text.seek(0)
+    try:
+        # Excel с русской локалью сохраняет CSV через ";"
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+
+    def rows():
+        try:
+            reader = csv.reader(text, dialect)
+            header = _header(next(reader, []))
+            for values in reader:
+                if any(values):
+                    yield reader.line_num, dict(zip(header, values))
+        finally:
+            text.close()
+
+    return rows(), lambda: 1.0 if raw.closed else raw.tell() / size
+
+
+def read_xlsx(path: str) -> Tuple[Iterator[Tuple[int, dict]], Callable[[], Optional[float]]]:
+    """Строки первого листа XLSX без загрузки книги в память"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError("XLSX import requires openpyxl")
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    sheet = workbook.worksheets[0]
+    # max_row берется из <dimension> листа, его может не быть
+    total = sheet.max_row
+    position = {"row": 0}
+
+    def rows():
+        try:
+            values = sheet.iter_rows(values_only=True)
+            header = _header(next(values, ()))
+            for number, row in enumerate(values, start=2):
+                position["row"] = number
+                if any(cell is not None for cell in row):
+                    yield number, dict(zip(header, row))
+        finally:
+            workbook.close()
+
+    return rows(), lambda: position["row"] / total if total else None
+
+
+READERS = {"csv": read_csv, "xlsx": read_xlsx}
+
+
+def _errors(error: ValidationError, prefix: str = "") -> List[dict]:
+    return [
+        {"field": prefix + ".".join(str(part) for part in item["loc"]), "msg": item["msg"]}
+        for item in error.errors()
+    ]
+
+
+def parse_row(row: dict) -> Tuple[Optional[dict], Optional[dict], List[dict]]:
+    """Строка файла -> (клиент, контакт, ошибки); клиент None - строка-контакт"""
+    client_data = {field: _cell(row.get(field)) for field in CLIENT_FIELDS}
+    contact_data = {field: _cell(row.get(CONTACT_PREFIX + field)) for field in CONTACT_FIELDS}
+    client, contact, errors = None, None, []
+    if any(client_data.values()):
+        # Пустой статус - значение по умолчанию из схемы
+        client_values = {key: value for key, value in client_data.items() if value is not None}
+        try:
+            client = schemas.ClientCreate(**client_values).dict()
+        except ValidationError as error:
+            errors += _errors(error)
+    if any(contact_data.values()):
+        try:
+            contact = schemas.ContactCreate(
+                **{key: value for key, value in contact_data.items() if value is not None}
+            ).dict()
+        except ValidationError as error:
+            errors += _errors(error, CONTACT_PREFIX)
+    if not errors and client is None and contact is None:
+        errors.append({"field": "name", "msg": "Field required"})
+    return client, contact, errors
+
+
+def insert_chunk(db, chunk: List[Tuple[dict, List[dict]]]) -> Tuple[int, int]:
+    """Пачка клиентов с контактами в одной транзакции: INSERT клиентов, затем контактов"""
+    now = datetime.utcnow()
+    client_rows = [
+        {**client, "created_at": now, "updated_at": now, "last_contact": now}
+        for client, _ in chunk
+    ]
+    # INSERT ... VALUES (...), (...) RETURNING по INSERT_BATCH_SIZE строк
+    # (executemany с sort_by_parameter_order в SQLite идет построчно); id
+    # выдаются в порядке строк VALUES
+    ids = []
+    for start in range(0, len(client_rows), INSERT_BATCH_SIZE):
+        batch = client_rows[start:start + INSERT_BATCH_SIZE]
+        ids += sorted(db.scalars(insert(Client).values(batch).returning(Client.id)))
+    contact_rows = [
+        {**contact, "client_id": client_id, "created_at": now}
+        for client_id, (_, contacts) in zip(ids, chunk)
+        for contact in contacts
+    ]
+    if contact_rows:
+        db.execute(insert(Contact), contact_rows)
+    bump(db.connection(), deltas_for_rows("clients", (row["status"] for row in client_rows)))
+    index_documents(db.connection(), Client, [{**row, "id": client_id} for row, client_id in zip(client_rows, ids)], replace=False)
+    db.commit()
+    invalidate(Client)
+    return len(ids), len(contact_rows)
+
+
+def run_import(job: ImportJob, path: str, chunk_size: int) -> None:
+    job.status = "running"
+    db = SessionLocal()
+    try:
+        rows, progress = READERS[job.format](path)
+        chunk: List[Tuple[dict, List[dict]]] = []
+        # Последний принятый клиент (для строк-контактов); None - строка клиента отклонена
+        current: Optional[Tuple[dict, List[dict]]] = None
+
+        def flush():
+            clients, contacts = insert_chunk(db, chunk)
+            job.clients_created += clients
+            job.contacts_created += contacts
+            job.progress = progress()
+            chunk.clear()
+
+        for number, row in rows:
+            job.rows_processed += 1
+            client, contact, errors = parse_row(row)
+            if client is None and not errors and current is None:
+                errors = [{"field": "name", "msg": "Contact row without a valid client row above"}]
+            if errors:
+                job.add_error(number, errors)
+                # Контакты под отклоненным клиентом тоже отклоняются
+                if any(_cell(row.get(field)) for field in CLIENT_FIELDS):
+                    current = None
+                continue
+            if client is None:
+                current[1].append(contact)
+                continue
+            if len(chunk) >= chunk_size:
+                flush()
+            current = (client, [contact] if contact else [])
+            chunk.append(current)
+        if chunk:
+            flush()
+        job.progress = 1.0
+        job.status = "done"
+    except Exception as error:
+        db.rollback()
+        logger.exception("Client import %s failed", job.id)
+        job.status = "failed"
+        job.detail = str(error)
+    finally:
+        db.close()
+        job.finished_at = datetime.utcnow()
+        os.unlink(path)
+
+
+def start_import(path: str, filename: str, file_format: str, chunk_size: int) -> ImportJob:
+    """Регистрация задания и запуск в пуле импорта; файл path удаляется по завершении"""
+    job = ImportJob(filename, file_format)
+    jobs.set(job.id, job)
+    executor.submit(run_import, job, path, chunk_size)
+    return job
+
+
+def get_job(job_id: str) -> Optional[ImportJob]:
+    return jobs.get(job_id, None)
+
+
+def shutdown() -> None:
+    executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,90 @@
+"""
+Условные GET: ETag / If-None-Match и Last-Modified / If-Modified-Since.
+
+Версия записи - id и updated_at, версия списка - число строк и
+max(updated_at) по тем же фильтрам плюс параметры страницы. Совпадение
+проверяется одним коротким запросом, и ответ 304 уходит без загрузки
+объектов и построения схем.
+
+Для списков отдается только ETag: удаление строки не сдвигает
+max(updated_at), поэтому Last-Modified списка ненадежен (удаление ловит
+число строк в ETag).
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import NamedTuple, Optional
+
+from fastapi import Request, Response
+
+# Браузер хранит ответ, но перед использованием всегда переспрашивает сервер
+CACHE_CONTROL = "private, no-cache"
+
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: Optional[datetime] = None
+
+
+def _version(updated_at: Optional[datetime]) -> str:
+    return f"{updated_at:%Y%m%d%H%M%S%f}" if updated_at else "0"
+
+
+def record_validators(model, record_id: int, updated_at: Optional[datetime]) -> Validators:
+    return Validators(f'W/"{model.__tablename__}-{record_id}-{_version(updated_at)}"', updated_at)
+
+
+def list_validators(model, count: int, updated_at: Optional[datetime], params: str) -> Validators:
+    """params - строка запроса: фильтры и страница входят в версию"""
+    key = f"{model.__tablename__}|{count}|{_version(updated_at)}|{params}"
+    return Validators(f'W/"{hashlib.md5(key.encode()).hexdigest()}"')
+
+
+def _headers(validators: Validators) -> dict:
+    headers = {"ETag": validators.etag, "Cache-Control": CACHE_CONTROL}
+    if validators.last_modified:
+        # updated_at хранится в UTC без часового пояса
+        headers["Last-Modified"] = format_datetime(
+            validators.last_modified.replace(tzinfo=timezone.utc), usegmt=True
+        )
+    return headers
+
+
+def set_validators(response: Response, validators: Validators) -> None:
+    response.headers.update(_headers(validators))
+
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Слабое сравнение (RFC 9110, 13.1.2): префикс W/ не учитывается
+    if header.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # В HTTP-дате нет долей секунды
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+
+def not_modified(request: Request, validators: Validators) -> Optional[Response]:
+    """Ответ 304, если у клиента актуальная версия, иначе None"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-Modified-Since при наличии If-None-Match не проверяется
+        fresh = _etag_matches(if_none_match, validators.etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        fresh = bool(if_modified_since and validators.last_modified
+                     and _not_modified_since(if_modified_since, validators.last_modified))
+    return Response(status_code=304, headers=_headers(validators)) if fresh else None
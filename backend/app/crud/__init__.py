@@ -2,3 +2,9 @@ from .client import *
 from .project import *
 from .task import *
 from .proposal import *
+from .dashboard import *
+from .search import *
+from .calendar import *
+from .reports import *
+from .version import *
+from . import aio
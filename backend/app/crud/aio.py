@@ -0,0 +1,68 @@
+"""
+Асинхронный CRUD поверх синхронных функций app.crud.
+
+Каждая функция выполняется через db.run_sync: с AsyncSession запросы
+идут через asyncpg/aiosqlite без блокировки event loop, с
+SyncSessionRunner - в пуле потоков (см. app.database.get_async_db).
+"""
+import functools
+from app.crud import client, project, task, proposal, dashboard, search, version, calendar, reports
+
+def _async(fn):
+    @functools.wraps(fn)
+    async def wrapper(db, *args, **kwargs):
+        return await db.run_sync(fn, *args, **kwargs)
+    return wrapper
+
+# Версии для условных GET (ETag)
+get_record_validators = _async(version.get_record_validators)
+get_list_validators = _async(version.get_list_validators)
+
+# Клиенты
+get_client = _async(client.get_client)
+get_clients = _async(client.get_clients)
+create_client = _async(client.create_client)
+update_client = _async(client.update_client)
+delete_client = _async(client.delete_client)
+create_contact = _async(client.create_contact)
+
+# Проекты
+get_project = _async(project.get_project)
+get_projects = _async(project.get_projects)
+create_project = _async(project.create_project)
+update_project = _async(project.update_project)
+delete_project = _async(project.delete_project)
+
+# Задачи
+get_task = _async(task.get_task)
+get_tasks = _async(task.get_tasks)
+create_task = _async(task.create_task)
+update_task = _async(task.update_task)
+delete_task = _async(task.delete_task)
+complete_task = _async(task.complete_task)
+create_tasks = _async(task.create_tasks)
+update_tasks = _async(task.update_tasks)
+complete_tasks = _async(task.complete_tasks)
+
+# Коммерческие предложения
+get_proposal = _async(proposal.get_proposal)
+get_proposals = _async(proposal.get_proposals)
+create_proposal = _async(proposal.create_proposal)
+update_proposal = _async(proposal.update_proposal)
+delete_proposal = _async(proposal.delete_proposal)
+send_proposal = _async(proposal.send_proposal)
+create_proposal_item = _async(proposal.create_proposal_item)
+update_proposal_item = _async(proposal.update_proposal_item)
+delete_proposal_item = _async(proposal.delete_proposal_item)
+
+# Главная панель
+get_dashboard_summary = _async(dashboard.get_dashboard_summary)
+
+# Поиск
+search_documents = _async(search.search_documents)
+
+# Календарь
+get_calendar_events = _async(calendar.get_calendar_events)
+
+# Отчеты
+get_revenue = _async(reports.get_revenue)
@@ -0,0 +1,65 @@
+from sqlalchemy import Date, String, cast, func, literal, null, select, union_all
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date, datetime, time, timedelta
+from app.models import Invoice, InvoiceStatus, Proposal, Task
+
+# Самый длинный диапазон календаря (годовой вид)
+CALENDAR_MAX_DAYS = 366
+
+# Статусы счетов хранятся именами перечисления (в PostgreSQL - тип
+# invoicestatus, в UNION он приводится к строке)
+_INVOICE_STATUSES = {status.name: status.value for status in InvoiceStatus}
+
+def _event(kind: str, model, day, title, status, priority=None, assignee=None, project_id=None):
+    return select(
+        literal(kind).label("kind"),
+        model.id.label("id"),
+        title.label("title"),
+        day.label("date"),
+        status.label("status"),
+        (priority if priority is not None else null()).label("priority"),
+        (assignee if assignee is not None else null()).label("assignee"),
+        model.client_id.label("client_id"),
+        (project_id if project_id is not None else null()).label("project_id"),
+    )
+
+def calendar_query(date_from: date, date_to: date, assignee: Optional[str] = None):
+    """
+    Сроки задач, счетов и окончание КП в [date_from, date_to] одним UNION ALL
+
+    Каждая часть - диапазон по индексу своей колонки даты (ix_tasks_due_date
+    или ix_tasks_assignee_due_date, ix_invoices_due_date,
+    ix_proposals_valid_until), поэтому стоимость не зависит от объема истории.
+    Без ORDER BY: у счетов дата вычисляется (date(due_date)), и сортировка
+    объединения шла бы через временное B-дерево - сортирует вызывающий.
+    С assignee - только задачи исполнителя: у счетов и КП исполнителя нет.
+    """
+    tasks = _event(
+        "task", Task, Task.due_date, Task.title, Task.status,
+        priority=Task.priority, assignee=Task.assignee, project_id=Task.project_id,
+    ).where(Task.due_date.between(date_from, date_to))
+    if assignee:
+        return tasks.where(Task.assignee == assignee)
+    # due_date счета - DateTime: диапазон по самой колонке (по индексу), в ответе - дата
+    invoices = _event(
+        "invoice", Invoice, func.date(Invoice.due_date, type_=Date),
+        func.coalesce(Invoice.title, Invoice.invoice_number), cast(Invoice.status, String), project_id=Invoice.project_id,
+    ).where(
+        Invoice.due_date >= datetime.combine(date_from, time.min),
+        Invoice.due_date < datetime.combine(date_to + timedelta(days=1), time.min),
+    )
+    proposals = _event(
+        "proposal", Proposal, Proposal.valid_until, Proposal.title, Proposal.status,
+    ).where(Proposal.valid_until.between(date_from, date_to))
+    return union_all(tasks, invoices, proposals)
+
+def get_calendar_events(db: Session, date_from: date, date_to: date, assignee: Optional[str] = None) -> List[dict]:
+    events = []
+    for row in db.execute(calendar_query(date_from, date_to, assignee)).mappings():
+        event = dict(row)
+        if event["kind"] == "invoice":
+            event["status"] = _INVOICE_STATUSES.get(event["status"], event["status"])
+        events.append(event)
+    events.sort(key=lambda event: (event["date"], event["kind"], event["id"]))
+    return events
@@ -1,21 +1,38 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.orm import Query, Session, selectinload
+from typing import List, Optional, Sequence
 from datetime import datetime
 from app.models import Client, Contact
 from app import schemas
+from app.pagination import paginate
+from app.fields import load_options
+from app.response_cache import invalidate, invalidate_deleted, tag
+
+# Ключ сортировки списка (и курсора)
+CLIENT_ORDER = (Client.id,)
+
+# Контакты входят в схему Client, грузим их одним запросом на всю страницу
+CLIENT_LOAD = (selectinload(Client.contacts),)
+
+# Теги кэша списка: контакты входят в ответ и сбрасывают тег клиентов
+CLIENT_CACHE_TAGS = (tag(Client),)
 
 def get_client(db: Session, client_id: int) -> Optional[Client]:
-    return db.query(Client).filter(Client.id == client_id).first()
+    return db.query(Client).options(*CLIENT_LOAD).filter(Client.id == client_id).first()
 
-def get_clients(db: Session, skip: int = 0, limit: int = 100) -> List[Client]:
-    return db.query(Client).offset(skip).limit(limit).all()
+def clients_query(db: Session, fields: Optional[Sequence[str]] = None) -> Query:
+    """Список клиентов вместе с контактами (общий для списка и выгрузки); fields - загрузить только эти поля"""
+    return db.query(Client).options(*load_options(Client, fields, CLIENT_ORDER, CLIENT_LOAD))
+
+def get_clients(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, fields: Optional[Sequence[str]] = None) -> List[Client]:
+    return paginate(clients_query(db, fields), CLIENT_ORDER, skip, limit, cursor).all()
 
 def create_client(db: Session, client: schemas.ClientCreate) -> Client:
     db_client = Client(**client.dict())
     db.add(db_client)
     db.commit()
-    db.refresh(db_client)
-    return db_client
+    invalidate(Client)
+    # Перечитываем вместе с контактами: ответ сериализуется вне сессии
+    return get_client(db, db_client.id)
 
 def update_client(db: Session, client_id: int, client: schemas.ClientUpdate) -> Optional[Client]:
     db_client = get_client(db, client_id)
@@ -24,7 +41,8 @@ def update_client(db: Session, client_id: int, client: schemas.ClientUpdate) ->
             setattr(db_client, key, value)
         db_client.updated_at = datetime.utcnow()
         db.commit()
-        db.refresh(db_client)
+        invalidate(Client)
+        db_client = get_client(db, client_id)
     return db_client
 
 def delete_client(db: Session, client_id: int) -> bool:
@@ -32,12 +50,18 @@ def delete_client(db: Session, client_id: int) -> bool:
     if db_client:
         db.delete(db_client)
         db.commit()
+        invalidate_deleted(Client)
         return True
     return False
 
 def create_contact(db: Session, client_id: int, contact: schemas.ContactCreate) -> Contact:
     db_contact = Contact(**contact.dict(), client_id=client_id)
     db.add(db_contact)
+    # Контакты входят в ответ клиента: новая версия клиента для ETag
+    db.query(Client).filter(Client.id == client_id).update(
+        {Client.updated_at: datetime.utcnow()}, synchronize_session=False
+    )
     db.commit()
+    invalidate(Client)
     db.refresh(db_contact)
     return db_contact
@@ -0,0 +1,48 @@
+from sqlalchemy.orm import Session
+from datetime import date, timedelta
+from app.models import Task
+from app import schemas
+from app.summary import TRACKED, read_counters
+
+# Статусы счетов, которые еще ждут оплаты
+OUTSTANDING_INVOICE_STATUSES = ("sent", "overdue")
+CLOSED_TASK_STATUSES = ("completed", "cancelled")
+
+def _section(counters: dict, prefix: str, with_amounts: bool) -> dict:
+    section = {"total": int(counters.get(f"{prefix}.count", 0)), "by_status": {}}
+    if with_amounts:
+        section["amount_by_status"] = {}
+    for key, value in counters.items():
+        if key.startswith(f"{prefix}.status.") and value:
+            section["by_status"][key[len(prefix) + 8:]] = int(value)
+        elif with_amounts and key.startswith(f"{prefix}.amount.") and value:
+            section["amount_by_status"][key[len(prefix) + 8:]] = round(value, 2)
+    return section
+
+def count_tasks_due(db: Session, start: date, end: date) -> int:
+    """Незавершенные задачи со сроком в [start, end]"""
+    return db.query(Task).filter(
+        Task.due_date.between(start, end),
+        Task.status.notin_(CLOSED_TASK_STATUSES),
+    ).count()
+
+def get_dashboard_summary(db: Session, today: date = None) -> schemas.DashboardSummary:
+    """Сводка из summary_counters плюс задачи недели по индексу ix_tasks_due_date"""
+    counters = read_counters(db)
+    sections = {
+        prefix: _section(counters, prefix, amount is not None)
+        for prefix, amount in TRACKED.values()
+    }
+    today = today or date.today()
+    week_start = today - timedelta(days=today.weekday())
+    week_end = week_start + timedelta(days=6)
+    due_this_week = count_tasks_due(db, week_start, week_end)
+    invoice_amounts = sections["invoices"]["amount_by_status"]
+    return schemas.DashboardSummary(
+        **sections,
+        outstanding_total=round(sum(invoice_amounts.get(s, 0) for s in OUTSTANDING_INVOICE_STATUSES), 2),
+        paid_total=invoice_amounts.get("paid", 0),
+        tasks_due_this_week=due_this_week,
+        week_start=week_start,
+        week_end=week_end,
+    )
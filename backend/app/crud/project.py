@@ -1,22 +1,36 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.orm import Query, Session
+from typing import List, Optional, Sequence
 from datetime import datetime
 from app.models import Project
 from app import schemas
+from app.pagination import paginate
+from app.fields import load_options
+from app.response_cache import invalidate, invalidate_deleted, tag
+
+# Ключ сортировки списка (и курсора)
+PROJECT_ORDER = (Project.id,)
+
+# Теги кэша списка
+PROJECT_CACHE_TAGS = (tag(Project),)
 
 def get_project(db: Session, project_id: int) -> Optional[Project]:
     return db.query(Project).filter(Project.id == project_id).first()
 
-def get_projects(db: Session, skip: int = 0, limit: int = 100, client_id: Optional[int] = None) -> List[Project]:
-    query = db.query(Project)
+def projects_query(db: Session, client_id: Optional[int] = None, fields: Optional[Sequence[str]] = None) -> Query:
+    """Фильтры списка проектов (общие для списка и выгрузки); fields - загрузить только эти поля"""
+    query = db.query(Project).options(*load_options(Project, fields, PROJECT_ORDER))
     if client_id:
         query = query.filter(Project.client_id == client_id)
-    return query.offset(skip).limit(limit).all()
+    return query
+
+def get_projects(db: Session, skip: int = 0, limit: int = 100, client_id: Optional[int] = None, cursor: Optional[str] = None, fields: Optional[Sequence[str]] = None) -> List[Project]:
+    return paginate(projects_query(db, client_id, fields), PROJECT_ORDER, skip, limit, cursor).all()
 
 def create_project(db: Session, project: schemas.ProjectCreate) -> Project:
     db_project = Project(**project.dict())
     db.add(db_project)
     db.commit()
+    invalidate(Project)
     db.refresh(db_project)
     return db_project
 
@@ -27,6 +41,7 @@ def update_project(db: Session, project_id: int, project: schemas.ProjectUpdate)
             setattr(db_project, key, value)
         db_project.updated_at = datetime.utcnow()
         db.commit()
+        invalidate(Project)
         db.refresh(db_project)
     return db_project
 
@@ -35,5 +50,6 @@ def delete_project(db: Session, project_id: int) -> bool:
     if db_project:
         db.delete(db_project)
         db.commit()
+        invalidate_deleted(Project)
         return True
     return False
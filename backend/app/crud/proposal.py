@@ -1,55 +1,91 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import HTTPException
+from sqlalchemy.orm import Query, Session, selectinload
+from typing import List, Optional, Sequence
 from datetime import datetime
 from app.models import Proposal, ProposalItem
 from app import schemas
+from app.pagination import paginate
+from app.fields import load_options
+from app.sequences import next_value
+from app.line_items import apply_item, item_errors, line_amount, lock_document, new_item, shift, sync_items
+from app.response_cache import invalidate, invalidate_deleted, tag
+
+# Ключ сортировки списка (и курсора)
+PROPOSAL_ORDER = (Proposal.id,)
+
+# Позиции входят в схему Proposal, грузим их одним запросом на всю страницу
+PROPOSAL_LOAD = (selectinload(Proposal.items),)
+
+# Теги кэша списка
+PROPOSAL_CACHE_TAGS = (tag(Proposal),)
 
 def get_proposal(db: Session, proposal_id: int) -> Optional[Proposal]:
-    return db.query(Proposal).filter(Proposal.id == proposal_id).first()
+    return db.query(Proposal).options(*PROPOSAL_LOAD).filter(Proposal.id == proposal_id).first()
 
-def get_proposals(db: Session, skip: int = 0, limit: int = 100, client_id: Optional[int] = None, status: Optional[str] = None) -> List[Proposal]:
-    query = db.query(Proposal)
+def proposals_query(db: Session, client_id: Optional[int] = None, status: Optional[str] = None, fields: Optional[Sequence[str]] = None) -> Query:
+    """Фильтры списка КП вместе с позициями (общие для списка и выгрузки); fields - загрузить только эти поля"""
+    query = db.query(Proposal).options(*load_options(Proposal, fields, PROPOSAL_ORDER, PROPOSAL_LOAD))
     if client_id:
         query = query.filter(Proposal.client_id == client_id)
     if status:
         query = query.filter(Proposal.status == status)
-    return query.offset(skip).limit(limit).all()
+    return query
+
+def get_proposals(db: Session, skip: int = 0, limit: int = 100, client_id: Optional[int] = None, status: Optional[str] = None, cursor: Optional[str] = None, fields: Optional[Sequence[str]] = None) -> List[Proposal]:
+    return paginate(proposals_query(db, client_id, status, fields), PROPOSAL_ORDER, skip, limit, cursor).all()
+
+def generate_proposal_number(db: Session) -> str:
+    today = datetime.now()
+    prefix = f"KP-{today.year}{today.month:02d}"
+    return f"{prefix}-{next_value(db, prefix):04d}"
+
+def _apply_discount(db_proposal: Proposal) -> None:
+    db_proposal.total = db_proposal.subtotal * (1 - (db_proposal.discount or 0) / 100)
+
+def _shift_totals(db_proposal: Proposal, delta: float) -> None:
+    """Сумма КП после изменения позиций на delta - без пересуммирования строк"""
+    db_proposal.subtotal = shift(db_proposal.subtotal, delta)
+    _apply_discount(db_proposal)
+    db_proposal.updated_at = datetime.utcnow()
 
 def create_proposal(db: Session, proposal: schemas.ProposalCreate) -> Proposal:
     proposal_data = proposal.dict(exclude={'items'})
     db_proposal = Proposal(**proposal_data)
-    subtotal = 0
+    if not db_proposal.number:
+        db_proposal.number = generate_proposal_number(db)
     for item_data in proposal.items:
-        item = ProposalItem(**item_data.dict())
-        item.total = item.quantity * item.price
-        subtotal += item.total
-        db_proposal.items.append(item)
-    db_proposal.subtotal = subtotal
-    db_proposal.total = subtotal * (1 - db_proposal.discount / 100)
+        db_proposal.items.append(new_item(ProposalItem, item_data.dict()))
+    db_proposal.subtotal = shift(0, sum(line_amount(item) for item in db_proposal.items))
+    _apply_discount(db_proposal)
     db.add(db_proposal)
     db.commit()
-    db.refresh(db_proposal)
-    return db_proposal
+    invalidate(Proposal)
+    # Перечитываем вместе с позициями: ответ сериализуется вне сессии
+    return get_proposal(db, db_proposal.id)
 
 def update_proposal(db: Session, proposal_id: int, proposal: schemas.ProposalUpdate) -> Optional[Proposal]:
+    if not lock_document(db, Proposal, proposal_id):
+        return None
     db_proposal = get_proposal(db, proposal_id)
     if db_proposal:
+        # id позиций проверяются под блокировкой КП: позицию, удаленную до
+        # нее, sync_items уже не встретит
+        if proposal.items is not None:
+            errors = item_errors((item.id for item in db_proposal.items), proposal.items)
+            if errors:
+                db.rollback()
+                raise HTTPException(status_code=422, detail=errors)
         update_data = proposal.dict(exclude_unset=True, exclude={'items'})
+        if 'discount' in update_data and update_data['discount'] is None:
+            update_data['discount'] = 0
         for key, value in update_data.items():
             setattr(db_proposal, key, value)
-        if proposal.items is not None:
-            db_proposal.items = []
-            subtotal = 0
-            for item_data in proposal.items:
-                item = ProposalItem(**item_data.dict())
-                item.total = item.quantity * item.price
-                subtotal += item.total
-                db_proposal.items.append(item)
-            db_proposal.subtotal = subtotal
-            db_proposal.total = subtotal * (1 - db_proposal.discount / 100)
-        db_proposal.updated_at = datetime.utcnow()
+        # Позиции - по разнице (app/line_items.py), скидка могла измениться и без них
+        delta = sync_items(db_proposal.items, ProposalItem, proposal.items) if proposal.items is not None else 0
+        _shift_totals(db_proposal, delta)
         db.commit()
-        db.refresh(db_proposal)
+        invalidate(Proposal)
+        db_proposal = get_proposal(db, proposal_id)
     return db_proposal
 
 def delete_proposal(db: Session, proposal_id: int) -> bool:
@@ -57,6 +93,7 @@ def delete_proposal(db: Session, proposal_id: int) -> bool:
     if db_proposal:
         db.delete(db_proposal)
         db.commit()
+        invalidate_deleted(Proposal)
         return True
     return False
 
@@ -65,5 +102,49 @@ def send_proposal(db: Session, proposal_id: int) -> Optional[Proposal]:
     if db_proposal:
         db_proposal.status = "sent"
         db.commit()
-        db.refresh(db_proposal)
+        invalidate(Proposal)
+        db_proposal = get_proposal(db, proposal_id)
     return db_proposal
+
+# Отдельные позиции: читается и пишется одна строка, сумма КП сдвигается на
+# изменение суммы этой строки (КП заблокировано до конца транзакции)
+
+def get_proposal_item(db: Session, proposal_id: int, item_id: int) -> Optional[ProposalItem]:
+    return db.query(ProposalItem).filter(
+        ProposalItem.id == item_id, ProposalItem.proposal_id == proposal_id
+    ).first()
+
+def create_proposal_item(db: Session, proposal_id: int, item: schemas.ProposalItemCreate) -> Optional[ProposalItem]:
+    if not lock_document(db, Proposal, proposal_id):
+        return None
+    db_proposal = db.get(Proposal, proposal_id)
+    db_item = new_item(ProposalItem, {**item.dict(), "proposal_id": proposal_id})
+    db.add(db_item)
+    _shift_totals(db_proposal, line_amount(db_item))
+    db.commit()
+    invalidate(Proposal)
+    db.refresh(db_item)
+    return db_item
+
+def update_proposal_item(db: Session, proposal_id: int, item_id: int, item: schemas.ProposalItemPatch) -> Optional[ProposalItem]:
+    if not lock_document(db, Proposal, proposal_id):
+        return None
+    db_item = get_proposal_item(db, proposal_id, item_id)
+    if db_item:
+        _shift_totals(db_item.proposal, apply_item(db_item, item.dict(exclude_unset=True)))
+        db.commit()
+        invalidate(Proposal)
+        db.refresh(db_item)
+    return db_item
+
+def delete_proposal_item(db: Session, proposal_id: int, item_id: int) -> bool:
+    if not lock_document(db, Proposal, proposal_id):
+        return False
+    db_item = get_proposal_item(db, proposal_id, item_id)
+    if db_item:
+        _shift_totals(db_item.proposal, -line_amount(db_item))
+        db.delete(db_item)
+        db.commit()
+        invalidate(Proposal)
+        return True
+    return False
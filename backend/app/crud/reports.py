@@ -0,0 +1,49 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from typing import List, Optional, Sequence
+from app.models import RevenueRollup
+
+# group_by отчета о выручке -> колонка сводки
+REVENUE_GROUPS = {
+    "month": RevenueRollup.month,
+    "client": RevenueRollup.client_id,
+    "project": RevenueRollup.project_id,
+    "status": RevenueRollup.status,
+}
+
+def get_revenue(
+    db: Session,
+    month_from: Optional[str] = None,
+    month_to: Optional[str] = None,
+    group_by: Sequence[str] = ("month",),
+    status: Optional[str] = None,
+    client_id: Optional[int] = None,
+    project_id: Optional[int] = None,
+) -> List[dict]:
+    """Выручка из revenue_rollup (месяцы YYYY-MM включительно), без чтения счетов"""
+    columns = [REVENUE_GROUPS[name] for name in dict.fromkeys(group_by)]
+    query = select(
+        *columns,
+        func.sum(RevenueRollup.invoices).label("invoices"),
+        func.sum(RevenueRollup.amount).label("amount"),
+    ).group_by(*columns).order_by(*columns).having(func.sum(RevenueRollup.invoices) != 0)
+    if month_from:
+        query = query.where(RevenueRollup.month >= month_from)
+    if month_to:
+        query = query.where(RevenueRollup.month <= month_to)
+    if status:
+        query = query.where(RevenueRollup.status == status)
+    if client_id:
+        query = query.where(RevenueRollup.client_id == client_id)
+    if project_id:
+        query = query.where(RevenueRollup.project_id == project_id)
+    rows = []
+    for row in db.execute(query).mappings():
+        row = dict(row)
+        # 0 в сводке - счет без клиента/проекта
+        for key in ("client_id", "project_id"):
+            if key in row:
+                row[key] = row[key] or None
+        row["amount"] = round(row["amount"], 2)
+        rows.append(row)
+    return rows
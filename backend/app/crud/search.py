@@ -0,0 +1,6 @@
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app import search as search_index
+
+def search_documents(db: Session, q: str, kinds: Optional[List[str]] = None, skip: int = 0, limit: int = 20) -> List[dict]:
+    return search_index.search(db.connection(), q, kinds, skip, limit)
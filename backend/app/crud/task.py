@@ -1,26 +1,45 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import HTTPException
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Query, Session
+from typing import List, Optional, Sequence
 from datetime import datetime
-from app.models import Task
+from app.models import Client, Project, Task
 from app import schemas
+from app.pagination import paginate
+from app.fields import load_options
+from app.summary import bump, deltas_for_rows, deltas_for_status_changes
+from app.search import index_documents
+from app.response_cache import invalidate, invalidate_deleted, tag
+
+# Ключ сортировки списка (и курсора)
+TASK_ORDER = (Task.id,)
+
+# Теги кэша списка
+TASK_CACHE_TAGS = (tag(Task),)
 
 def get_task(db: Session, task_id: int) -> Optional[Task]:
     return db.query(Task).filter(Task.id == task_id).first()
 
-def get_tasks(db: Session, skip: int = 0, limit: int = 100, project_id: Optional[int] = None, client_id: Optional[int] = None, status: Optional[str] = None) -> List[Task]:
-    query = db.query(Task)
+def tasks_query(db: Session, project_id: Optional[int] = None, client_id: Optional[int] = None, status: Optional[str] = None, fields: Optional[Sequence[str]] = None) -> Query:
+    """Фильтры списка задач (общие для списка и выгрузки); fields - загрузить только эти поля"""
+    query = db.query(Task).options(*load_options(Task, fields, TASK_ORDER))
     if project_id:
         query = query.filter(Task.project_id == project_id)
     if client_id:
         query = query.filter(Task.client_id == client_id)
     if status:
         query = query.filter(Task.status == status)
-    return query.offset(skip).limit(limit).all()
+    return query
+
+def get_tasks(db: Session, skip: int = 0, limit: int = 100, project_id: Optional[int] = None, client_id: Optional[int] = None, status: Optional[str] = None, cursor: Optional[str] = None, fields: Optional[Sequence[str]] = None) -> List[Task]:
+    query = tasks_query(db, project_id, client_id, status, fields)
+    return paginate(query, TASK_ORDER, skip, limit, cursor).all()
 
 def create_task(db: Session, task: schemas.TaskCreate) -> Task:
     db_task = Task(**task.dict())
     db.add(db_task)
     db.commit()
+    invalidate(Task)
     db.refresh(db_task)
     return db_task
 
@@ -31,6 +50,7 @@ def update_task(db: Session, task_id: int, task: schemas.TaskUpdate) -> Optional
             setattr(db_task, key, value)
         db_task.updated_at = datetime.utcnow()
         db.commit()
+        invalidate(Task)
         db.refresh(db_task)
     return db_task
 
@@ -39,6 +59,7 @@ def delete_task(db: Session, task_id: int) -> bool:
     if db_task:
         db.delete(db_task)
         db.commit()
+        invalidate_deleted(Task)
         return True
     return False
 
@@ -48,5 +69,115 @@ def complete_task(db: Session, task_id: int) -> Optional[Task]:
         db_task.status = "completed"
         db_task.completed_at = datetime.utcnow()
         db.commit()
+        invalidate(Task)
         db.refresh(db_task)
     return db_task
+
+# Массовые операции: проверка всего пакета, затем один INSERT/UPDATE
+# (executemany) в одной транзакции. Запись идет мимо flush, поэтому
+# счетчики сводки обновляются явно.
+
+def _row_error(loc: Sequence, msg: str) -> dict:
+    return {"loc": list(loc), "msg": msg, "type": "value_error"}
+
+def validate_new_tasks(db: Session, tasks: List[schemas.TaskCreate]) -> List[dict]:
+    """
+    Ошибки по строкам: ссылки на несуществующие проекты и клиентов.
+    Найденные строки под FOR KEY SHARE (PostgreSQL): до конца транзакции
+    их не удалить, INSERT задач не упадет на внешнем ключе
+    """
+    errors = []
+    for model, field in ((Project, "project_id"), (Client, "client_id")):
+        ids = {getattr(task, field) for task in tasks if getattr(task, field) is not None}
+        existing = set(db.scalars(
+            select(model.id).where(model.id.in_(ids)).with_for_update(read=True, key_share=True)
+        )) if ids else set()
+        for index, task in enumerate(tasks):
+            value = getattr(task, field)
+            if value is not None and value not in existing:
+                errors.append(_row_error(("body", "items", index, field), f"{model.__name__} {value} not found"))
+    return errors
+
+def task_id_errors(existing, ids: List[int], loc: Sequence = ("body", "ids"), field: Optional[str] = None) -> List[dict]:
+    """Ошибки по строкам: id задач не из existing и повторяющиеся id"""
+    errors, seen = [], set()
+    for index, task_id in enumerate(ids):
+        row_loc = (*loc, index, field) if field else (*loc, index)
+        if task_id in seen:
+            errors.append(_row_error(row_loc, f"Duplicate task id {task_id}"))
+        elif task_id not in existing:
+            errors.append(_row_error(row_loc, f"Task {task_id} not found"))
+        seen.add(task_id)
+    return errors
+
+def _tasks_in_order(db: Session, ids: List[int]) -> List[Task]:
+    tasks = {task.id: task for task in db.query(Task).filter(Task.id.in_(ids))}
+    return [tasks[task_id] for task_id in ids]
+
+def _lock_statuses(db: Session, ids: List[int], loc: Sequence, field: Optional[str] = None) -> dict:
+    """
+    Статусы задач пакета под FOR UPDATE (PostgreSQL): не изменятся до конца
+    транзакции. id проверяются здесь же, в транзакции записи: задача,
+    удаленная параллельно, - 422 по строке, а не KeyError
+    """
+    statuses = dict(db.execute(select(Task.id, Task.status).where(Task.id.in_(ids)).with_for_update()).all())
+    errors = task_id_errors(statuses, ids, loc, field)
+    if errors:
+        db.rollback()
+        raise HTTPException(status_code=422, detail=errors)
+    return statuses
+
+def create_tasks(db: Session, tasks: List[schemas.TaskCreate]) -> List[Task]:
+    # Ссылки проверяются в транзакции записи: проект или клиент, удаленный
+    # параллельно, - 422 по строке, а не IntegrityError
+    errors = validate_new_tasks(db, tasks)
+    if errors:
+        db.rollback()
+        raise HTTPException(status_code=422, detail=errors)
+    now = datetime.utcnow()
+    rows = [{**task.dict(), "created_at": now, "updated_at": now} for task in tasks]
+    # Один INSERT ... VALUES (...), (...) RETURNING на весь пакет: executemany с
+    # sort_by_parameter_order в SQLite выполняется построчно. id выдаются в
+    # порядке строк VALUES, поэтому порядок запроса - это порядок id
+    created = sorted(db.scalars(insert(Task).values(rows).returning(Task)).all(), key=lambda task: task.id)
+    bump(db.connection(), deltas_for_rows("tasks", (row["status"] for row in rows)))
+    index_documents(db.connection(), Task, created)
+    db.commit()
+    invalidate(Task)
+    return created
+
+def update_tasks(db: Session, items: List[schemas.TaskBulkUpdateItem]) -> List[Task]:
+    now = datetime.utcnow()
+    ids = [item.id for item in items]
+    old_statuses = _lock_statuses(db, ids, ("body", "items"), "id")
+    rows = [{**item.dict(exclude_unset=True), "id": item.id, "updated_at": now} for item in items]
+    # UPDATE по первичному ключу, executemany (строки группируются по набору полей)
+    db.execute(update(Task), rows)
+    bump(db.connection(), deltas_for_status_changes("tasks", (
+        (old_statuses[row["id"]], row["status"]) for row in rows if "status" in row
+    )))
+    tasks = _tasks_in_order(db, ids)
+    index_documents(db.connection(), Task, [
+        task for task, row in zip(tasks, rows) if "title" in row or "description" in row
+    ])
+    db.commit()
+    invalidate(Task)
+    return tasks
+
+def complete_tasks(db: Session, ids: List[int]) -> List[Task]:
+    now = datetime.utcnow()
+    old_statuses = _lock_statuses(db, ids, ("body", "ids"))
+    db.execute(
+        update(Task)
+        .where(Task.id.in_(ids))
+        .values(status="completed", completed_at=now, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    bump(db.connection(), deltas_for_status_changes("tasks", (
+        (status, "completed") for status in old_statuses.values()
+    )))
+    # Читаем в той же транзакции: после commit задачу могли уже удалить
+    tasks = _tasks_in_order(db, ids)
+    db.commit()
+    invalidate(Task)
+    return tasks
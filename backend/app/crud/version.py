@@ -0,0 +1,18 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Query, Session
+from typing import Callable, Optional
+from app.conditional import Validators, list_validators, record_validators
+
+def get_record_validators(db: Session, model, record_id: int) -> Optional[Validators]:
+    """Версия записи по id и updated_at без загрузки объекта; None - записи нет"""
+    row = db.query(model.updated_at).filter(model.id == record_id).first()
+    return record_validators(model, record_id, row[0]) if row else None
+
+def get_list_validators(db: Session, build_query: Callable[[Session], Query], params: str) -> Validators:
+    """Версия списка: число строк и max(updated_at) по фильтрам запроса"""
+    query = build_query(db)
+    model = query.column_descriptions[0]["entity"]
+    count, updated_at = db.execute(
+        query.order_by(None).statement.with_only_columns(func.count(), func.max(model.updated_at))
+    ).one()
+    return list_validators(model, count, updated_at, params)
@@ -1,20 +1,152 @@
-from sqlalchemy import create_engine
+import time
+from typing import Union
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from anyio import CapacityLimiter, to_thread
+from starlette.concurrency import run_in_threadpool
 from pydantic_settings import BaseSettings
 from pydantic import ConfigDict
+from app.metrics import pool_checkout
+from app.query_stats import instrument
 
 class Settings(BaseSettings):
     model_config = ConfigDict(extra='ignore')
     
     DATABASE_URL: str = "sqlite:///./nocto_crm.db"
 
+    # Пул соединений (для файловой SQLite и PostgreSQL)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Таймаут одного запроса в PostgreSQL, мс (0 - без ограничения)
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+
+    # PRAGMA для SQLite, применяются к каждому новому соединению
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE: int = -64000  # отрицательное значение - в КиБ
+
+    # Асинхронный стек БД (asyncpg / aiosqlite) для роутеров на get_async_db
+    DB_ASYNC: bool = False
+    # Размер пула потоков для синхронных обработчиков и запросов
+    THREADPOOL_SIZE: int = 40
+
+    # Кэш пользователей в get_current_user
+    AUTH_USER_CACHE_TTL: int = 60
+    AUTH_USER_CACHE_SIZE: int = 1024
+    # Доверять id/username/role из токена без обращения к БД
+    AUTH_STATELESS: bool = False
+
+    # bcrypt: стоимость и пул процессов для хеширования
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2  # 0 - хешировать в текущем потоке
+    PASSWORD_HASH_QUEUE: int = 16  # сверх воркеров, дальше - 503
+
+    # Периодические задачи (просроченные счета, истекшие КП)
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_INTERVAL_SECONDS: int = 60
+
+    # Импорт клиентов из CSV/XLSX
+    IMPORT_CHUNK_SIZE: int = 500  # строк на транзакцию
+    IMPORT_WORKERS: int = 1  # одновременных импортов, остальные ждут в очереди
+    IMPORT_MAX_ERRORS: int = 1000  # строк в отчете об ошибках
+    IMPORT_JOBS_KEPT: int = 100
+    IMPORT_JOB_TTL: int = 24 * 3600
+
+    # Потоковая выгрузка /export: строк на выборку курсора и на пачку ответа
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # Поиск: сколько самых свежих совпадений ранжировать
+    SEARCH_MAX_CANDIDATES: int = 2000
+
+    # Кэш ответов списков (app/response_cache.py)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_SIZE: int = 1024  # ответов в памяти процесса
+    RESPONSE_CACHE_TTL: int = 60
+    RESPONSE_CACHE_URL: str = ""  # redis://... - общий кэш для нескольких воркеров
+
+    # Метрики Prometheus на GET /metrics (app/metrics.py)
+    METRICS_ENABLED: bool = True
+
+    # SQL-статистика запросов (app/query_stats.py)
+    SQL_STATS_ENABLED: bool = True
+    SQL_SERVER_TIMING: bool = True  # заголовок Server-Timing в ответах
+    SQL_SLOW_QUERY_MS: int = 200  # запросы дольше - в журнал
+    SQL_N_PLUS_ONE_THRESHOLD: int = 10  # одна форма запроса чаще - предупреждение
+
 settings = Settings()
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def is_sqlite_memory(url: str) -> bool:
+    return is_sqlite(url) and (url.endswith(":memory:") or url.split("://", 1)[1] in ("", "/"))
+
+class _TimedCheckout:
+    """Замер ожидания соединения из пула (в том числе открытия нового) для /metrics"""
+
+    metrics_name = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_checkout[self.metrics_name].observe(time.perf_counter() - started)
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics_name = "async"
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """Параметры create_engine / create_async_engine из Settings"""
+    options = {}
+    if not is_sqlite_memory(url):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+        # Пул по умолчанию для SQLite зависит от драйвера, задаем явно;
+        # для PostgreSQL это те же QueuePool / AsyncAdaptedQueuePool, но с замером ожидания
+        options["poolclass"] = TimedAsyncQueuePool if is_async else TimedQueuePool
+    if is_sqlite(url):
+        if not is_async:
+            options["connect_args"] = {"check_same_thread": False}
+    elif settings.DB_STATEMENT_TIMEOUT_MS:
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL: читатели не блокируются писателем, запись не блокирует чтение"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}")
+    cursor.close()
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+if is_sqlite(settings.DATABASE_URL):
+    event.listen(engine, "connect", set_sqlite_pragmas)
+if settings.SQL_STATS_ENABLED:
+    instrument(engine, settings.SQL_SLOW_QUERY_MS)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -27,3 +159,64 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Асинхронный стек
+
+def async_database_url(url: str) -> str:
+    """Тот же DATABASE_URL, но с асинхронным драйвером"""
+    scheme, rest = url.split("://", 1)
+    backend = scheme.split("+", 1)[0]
+    drivers = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+    if backend not in drivers:
+        raise ValueError(f"DB_ASYNC is not supported for {backend}")
+    return f"{drivers[backend]}://{rest}"
+
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    **engine_options(settings.DATABASE_URL, is_async=True)
+) if settings.DB_ASYNC else None
+if async_engine is not None and is_sqlite(settings.DATABASE_URL):
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+if async_engine is not None and settings.SQL_STATS_ENABLED:
+    instrument(async_engine.sync_engine, settings.SQL_SLOW_QUERY_MS)
+
+# После commit объекты не истекают: ответ сериализуется уже вне сессии
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+) if settings.DB_ASYNC else None
+
+class SyncSessionRunner:
+    """
+    Синхронная сессия с интерфейсом AsyncSession.run_sync.
+
+    Используется get_async_db при DB_ASYNC=false: те же обработчики
+    выполняют запросы в пуле потоков, как и обычные def-роутеры.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def close(self):
+        # Возврат соединения в пул (ROLLBACK по сети) - не в event loop и не в
+        # общем пуле потоков: при исчерпании пула соединений его потоки ждут
+        # соединение, а соединение ждало бы свободного потока
+        await to_thread.run_sync(self.session.close, limiter=_close_limiter)
+
+# Отдельный лимитер для SyncSessionRunner.close: по потоку на каждое соединение пула
+_close_limiter = CapacityLimiter(settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+
+AsyncDB = Union[AsyncSession, SyncSessionRunner]
+
+# Dependency для async-роутеров: AsyncSession или синхронная сессия в пуле потоков
+async def get_async_db():
+    if settings.DB_ASYNC:
+        db = AsyncSessionLocal()
+    else:
+        db = SyncSessionRunner(SessionLocal(expire_on_commit=False))
+    try:
+        yield db
+    finally:
+        await db.close()
@@ -0,0 +1,114 @@
+"""
+Потоковая выгрузка списков в NDJSON или CSV.
+
+Строки читаются курсором на стороне сервера (yield_per) в собственной
+сессии и отдаются StreamingResponse пачками по EXPORT_BATCH_SIZE, поэтому
+память не зависит от числа строк. Pydantic-модели не строятся: строка -
+это колонки таблицы и вложенные коллекции (контакты, позиции).
+"""
+import csv
+import enum
+import io
+from datetime import date, datetime
+from typing import Callable, Iterator, Sequence
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import inspect
+from sqlalchemy.orm import Query, Session
+
+from app.database import SessionLocal, settings
+from app.serialization import dumps
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Значение параметра format в эндпоинтах /export
+FORMAT_PATTERN = "^(ndjson|csv)$"
+
+
+def _value(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def columns(model) -> list:
+    return [attr.key for attr in inspect(model).column_attrs]
+
+
+def row_dict(obj, keys: Sequence[str], nested: Sequence[str] = ()) -> dict:
+    """Колонки объекта и вложенные коллекции (списки словарей)"""
+    row = {key: _value(getattr(obj, key)) for key in keys}
+    for name in nested:
+        children = getattr(obj, name)
+        child_keys = columns(type(children[0])) if children else ()
+        row[name] = [row_dict(child, child_keys) for child in children]
+    return row
+
+
+def _ndjson(rows: Iterator[dict], keys: Sequence[str], nested: Sequence[str]) -> Iterator[str]:
+    for row in rows:
+        yield dumps(row) + "\n"
+
+
+def _csv(rows: Iterator[dict], keys: Sequence[str], nested: Sequence[str]) -> Iterator[str]:
+    # Вложенные коллекции в CSV - JSON-строкой в отдельной колонке
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([*keys, *nested])
+    for row in rows:
+        writer.writerow([
+            *(row[key] for key in keys),
+            *(dumps(row[name]) for name in nested),
+        ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+WRITERS = {"ndjson": _ndjson, "csv": _csv}
+
+
+def export_rows(
+    build_query: Callable[[Session], Query],
+    model,
+    export_format: str,
+    nested: Sequence[str] = (),
+    batch_size: int = None,
+) -> Iterator[bytes]:
+    """Генератор выгрузки: своя сессия, серверный курсор, пачки строк"""
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    keys = columns(model)
+    db = SessionLocal()
+    try:
+        query = build_query(db).yield_per(batch_size)
+        rows = (row_dict(obj, keys, nested) for obj in query)
+        chunk = []
+        for line in WRITERS[export_format](rows, keys, nested):
+            chunk.append(line)
+            if len(chunk) >= batch_size:
+                yield "".join(chunk).encode()
+                chunk.clear()
+        if chunk:
+            yield "".join(chunk).encode()
+    finally:
+        db.close()
+
+
+def export_response(
+    name: str,
+    build_query: Callable[[Session], Query],
+    model,
+    export_format: str,
+    nested: Sequence[str] = (),
+) -> StreamingResponse:
+    filename = f"{name}-{datetime.utcnow():%Y%m%d-%H%M%S}.{export_format}"
+    return StreamingResponse(
+        export_rows(build_query, model, export_format, nested),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,73 @@
+"""
+Выбор полей списков: параметр fields.
+
+  fields=summary       - компактная схема сущности (ClientSummary, ...)
+  fields=id,name,...   - любые поля полной схемы списка
+  без fields           - полная схема, как раньше
+
+Выбранные поля превращаются в опции загрузки: колонки - load_only (прочие,
+в том числе длинные Text, не читаются из БД), связи (contacts, items) -
+selectinload только если запрошены.
+"""
+import functools
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from pydantic import ConfigDict, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, selectinload
+
+# Значение fields для компактной схемы
+SUMMARY = "summary"
+
+# Описание параметра fields в OpenAPI
+FIELDS_DESCRIPTION = "summary - компактная схема, или поля через запятую (id,name,status)"
+
+
+class Selection(NamedTuple):
+    # Схема строки ответа
+    schema: type
+    # Поля для загрузки; None - все поля и связи по умолчанию
+    names: Optional[Tuple[str, ...]] = None
+
+
+@functools.lru_cache(maxsize=256)
+def subset_schema(schema, names: Tuple[str, ...]) -> type:
+    """Схема с полями names из schema (типы и значения по умолчанию те же)"""
+    fields = {name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in names}
+    return create_model(
+        f"{schema.__name__}Fields", __config__=ConfigDict(from_attributes=True), **fields
+    )
+
+
+def select_fields(schema, summary_schema, fields: Optional[str]) -> Selection:
+    """Разбор fields; неизвестные поля - ошибка 400"""
+    if not fields:
+        return Selection(schema)
+    if fields == SUMMARY:
+        return Selection(summary_schema, tuple(summary_schema.model_fields))
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in schema.model_fields]
+    if unknown or not names:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown) or fields}")
+    # id нужен всегда: по нему строятся курсор и ссылки на карточку
+    if "id" not in names:
+        names = ("id", *names)
+    return Selection(subset_schema(schema, names), names)
+
+
+def load_options(model, names: Optional[Sequence[str]], order: Sequence, default: Sequence = ()) -> tuple:
+    """
+    Опции загрузки модели: default, если поля не выбраны, иначе load_only
+    выбранных колонок и колонок сортировки (для курсора) и selectinload
+    выбранных связей
+    """
+    if names is None:
+        return tuple(default)
+    mapper = inspect(model)
+    columns = [mapper.column_attrs[name].class_attribute for name in names if name in mapper.column_attrs]
+    columns += [column for column in order if column.key not in names]
+    relations = [selectinload(mapper.relationships[name].class_attribute)
+                 for name in names if name in mapper.relationships]
+    return (load_only(*columns), *relations)
+
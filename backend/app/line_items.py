@@ -0,0 +1,118 @@
+"""
+Позиции КП и счетов: изменение по разнице вместо полной перезаписи.
+
+Полное обновление (PUT с items) сопоставляет присланные позиции с
+существующими по id: позиция с известным id обновляется, только если
+поменялись ее поля, без id - добавляется, не присланные - удаляются.
+Правка одной строки сметы на 300 позиций - один UPDATE, id остальных
+позиций не меняются.
+
+Суммы документа пересчитываются по приращению: каждая операция
+возвращает изменение суммы позиций (quantity * price), которое
+прибавляется к subtotal, без повторного суммирования всех строк.
+Приращение считается от прочитанного subtotal, поэтому строку документа
+сначала блокирует lock_document, и только потом читаются документ и
+позиции: параллельные правки позиций одного документа идут по очереди.
+"""
+from typing import Iterable, List, Optional, Sequence
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+# Точность денежных сумм: приращения не накапливают ошибку округления
+PRECISION = 2
+
+
+def lock_document(db: Session, model, document_id: int) -> bool:
+    """
+    Заблокировать строку КП или счета до конца транзакции; False - документа нет
+
+    UPDATE без изменений вместо SELECT ... FOR UPDATE: SQLite FOR UPDATE не
+    знает, а pysqlite до первой записи читает вне транзакции. UPDATE берет
+    блокировку записи и в SQLite, и в PostgreSQL (строка)
+    """
+    result = db.execute(
+        update(model)
+        .where(model.id == document_id)
+        .values(subtotal=model.subtotal, updated_at=model.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount > 0
+
+
+def line_amount(item) -> float:
+    """Сумма строки: количество * цена"""
+    return (item.quantity if item.quantity is not None else 1) * (item.price or 0)
+
+
+def _store_amount(item) -> None:
+    # У позиций КП сумма строки хранится в колонке total, у счетов - нет
+    if "total" in item.__table__.c:
+        item.total = line_amount(item)
+
+
+def new_item(item_model, values: dict):
+    """Новая позиция со значениями values (сумма строки - line_amount(item))"""
+    item = item_model(**values)
+    _store_amount(item)
+    return item
+
+
+def apply_item(item, values: dict) -> float:
+    """Записать в позицию только изменившиеся поля; возвращает приращение суммы"""
+    before = line_amount(item)
+    changed = False
+    for key, value in values.items():
+        if getattr(item, key) != value:
+            setattr(item, key, value)
+            changed = True
+    if changed:
+        _store_amount(item)
+    return line_amount(item) - before
+
+
+def item_errors(existing_ids: Iterable[int], payloads: Sequence, loc: Sequence = ("body", "items")) -> List[dict]:
+    """Ошибки по строкам: id чужих или несуществующих позиций (existing_ids - позиции документа) и повторы id"""
+    existing = set(existing_ids)
+    errors, seen = [], set()
+    for index, payload in enumerate(payloads):
+        if payload.id is None:
+            continue
+        if payload.id in seen:
+            msg = f"Duplicate item id {payload.id}"
+        elif payload.id not in existing:
+            msg = f"Item {payload.id} not found"
+        else:
+            msg = None
+        if msg:
+            errors.append({"loc": [*loc, index, "id"], "msg": msg, "type": "value_error"})
+        seen.add(payload.id)
+    return errors
+
+
+def sync_items(items: list, item_model, payloads: Sequence) -> float:
+    """
+    Привести коллекцию позиций к payloads (см. item_errors), затрагивая
+    только изменившиеся строки; возвращает приращение суммы позиций
+    """
+    by_id = {item.id: item for item in items}
+    kept = {payload.id for payload in payloads if payload.id is not None}
+    delta = 0.0
+    for item in [item for item in items if item.id not in kept]:
+        # Удаление из коллекции - DELETE строки (delete-orphan)
+        items.remove(item)
+        delta -= line_amount(item)
+    for payload in payloads:
+        values = payload.dict(exclude={"id"})
+        if payload.id is None:
+            item = new_item(item_model, values)
+            items.append(item)
+            delta += line_amount(item)
+        else:
+            delta += apply_item(by_id[payload.id], values)
+    return delta
+
+
+def shift(amount: Optional[float], delta: float) -> float:
+    """Сумма документа после приращения"""
+    return round((amount or 0) + delta, PRECISION)
@@ -1,23 +1,56 @@
+from contextlib import asynccontextmanager
+from anyio import to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
+from fastapi.responses import Response
+from .database import engine, async_engine, Base, settings
+from .scheduler import scheduler
+from .auth import password_hasher
+from . import client_import
+from .response_cache import response_cache
+from .serialization import DefaultResponse
+from . import metrics
+from .query_stats import QueryStatsMiddleware
+from .migrations import upgrade
+from . import summary  # noqa: F401 - обработчик счетчиков сводки
+from . import search  # noqa: F401 - обработчик поискового индекса
+from . import revenue  # noqa: F401 - обработчик сводки выручки
 
 # Импортируем все модели для создания таблиц
 from .models import (
     Client, Contact, Project, Task, 
-    Proposal, ProposalItem, Invoice, InvoiceItem, User
+    Proposal, ProposalItem, Invoice, InvoiceItem, User, NumberSequence, SummaryCounter,
+    RevenueRollup
 )
 
 # Импортируем роутеры
-from .routers import clients, projects, tasks, proposals, invoices, auth, users
+from .routers import clients, projects, tasks, proposals, invoices, auth, users, dashboard, search as search_router, calendar, reports
 
-# Создание таблиц в БД
+# Создание таблиц в БД и миграции существующих (индексы и т.п.)
 Base.metadata.create_all(bind=engine)
+upgrade(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Пул потоков для синхронных обработчиков (по умолчанию в anyio 40)
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    # Фоновые задачи: просрочка счетов и истечение КП
+    if settings.SCHEDULER_ENABLED:
+        scheduler.start()
+    yield
+    await scheduler.stop()
+    password_hasher.shutdown()
+    client_import.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 app = FastAPI(
     title="NOCTO CRM API",
     description="API для корпоративной CRM системы NOCTO",
-    version="0.4.0"
+    version="0.4.0",
+    lifespan=lifespan,
+    # orjson вместо json.dumps для всех ответов
+    default_response_class=DefaultResponse,
 )
 
 # CORS для локальной разработки
@@ -27,8 +60,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified", "Server-Timing"],
 )
 
+# SQL-статистика запроса и Server-Timing
+if settings.SQL_STATS_ENABLED:
+    app.add_middleware(
+        QueryStatsMiddleware,
+        server_timing=settings.SQL_SERVER_TIMING,
+        n_plus_one_threshold=settings.SQL_N_PLUS_ONE_THRESHOLD,
+    )
+
+# Метрики - внешний слой: задержка включает CORS и обработку ошибок
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # Подключение роутеров
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
@@ -37,6 +83,10 @@ app.include_router(projects.router, prefix="/api/projects", tags=["projects"])
 app.include_router(tasks.router, prefix="/api/tasks", tags=["tasks"])
 app.include_router(proposals.router, prefix="/api/proposals", tags=["proposals"])
 app.include_router(invoices.router, tags=["invoices"])
+app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
+app.include_router(search_router.router, prefix="/api/search", tags=["search"])
+app.include_router(calendar.router, prefix="/api/calendar", tags=["calendar"])
+app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
 
 @app.get("/")
 def root():
@@ -44,4 +94,13 @@ def root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "password_hashing": password_hasher.stats(),
+        "response_cache": response_cache.stats(),
+    }
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
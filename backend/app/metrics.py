@@ -0,0 +1,205 @@
+"""
+Метрики процесса в текстовом формате Prometheus (GET /metrics).
+
+MetricsMiddleware - чистый ASGI-middleware (без BaseHTTPMiddleware):
+на запрос одна гистограмма задержки по (метод, шаблон маршрута, статус)
+и счетчик запросов в обработке. Шаблон маршрута (/api/clients/{client_id})
+берется из scope["route"], который заполняет роутер FastAPI; запросы без
+маршрута (404) попадают в route="unmatched", чтобы случайные пути не
+плодили серии.
+
+Ожидание свободного соединения в пуле БД меряют классы пулов из
+app/database.py (pool_checkout), занятость пулов, пула потоков anyio,
+пула хеширования паролей и кэша ответов, счетчики медленных запросов и N+1
+(app/query_stats.py) читаются в момент запроса /metrics.
+
+Метрики - в памяти процесса: при нескольких воркерах uvicorn у каждого свои.
+"""
+import threading
+from bisect import bisect_left
+from time import perf_counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Границы гистограмм, секунды
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+UNMATCHED = "unmatched"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами (le), потокобезопасная"""
+
+    def __init__(self, buckets: Sequence[float] = HTTP_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # последняя - +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """Накопительные счетчики по границам и сумма"""
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total
+
+
+# (метод, маршрут, статус) -> гистограмма задержки
+http_requests: Dict[Tuple[str, str, str], Histogram] = {}
+# Запросов в обработке; меняется только в потоке event loop
+in_flight = 0
+
+# Ожидание соединения из пула: "sync" / "async" -> гистограмма
+pool_checkout: Dict[str, Histogram] = {"sync": Histogram(POOL_BUCKETS), "async": Histogram(POOL_BUCKETS)}
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    key = (method, route, str(status))
+    histogram = http_requests.get(key)
+    if histogram is None:
+        histogram = http_requests.setdefault(key, Histogram(HTTP_BUCKETS))
+    histogram.observe(seconds)
+
+
+class MetricsMiddleware:
+    """Задержка, статус и число запросов в обработке по маршрутам"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        global in_flight
+        # Исключение до начала ответа превратится в 500 у ServerErrorMiddleware
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight += 1
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight -= 1
+            route = scope.get("route")
+            observe_request(scope["method"], getattr(route, "path_format", UNMATCHED), status, perf_counter() - started)
+
+
+def _labels(names: Sequence[str], values: Iterable) -> str:
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Exposition:
+    """Сборка текста в формате Prometheus"""
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def metric(self, name: str, kind: str, help_text: str, samples: Iterable[Tuple[Sequence, float]],
+               label_names: Sequence[str] = ()) -> None:
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for values, value in samples:
+            self.lines.append(f"{name}{_labels(label_names, values)} {_number(value)}")
+
+    def histogram(self, name: str, help_text: str, series: Iterable[Tuple[Sequence, Histogram]],
+                  label_names: Sequence[str] = ()) -> None:
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} histogram")
+        for values, histogram in series:
+            cumulative, total = histogram.snapshot()
+            bounds = [repr(bound) for bound in histogram.buckets] + ["+Inf"]
+            labels = _labels(label_names, values)
+            # Метки серии собираем один раз, le дописываем к ним
+            prefix = f"{name}_bucket{labels[:-1]}," if labels else f"{name}_bucket{{"
+            for bound, count in zip(bounds, cumulative):
+                self.lines.append(f'{prefix}le="{bound}"}} {count}')
+            self.lines.append(f"{name}_sum{labels} {_number(total)}")
+            self.lines.append(f"{name}_count{labels} {cumulative[-1]}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def _pool_state(pool) -> Optional[Dict[str, int]]:
+    # Только пулы с очередью (QueuePool и наследники): у StaticPool нет размера
+    if not hasattr(pool, "checkedout") or not hasattr(pool, "size"):
+        return None
+    return {"size": pool.size(), "checked_out": pool.checkedout(), "overflow": max(0, pool.overflow())}
+
+
+def render() -> str:
+    """Текст /metrics; вызывается из event loop (нужен лимитер потоков anyio)"""
+    from anyio import to_thread
+
+    from app import query_stats
+    from app.auth import password_hasher
+    from app.database import async_engine, engine
+    from app.response_cache import response_cache
+
+    out = Exposition()
+    series = sorted(http_requests.items())
+    out.metric("http_requests_total", "counter", "HTTP requests by method, route template and status",
+               ((key, histogram.snapshot()[0][-1]) for key, histogram in series), ("method", "route", "status"))
+    out.histogram("http_request_duration_seconds", "HTTP request latency",
+                  series, ("method", "route", "status"))
+    out.metric("http_requests_in_flight", "gauge", "HTTP requests being processed", [((), in_flight)])
+
+    pools = [("sync", _pool_state(engine.pool))]
+    if async_engine is not None:
+        pools.append(("async", _pool_state(async_engine.sync_engine.pool)))
+    pools = [(name, state) for name, state in pools if state is not None]
+    out.histogram("db_pool_checkout_seconds", "Time to get a connection from the pool",
+                  (((name,), pool_checkout[name]) for name, _ in pools), ("engine",))
+    for field, help_text in (("size", "Connection pool size"),
+                             ("checked_out", "Connections checked out of the pool"),
+                             ("overflow", "Connections opened above the pool size")):
+        out.metric(f"db_pool_{field}", "gauge", help_text, (((name,), state[field]) for name, state in pools), ("engine",))
+
+    limiter = to_thread.current_default_thread_limiter()
+    out.metric("threadpool_size", "gauge", "Worker threads for sync handlers", [((), limiter.total_tokens)])
+    out.metric("threadpool_in_use", "gauge", "Worker threads busy", [((), limiter.borrowed_tokens)])
+    out.metric("threadpool_waiting", "gauge", "Tasks waiting for a worker thread", [((), limiter.statistics().tasks_waiting)])
+
+    hasher = password_hasher.stats()
+    out.metric("password_hash_in_flight", "gauge", "Password hashes queued or running", [((), hasher["in_flight"])])
+    out.metric("password_hash_completed_total", "counter", "Password hashes completed", [((), hasher["completed"])])
+    out.metric("password_hash_rejected_total", "counter", "Password hashes rejected with 503", [((), hasher["rejected"])])
+
+    out.metric("db_slow_queries_total", "counter", "SQL statements slower than SQL_SLOW_QUERY_MS",
+               [((), query_stats.slow_queries)])
+    out.metric("db_n_plus_one_total", "counter", "Requests flagged as likely N+1, per statement shape",
+               [((), query_stats.n_plus_one)])
+
+    cache = response_cache.stats()
+    for field in ("hits", "misses", "invalidations", "evictions"):
+        if field in cache:
+            out.metric(f"response_cache_{field}_total", "counter", f"Response cache {field}", [((), cache[field])])
+    if "size" in cache:
+        out.metric("response_cache_size", "gauge", "Responses held in the local cache", [((), cache["size"])])
+    return out.text()
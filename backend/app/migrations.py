@@ -0,0 +1,188 @@
+"""
+Миграции схемы для уже существующих БД.
+
+Новые таблицы создает Base.metadata.create_all, но он не трогает таблицы,
+которые уже есть: индексы, добавленные в модели позже, попадают в старые
+БД только через миграции. Каждая миграция выполняется один раз, версии
+хранятся в таблице schema_migrations.
+
+Использование:
+  python -m app.migrations          # применить новые миграции
+  python -m app.migrations --list   # показать статус
+"""
+import logging
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.database import Base
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", String, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class Migration(NamedTuple):
+    version: str
+    description: str
+    # Имена индексов, объявленных в моделях (__table_args__ / index=True)
+    indexes: Tuple[str, ...] = ()
+    # Дополнительные шаги (соединение в режиме autocommit)
+    run: Optional[Callable[[Connection], None]] = None
+
+
+def _recompute_summary(conn: Connection) -> None:
+    from app.summary import recompute
+    recompute(conn)
+
+
+def _build_search_index(conn: Connection) -> None:
+    from app.search import rebuild
+    rebuild(conn)
+
+
+def _rebuild_revenue(conn: Connection) -> None:
+    from app.revenue import rebuild
+    rebuild(conn)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        "0001",
+        "Индексы под фильтры списков и внешние ключи",
+        indexes=(
+            "ix_contacts_client_id",
+            "ix_projects_client_id_id",
+            "ix_tasks_project_id_id",
+            "ix_tasks_client_id_id",
+            "ix_tasks_status_id",
+            "ix_proposals_client_id_id",
+            "ix_proposals_status_id",
+            "ix_proposal_items_proposal_id",
+            "ix_invoices_created_at_id",
+            "ix_invoices_status_created_at_id",
+            "ix_invoices_client_id_created_at_id",
+            "ix_invoices_project_id_created_at_id",
+            "ix_invoices_status_due_date",
+            "ix_invoice_items_invoice_id",
+        ),
+    ),
+    Migration(
+        "0002",
+        "Сводка главной панели: индекс сроков задач и пересчет счетчиков",
+        indexes=("ix_tasks_due_date",),
+        run=_recompute_summary,
+    ),
+    Migration(
+        "0003",
+        "Полнотекстовый поиск: индекс search_index",
+        run=_build_search_index,
+    ),
+    Migration(
+        "0004",
+        "Календарь: индексы сроков счетов, КП и задач исполнителя",
+        indexes=("ix_invoices_due_date", "ix_proposals_valid_until", "ix_tasks_assignee_due_date"),
+    ),
+    Migration(
+        "0005",
+        "Сводка выручки: заполнение revenue_rollup по счетам",
+        run=_rebuild_revenue,
+    ),
+]
+
+
+def _find_index(name: str):
+    for table in Base.metadata.tables.values():
+        for index in table.indexes:
+            if index.name == name:
+                return index
+    raise LookupError(f"Index {name} is not declared in app.models")
+
+
+def create_index(conn: Connection, name: str) -> None:
+    """
+    CREATE INDEX IF NOT EXISTS по объявлению из моделей.
+
+    В PostgreSQL индекс строится CONCURRENTLY, без блокировки записи в
+    таблицу. Прерванная сборка оставляет невалидный индекс - его удаляем и
+    строим заново.
+    """
+    index = _find_index(name)
+    columns = ", ".join(column.name for column in index.columns)
+    unique = "UNIQUE " if index.unique else ""
+    concurrently = ""
+    if conn.dialect.name == "postgresql":
+        concurrently = "CONCURRENTLY "
+        invalid = conn.execute(text(
+            "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {"name": name}).first()
+        if invalid:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    conn.execute(text(
+        f"CREATE {unique}INDEX {concurrently}IF NOT EXISTS {name} ON {index.table.name} ({columns})"
+    ))
+
+
+def applied_versions(engine: Engine) -> set:
+    with engine.begin() as conn:
+        schema_migrations.create(conn, checkfirst=True)
+        return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def upgrade(engine: Engine) -> List[str]:
+    """Применение всех еще не примененных миграций, возвращает их версии"""
+    done = applied_versions(engine)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version in done:
+            continue
+        logger.info("Applying migration %s: %s", migration.version, migration.description)
+        # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for name in migration.indexes:
+                create_index(conn, name)
+            if migration.run is not None:
+                migration.run(conn)
+        with engine.begin() as conn:
+            # Параллельный запуск (несколько воркеров) уже мог записать версию
+            if conn.execute(select(schema_migrations.c.version).where(
+                schema_migrations.c.version == migration.version
+            )).first() is None:
+                conn.execute(schema_migrations.insert().values(
+                    version=migration.version,
+                    description=migration.description,
+                    applied_at=datetime.utcnow(),
+                ))
+        applied.append(migration.version)
+    return applied
+
+
+if __name__ == "__main__":
+    import argparse
+    from app.database import engine
+    import app.models  # noqa: F401 - регистрация таблиц в Base.metadata
+
+    parser = argparse.ArgumentParser(description="Миграции схемы NOCTO CRM")
+    parser.add_argument("--list", action="store_true", help="показать статус миграций")
+    args = parser.parse_args()
+
+    if args.list:
+        done = applied_versions(engine)
+        for migration in MIGRATIONS:
+            mark = "x" if migration.version in done else " "
+            print(f"[{mark}] {migration.version} {migration.description}")
+    else:
+        Base.metadata.create_all(bind=engine)
+        versions = upgrade(engine)
+        print(f"Применено миграций: {len(versions)}" + (f" ({', '.join(versions)})" if versions else ""))
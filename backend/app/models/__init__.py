@@ -4,6 +4,9 @@ from app.models.task import Task
 from app.models.proposal import Proposal, ProposalItem
 from app.models.invoice import Invoice, InvoiceItem, InvoiceStatus
 from app.models.user import User
+from app.models.sequence import NumberSequence
+from app.models.summary import SummaryCounter
+from app.models.revenue import RevenueRollup
 
 __all__ = [
     'Client',
@@ -16,4 +19,7 @@ __all__ = [
     'InvoiceItem',
     'InvoiceStatus',
     'User',
+    'NumberSequence',
+    'SummaryCounter',
+    'RevenueRollup',
 ]
@@ -33,7 +33,7 @@ class Contact(Base):
     __tablename__ = "contacts"
 
     id = Column(Integer, primary_key=True, index=True)
-    client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
+    client_id = Column(Integer, ForeignKey("clients.id"), nullable=False, index=True)
     name = Column(String, nullable=False)
     position = Column(String, nullable=True)
     phone = Column(String, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum as SQLEnum, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum as SQLEnum, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -52,12 +52,25 @@ class Invoice(Base):
     project = relationship("Project", back_populates="invoices")
     items = relationship("InvoiceItem", back_populates="invoice", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Сортировка списка и keyset-пагинация по (created_at, id)
+        Index("ix_invoices_created_at_id", "created_at", "id"),
+        # Фильтры списка с той же сортировкой
+        Index("ix_invoices_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_invoices_client_id_created_at_id", "client_id", "created_at", "id"),
+        Index("ix_invoices_project_id_created_at_id", "project_id", "created_at", "id"),
+        # Поиск просроченных: status='sent' AND due_date < now
+        Index("ix_invoices_status_due_date", "status", "due_date"),
+        # Сроки оплаты в календаре (диапазон дат без фильтра по статусу)
+        Index("ix_invoices_due_date", "due_date"),
+    )
+
 
 class InvoiceItem(Base):
     __tablename__ = "invoice_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    invoice_id = Column(Integer, ForeignKey("invoices.id"))
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), index=True)
     
     name = Column(String)
     description = Column(Text, nullable=True)
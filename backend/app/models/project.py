@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -24,3 +24,8 @@ class Project(Base):
     client = relationship("Client", back_populates="projects")
     tasks = relationship("Task", back_populates="project", cascade="all, delete-orphan")
     invoices = relationship("Invoice", back_populates="project", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Проекты клиента + сортировка по id
+        Index("ix_projects_client_id_id", "client_id", "id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Date
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Date, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -10,7 +10,7 @@ class Proposal(Base):
     client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
     title = Column(String, nullable=False)
     number = Column(String, nullable=True)  # Номер КП
-    status = Column(String, default="draft")  # draft, sent, accepted, rejected
+    status = Column(String, default="draft")  # draft, sent, accepted, rejected, expired
     
     # Сроки
     valid_until = Column(Date, nullable=True)  # Действительно до
@@ -32,11 +32,19 @@ class Proposal(Base):
     client = relationship("Client", back_populates="proposals")
     items = relationship("ProposalItem", back_populates="proposal", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Фильтры списка КП + сортировка по id
+        Index("ix_proposals_client_id_id", "client_id", "id"),
+        Index("ix_proposals_status_id", "status", "id"),
+        # Окончание действия КП в календаре
+        Index("ix_proposals_valid_until", "valid_until"),
+    )
+
 class ProposalItem(Base):
     __tablename__ = "proposal_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    proposal_id = Column(Integer, ForeignKey("proposals.id"), nullable=False)
+    proposal_id = Column(Integer, ForeignKey("proposals.id"), nullable=False, index=True)
     
     name = Column(String, nullable=False)  # Название услуги
     description = Column(Text, nullable=True)  # Описание
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Float, Integer, String
+from app.database import Base
+
+class RevenueRollup(Base):
+    """Счета и их сумма за месяц выставления по клиенту, проекту и статусу (app/revenue.py)"""
+    __tablename__ = "revenue_rollup"
+
+    month = Column(String(7), primary_key=True)  # YYYY-MM по issue_date
+    client_id = Column(Integer, primary_key=True)  # 0 - без клиента
+    project_id = Column(Integer, primary_key=True)  # 0 - без проекта
+    status = Column(String, primary_key=True)
+    invoices = Column(Integer, nullable=False, default=0)
+    amount = Column(Float, nullable=False, default=0)
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer, String
+from app.database import Base
+
+class NumberSequence(Base):
+    """Счетчик номеров документов по префиксу (INV-202601, KP-202601, ...)"""
+    __tablename__ = "number_sequences"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
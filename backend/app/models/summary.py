@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Float, String
+from app.database import Base
+
+class SummaryCounter(Base):
+    """Счетчик сводки для главной панели (clients.status.active, invoices.amount.paid, ...)"""
+    __tablename__ = "summary_counters"
+
+    key = Column(String, primary_key=True)
+    value = Column(Float, nullable=False, default=0)
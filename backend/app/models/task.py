@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Date
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Date, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -31,3 +31,14 @@ class Task(Base):
     # Relationships
     project = relationship("Project", back_populates="tasks")
     client = relationship("Client", back_populates="tasks")
+
+    __table_args__ = (
+        # Фильтры списка задач + сортировка по id
+        Index("ix_tasks_project_id_id", "project_id", "id"),
+        Index("ix_tasks_client_id_id", "client_id", "id"),
+        Index("ix_tasks_status_id", "status", "id"),
+        # Задачи со сроком в диапазоне (неделя, месяц)
+        Index("ix_tasks_due_date", "due_date"),
+        # Календарь исполнителя
+        Index("ix_tasks_assignee_due_date", "assignee", "due_date"),
+    )
@@ -0,0 +1,91 @@
+import base64
+import json
+from datetime import datetime, date
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+# Заголовок, в котором отдается курсор следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _load_value(column, value: Any) -> Any:
+    python_type = column.type.python_type
+    if value is None:
+        return None
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Упаковка значений ключа сортировки в непрозрачный курсор"""
+    raw = json.dumps([_dump_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> List[Any]:
+    """Распаковка курсора в значения колонок сортировки"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor shape mismatch")
+        return [_load_value(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(
+    query: Query,
+    columns: Sequence,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    descending: bool = False,
+) -> Query:
+    """
+    Сортировка по ключу (columns) и выборка страницы.
+
+    С курсором страница берется по условию на ключ сортировки (keyset),
+    и ее стоимость не зависит от глубины. Без курсора работает
+    старый режим skip/limit.
+    """
+    if descending:
+        query = query.order_by(*[column.desc() for column in columns])
+    else:
+        query = query.order_by(*columns)
+
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        key = tuple_(*columns) if len(columns) > 1 else columns[0]
+        bound = tuple_(*values) if len(columns) > 1 else values[0]
+        query = query.filter(key < bound if descending else key > bound)
+    elif skip:
+        query = query.offset(skip)
+
+    return query.limit(limit)
+
+
+def next_cursor(items: Sequence[Any], columns: Sequence, limit: int) -> Optional[str]:
+    """Курсор следующей страницы или None, если страница последняя"""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor([getattr(last, column.key) for column in columns])
+
+
+def set_next_cursor(response: Response, items: Sequence[Any], columns: Sequence, limit: int) -> None:
+    cursor = next_cursor(items, columns, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
@@ -0,0 +1,182 @@
+"""
+SQL-статистика запроса: число запросов, время в БД, самый медленный
+запрос, журнал медленных запросов и поиск N+1.
+
+instrument(engine, slow_query_ms) вешает before/after_cursor_execute на движок
+(app/database.py - на синхронный и на async_engine.sync_engine).
+QueryStatsMiddleware заводит на HTTP-запрос объект QueryStats в
+ContextVar: контекст копируется в поток синхронного обработчика и в
+greenlet асинхронного движка, поэтому запросы попадают в статистику
+своего HTTP-запроса. Итог уходит в заголовок Server-Timing:
+
+  Server-Timing: db;dur=12.40;desc="7 queries", db-slowest;dur=4.10;desc="SELECT clients..."
+
+(и db-n-plus-one с самой частой повторяющейся формой, если она есть).
+
+Запросы дольше SQL_SLOW_QUERY_MS пишутся в журнал (логгер app.query_stats)
+с формой параметров - типами, без значений. Если одна и та же форма
+запроса (текст с плейсхолдерами, списки IN свернуты) выполнилась за
+HTTP-запрос больше SQL_N_PLUS_ONE_THRESHOLD раз, это похоже на N+1
+(ленивая загрузка contacts / items в цикле) - пишется предупреждение.
+Считаются только одиночные SELECT: пакетная запись (executemany, в том
+числе построчные INSERT ... RETURNING драйвера) - не N+1.
+
+Заголовок отправляется до тела ответа: запросы потоковой выгрузки
+(/export), выполненные во время отдачи тела, в него не попадают.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Журнал медленных запросов и N+1 обрезает SQL до этой длины
+STATEMENT_LOG_LIMIT = 1000
+# Длина SQL в описании Server-Timing
+STATEMENT_HEADER_LIMIT = 60
+
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+# Счетчики процесса для /metrics
+slow_queries = 0
+n_plus_one = 0
+
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)\s*\)")
+_POSTCOMPILE = re.compile(r"__\[POSTCOMPILE_\w+\]")
+
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement: str) -> str:
+    """Форма запроса: SQL в одну строку, списки плейсхолдеров IN (?, ?, ...) свернуты в (?...)"""
+    shape = " ".join(statement.split())
+    shape = _IN_LIST.sub("(?...)", shape)
+    return _POSTCOMPILE.sub("(?...)", shape)
+
+
+def _row_shape(row) -> str:
+    if isinstance(row, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in row.items()) + "}"
+    # Подряд идущие одинаковые типы сворачиваются: длинные IN-списки - "int x 500"
+    groups: List[Tuple[str, int]] = []
+    for value in row or ():
+        name = type(value).__name__
+        if groups and groups[-1][0] == name:
+            groups[-1] = (name, groups[-1][1] + 1)
+        else:
+            groups.append((name, 1))
+    return "(" + ", ".join(name if count == 1 else f"{name} x {count}" for name, count in groups) + ")"
+
+
+def parameter_shape(parameters, executemany: bool) -> str:
+    """Типы параметров без значений: (int, str) или 100 x (int, str) для executemany"""
+    if executemany:
+        rows = list(parameters or ())
+        return f"{len(rows)} x {_row_shape(rows[0])}" if rows else "[]"
+    return _row_shape(parameters)
+
+
+class QueryStats:
+    """SQL-запросы одного HTTP-запроса"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = ""
+        self.shapes: Counter = Counter()
+
+    def add(self, statement: str, elapsed: float, select: bool = True) -> None:
+        """select - одиночный SELECT, его форма учитывается в поиске N+1"""
+        self.count += 1
+        self.duration += elapsed
+        if select:
+            self.shapes[statement_shape(statement)] += 1
+        if elapsed > self.slowest:
+            self.slowest, self.slowest_statement = elapsed, statement
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Формы, выполненные больше threshold раз"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+    def server_timing(self, threshold: int) -> str:
+        timing = f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"'
+        if self.count:
+            timing += f', db-slowest;dur={self.slowest * 1000:.2f};desc="{_header_text(self.slowest_statement)}"'
+        repeated = self.repeated(threshold)
+        if repeated:
+            shape, count = repeated[0]
+            timing += f', db-n-plus-one;desc="{count} x {_header_text(shape)}"'
+        return timing
+
+
+def _header_text(statement: str) -> str:
+    text = statement_shape(statement)[:STATEMENT_HEADER_LIMIT]
+    return text.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def instrument(engine: Engine, slow_query_ms: int) -> None:
+    """Подключить сбор статистики к движку (для AsyncEngine - к его sync_engine)"""
+    slow_query_seconds = slow_query_ms / 1000
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # Время начала - на контексте выполнения: при ошибке он просто выбрасывается
+        context._query_started = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        global slow_queries
+        elapsed = time.perf_counter() - context._query_started
+        stats = _current.get()
+        if stats is not None:
+            stats.add(statement, elapsed, not executemany and statement.lstrip()[:6].upper() == "SELECT")
+        if elapsed >= slow_query_seconds:
+            slow_queries += 1
+            logger.warning(
+                "Slow query %.1f ms: %s; parameters %s",
+                elapsed * 1000, statement_shape(statement)[:STATEMENT_LOG_LIMIT], parameter_shape(parameters, executemany),
+            )
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+def report(stats: QueryStats, method: str, path: str, threshold: int) -> None:
+    """Предупреждения о вероятных N+1 по итогам HTTP-запроса"""
+    global n_plus_one
+    for shape, count in stats.repeated(threshold):
+        n_plus_one += 1
+        logger.warning("Possible N+1 in %s %s: %d x %s", method, path, count, shape[:STATEMENT_LOG_LIMIT])
+
+
+class QueryStatsMiddleware:
+    """QueryStats на каждый HTTP-запрос, заголовок Server-Timing и проверка N+1"""
+
+    def __init__(self, app, server_timing: bool = True, n_plus_one_threshold: int = 10):
+        self.app = app
+        self.server_timing = server_timing
+        self.threshold = n_plus_one_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = QueryStats()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and self.server_timing:
+                header = (b"server-timing", stats.server_timing(self.threshold).encode("latin-1", "replace"))
+                message = {**message, "headers": [*message.get("headers", ()), header]}
+            await send(message)
+
+        token = _current.set(stats)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            report(stats, scope["method"], scope["path"], self.threshold)
@@ -0,0 +1,217 @@
+"""
+Кэш ответов списков.
+
+Ключ - путь и нормализованная строка запроса (параметры отсортированы) плюс
+поколения тегов, от которых зависит список. Тег - имя таблицы. Запись
+вызывает invalidate(тег) после commit: поколение растет, и старые ключи
+больше не находятся (их вытесняют LRU и TTL). Перебирать ключи не нужно,
+поэтому схема одинаково работает в памяти процесса и в общем хранилище.
+
+Хранилища:
+  LocalBackend  - LRU в памяти процесса (по умолчанию); при нескольких
+                  воркерах запись в одном не сбрасывает кэш других, данные
+                  могут отставать на RESPONSE_CACHE_TTL
+  RedisBackend  - общее для всех воркеров (RESPONSE_CACHE_URL=redis://...,
+                  нужен пакет redis)
+
+Хранилище заменяемо: response_cache.backend = LocalBackend(...) подменяет
+общее локальным (тесты, бенчмарки). Списки не зависят от пользователя,
+поэтому его нет в ключе.
+"""
+import functools
+import json
+import threading
+from typing import Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi import Request, Response
+from sqlalchemy import inspect
+from starlette.concurrency import run_in_threadpool
+
+from app import conditional
+from app.cache import LRUCache
+from app.database import settings
+
+# Заголовки ответа, которые сохраняются вместе с телом
+STORED_HEADERS = ("etag", "cache-control", "x-next-cursor")
+
+
+class LocalBackend:
+    """Кэш в памяти процесса: LRU с TTL и счетчики поколений тегов"""
+
+    # Вызовы не блокируют event loop
+    blocking = False
+
+    def __init__(self, maxsize: int, ttl: Optional[float]):
+        self.entries = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._generations: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[tuple]:
+        return self.entries.get(key, None)
+
+    def set(self, key: str, value: tuple) -> None:
+        self.entries.set(key, value)
+
+    def generations(self, tags: Sequence[str]) -> List[int]:
+        return [self._generations.get(tag, 0) for tag in tags]
+
+    def bump(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def stats(self) -> dict:
+        stats = self.entries.stats()
+        return {"size": stats["size"], "evictions": stats["evictions"]}
+
+
+class RedisBackend:
+    """Общий кэш воркеров: записи с TTL, поколения тегов - INCR"""
+
+    blocking = True
+
+    def __init__(self, url: str, ttl: Optional[float], prefix: str = "nocto:response:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_URL requires the redis package")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = int(ttl) if ttl else None
+        self.prefix = prefix
+
+    # Запись - заголовки в JSON, перевод строки и тело как есть: данные из
+    # общего хранилища только разбираются, не исполняются (не pickle)
+
+    def get(self, key: str) -> Optional[tuple]:
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        head, _, body = value.partition(b"\n")
+        try:
+            headers = json.loads(head)
+        except ValueError:
+            return None
+        if not isinstance(headers, dict) or "etag" not in headers:
+            return None
+        return body, headers
+
+    def set(self, key: str, value: tuple) -> None:
+        body, headers = value
+        self.client.set(self.prefix + key, json.dumps(headers).encode() + b"\n" + body, ex=self.ttl)
+
+    def generations(self, tags: Sequence[str]) -> List[int]:
+        values = self.client.mget([f"{self.prefix}generation:{tag}" for tag in tags])
+        return [int(value or 0) for value in values]
+
+    def bump(self, tags: Iterable[str]) -> None:
+        pipeline = self.client.pipeline(transaction=False)
+        for tag in tags:
+            pipeline.incr(f"{self.prefix}generation:{tag}")
+        pipeline.execute()
+
+    def stats(self) -> dict:
+        # Вытеснения считает сам Redis (по всему серверу)
+        return {"evictions": self.client.info("stats").get("evicted_keys", 0)}
+
+
+class ResponseCache:
+    """Кэш тел ответов списков с инвалидацией по тегам"""
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def key(self, request: Request, tags: Sequence[str]) -> str:
+        query = urlencode(sorted(parse_qsl(request.url.query, keep_blank_values=True)))
+        generations = ".".join(str(value) for value in self.backend.generations(tags))
+        return f"{request.url.path}?{query}#{generations}"
+
+    def lookup(self, request: Request, tags: Sequence[str]) -> Tuple[Optional[str], Optional[Response]]:
+        """(ключ, готовый ответ или 304) при попадании; (ключ, None) при промахе"""
+        if self.backend is None:
+            return None, None
+        key = self.key(request, tags)
+        entry = self.backend.get(key)
+        if entry is None:
+            self._count("misses")
+            return key, None
+        self._count("hits")
+        body, headers = entry
+        cached = conditional.not_modified(request, conditional.Validators(headers["etag"]))
+        return key, cached or Response(body, media_type="application/json", headers=headers)
+
+    def store(self, key: Optional[str], body: bytes, response: Response) -> Response:
+        """Ответ с телом body и заголовками response; при key - еще и в кэш"""
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        if key is not None:
+            self.backend.set(key, (body, headers))
+        return Response(body, media_type="application/json", headers=headers)
+
+    async def alookup(self, request: Request, tags: Sequence[str]) -> Tuple[Optional[str], Optional[Response]]:
+        if self.backend is not None and self.backend.blocking:
+            return await run_in_threadpool(self.lookup, request, tags)
+        return self.lookup(request, tags)
+
+    async def astore(self, key: Optional[str], body: bytes, response: Response) -> Response:
+        if key is not None and self.backend.blocking:
+            return await run_in_threadpool(self.store, key, body, response)
+        return self.store(key, body, response)
+
+    def invalidate(self, *tags: str) -> None:
+        if self.backend is not None and tags:
+            self.backend.bump(tags)
+            self._count("invalidations")
+
+    def stats(self) -> dict:
+        stats = {
+            "enabled": self.backend is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+        if self.backend is not None:
+            stats.update(self.backend.stats())
+        return stats
+
+
+def create_backend():
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return None
+    if settings.RESPONSE_CACHE_URL:
+        return RedisBackend(settings.RESPONSE_CACHE_URL, settings.RESPONSE_CACHE_TTL)
+    return LocalBackend(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL)
+
+
+response_cache = ResponseCache(create_backend())
+
+
+def tag(model) -> str:
+    return model.__tablename__
+
+
+@functools.lru_cache(maxsize=None)
+def deleted_tags(model) -> Tuple[str, ...]:
+    """Теги записи и всего, что удаляется вместе с ней (cascade delete в моделях)"""
+    tags = [tag(model)]
+    for relationship in inspect(model).relationships:
+        if relationship.cascade.delete:
+            tags += [name for name in deleted_tags(relationship.mapper.class_) if name not in tags]
+    return tuple(tags)
+
+
+def invalidate(*models) -> None:
+    """Сброс списков после записи моделей models (вызывать после commit)"""
+    response_cache.invalidate(*{tag(model) for model in models})
+
+
+def invalidate_deleted(model) -> None:
+    response_cache.invalidate(*deleted_tags(model))
+
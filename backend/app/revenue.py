@@ -0,0 +1,166 @@
+"""
+Сводка выручки по месяцам, клиентам и проектам (таблица revenue_rollup).
+
+Строка - число счетов и их сумма (total) по ключу (месяц выставления
+issue_date, клиент, проект, статус). Как и счетчики app/summary.py,
+сводка обновляется инкрементально в той же транзакции, что и запись:
+ORM-изменения счетов (создание, правка, позиции, оплата, удаление, в том
+числе каскадное) учитывает обработчик after_flush, массовые UPDATE мимо
+ORM (планировщик) вызывают bump() сами. Отчет GET /api/reports/revenue
+читает только эту таблицу.
+
+Использование:
+  python -m app.revenue           # полный пересчет
+  python -m app.revenue --check   # сверка со счетами, код 1 при расхождении
+"""
+import argparse
+import sys
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import delete, event, inspect, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models import Invoice, RevenueRollup
+from app.summary import committed_value
+
+_table = RevenueRollup.__table__
+
+# (месяц, клиент, проект, статус)
+Key = Tuple[str, int, int, str]
+
+# Поля счета, от которых зависят ключ и сумма
+TRACKED_FIELDS = ("issue_date", "client_id", "project_id", "status", "total")
+
+# Точность сравнения сумм при сверке
+TOLERANCE = 0.005
+
+# Строк в одном INSERT: 6 параметров на строку, у SQLite предел 32766 параметров
+BUMP_BATCH_SIZE = 1000
+
+
+def rollup_key(issue_date, client_id, project_id, status) -> Key:
+    status = getattr(status, "value", status)
+    month = issue_date.strftime("%Y-%m") if issue_date else ""
+    return month, client_id or 0, project_id or 0, str(status)
+
+
+def _merge(deltas: Dict[Key, List[float]], key: Key, amount, sign: int) -> None:
+    deltas[key][0] += sign
+    deltas[key][1] += sign * (amount or 0)
+
+
+def bump(conn: Connection, deltas: Dict[Key, List[float]]) -> None:
+    """Атомарное приращение строк сводки: INSERT ... ON CONFLICT DO UPDATE"""
+    # Строки по порядку ключа - как в summary.bump: одинаковый порядок блокировок
+    rows = [
+        {"month": key[0], "client_id": key[1], "project_id": key[2], "status": key[3],
+         "invoices": int(count), "amount": amount}
+        for key, (count, amount) in sorted(deltas.items()) if count or amount
+    ]
+    if not rows:
+        return
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    for start in range(0, len(rows), BUMP_BATCH_SIZE):
+        stmt = insert(_table).values(rows[start:start + BUMP_BATCH_SIZE])
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=["month", "client_id", "project_id", "status"],
+            set_={"invoices": _table.c.invoices + stmt.excluded.invoices,
+                  "amount": _table.c.amount + stmt.excluded.amount},
+        ))
+
+
+def _committed_key(obj) -> Key:
+    return rollup_key(*(committed_value(obj, name) for name in TRACKED_FIELDS[:4]))
+
+
+@event.listens_for(Session, "after_flush")
+def _track_changes(session: Session, flush_context) -> None:
+    # Порядок и приемы - как у счетчиков сводки (app/summary.py)
+    deltas: Dict[Key, List[float]] = defaultdict(lambda: [0, 0.0])
+    for obj in session.new:
+        if isinstance(obj, Invoice):
+            _merge(deltas, rollup_key(obj.issue_date, obj.client_id, obj.project_id, obj.status), obj.total, 1)
+    for obj in session.deleted:
+        if isinstance(obj, Invoice):
+            _merge(deltas, _committed_key(obj), committed_value(obj, "total"), -1)
+    for obj in session.dirty:
+        if not isinstance(obj, Invoice) or obj in session.deleted:
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[name].history.has_changes() for name in TRACKED_FIELDS):
+            continue
+        _merge(deltas, _committed_key(obj), committed_value(obj, "total"), -1)
+        _merge(deltas, rollup_key(obj.issue_date, obj.client_id, obj.project_id, obj.status), obj.total, 1)
+    if deltas:
+        bump(session.connection(), deltas)
+
+
+def deltas_for_transition(rows: Iterable, old_status, new_status) -> Dict[Key, List[float]]:
+    """Приращения для массовой смены статуса: строки (issue_date, client_id, project_id, total) из RETURNING"""
+    deltas: Dict[Key, List[float]] = defaultdict(lambda: [0, 0.0])
+    for issue_date, client_id, project_id, total in rows:
+        _merge(deltas, rollup_key(issue_date, client_id, project_id, old_status), total, -1)
+        _merge(deltas, rollup_key(issue_date, client_id, project_id, new_status), total, 1)
+    return deltas
+
+
+def compute(conn: Connection, batch_size: int = 10000) -> Dict[Key, List[float]]:
+    """Сводка с нуля по таблице invoices (потоком, ключ - тот же rollup_key)"""
+    rollup: Dict[Key, List[float]] = defaultdict(lambda: [0, 0.0])
+    columns = [getattr(Invoice, name) for name in TRACKED_FIELDS]
+    result = conn.execution_options(yield_per=batch_size).execute(select(*columns))
+    for issue_date, client_id, project_id, status, total in result:
+        _merge(rollup, rollup_key(issue_date, client_id, project_id, status), total, 1)
+    return rollup
+
+
+def stored(conn: Connection) -> Dict[Key, List[float]]:
+    rows = conn.execute(select(
+        _table.c.month, _table.c.client_id, _table.c.project_id, _table.c.status,
+        _table.c.invoices, _table.c.amount,
+    ))
+    return {tuple(row[:4]): [row[4], row[5]] for row in rows if row[4] or row[5]}
+
+
+def rebuild(conn: Connection) -> int:
+    """Полный пересчет сводки; транзакцией управляет вызывающий"""
+    rollup = compute(conn)
+    conn.execute(delete(_table))
+    bump(conn, rollup)
+    return len(rollup)
+
+
+def check(conn: Connection) -> List[str]:
+    """Расхождения сводки со счетами (пустой список - сводка верна)"""
+    expected, actual = compute(conn), stored(conn)
+    problems = []
+    for key in sorted(set(expected) | set(actual)):
+        want, have = expected.get(key, [0, 0.0]), actual.get(key, [0, 0.0])
+        if want[0] != have[0] or abs(want[1] - have[1]) > TOLERANCE:
+            problems.append(f"{key}: счетов {have[0]} (ожидалось {want[0]}), сумма {have[1]:.2f} (ожидалось {want[1]:.2f})")
+    return problems
+
+
+if __name__ == "__main__":
+    from app.database import Base, engine
+
+    parser = argparse.ArgumentParser(description="Пересчет и сверка сводки выручки")
+    parser.add_argument("--check", action="store_true", help="только сверить со счетами")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    if args.check:
+        with engine.connect() as conn:
+            problems = check(conn)
+        for problem in problems:
+            print(problem)
+        print(f"Расхождений: {len(problems)}")
+        sys.exit(1 if problems else 0)
+    with engine.begin() as conn:
+        count = rebuild(conn)
+    print(f"Пересчитано строк сводки: {count}")
@@ -9,8 +9,10 @@ from app.auth import (
     create_access_token,
     get_current_user,
     get_current_admin_user,
-    get_password_hash
+    get_password_hash,
+    invalidate_user
 )
+from app.database import settings
 
 router = APIRouter()
 
@@ -30,9 +32,10 @@ def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Обновляем last_login
+    # Обновляем last_login (и хеш пароля, если он был пересчитан)
     user.last_login = datetime.utcnow()
     db.commit()
+    invalidate_user(user.id)
     
     # Создаем токен
     access_token = create_access_token(data={
@@ -71,14 +74,22 @@ def register(
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    invalidate_user(new_user.id)
     
     return new_user
 
 @router.get("/me", response_model=UserSchema)
 def get_me(
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """
     Получить информацию о текущем пользователе
     """
+    # В stateless-режиме в токене только id, username и роль
+    if settings.AUTH_STATELESS:
+        user = db.query(User).filter(User.id == current_user.id).first()
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        return user
     return current_user
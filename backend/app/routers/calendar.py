@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Optional
+from datetime import date
+from app import crud, models
+from app.schemas import CalendarEvent
+from app.database import AsyncDB, get_async_db
+from app.response_cache import response_cache, tag
+from app.serialization import render
+
+router = APIRouter()
+
+# Теги кэша: календарь сбрасывается записью задач, счетов и КП
+CALENDAR_CACHE_TAGS = (tag(models.Task), tag(models.Invoice), tag(models.Proposal))
+
+@router.get("", response_model=List[CalendarEvent])
+async def get_calendar(
+    request: Request,
+    response: Response,
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to"),
+    assignee: Optional[str] = None,
+    db: AsyncDB = Depends(get_async_db)
+):
+    """
+    События календаря в диапазоне дат (включительно): сроки задач, сроки
+    оплаты счетов и окончание действия КП, по возрастанию даты
+
+    assignee - только задачи исполнителя. Диапазон - не больше 366 дней
+    """
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="'to' must not be earlier than 'from'")
+    if (date_to - date_from).days >= crud.CALENDAR_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range must not exceed {crud.CALENDAR_MAX_DAYS} days")
+    key, cached = await response_cache.alookup(request, CALENDAR_CACHE_TAGS)
+    if cached:
+        return cached
+    events = await crud.aio.get_calendar_events(db, date_from, date_to, assignee)
+    return await response_cache.astore(key, render(List[CalendarEvent], events), response)
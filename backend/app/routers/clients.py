@@ -1,84 +1,161 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app import crud
-from app.schemas import Client, ClientCreate, ClientUpdate, Contact, ContactCreate
-from app.database import get_db
+import shutil
+import tempfile
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional, Union
+from app import crud, client_import, conditional, models
+from app.schemas import Client, ClientSummary, ClientCreate, ClientUpdate, Contact, ContactCreate, ClientImportJob
+from app.database import AsyncDB, get_async_db, settings
+from app.pagination import set_next_cursor
+from app.export import FORMAT_PATTERN, export_response
+from app.response_cache import response_cache
+from app.fields import FIELDS_DESCRIPTION, select_fields
+from app.serialization import render
 
 router = APIRouter()
 
-@router.get("", response_model=List[Client])
-def list_clients(
+@router.get("", response_model=Union[List[Client], List[ClientSummary]])
+async def list_clients(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Получить список всех клиентов
+
+    Курсор следующей страницы отдается в заголовке X-Next-Cursor. С
+    If-None-Match и неизменившимся списком - ответ 304 без тела.
+    fields=summary - компактные строки (ClientSummary), fields=id,name,... -
+    только эти поля; остальные колонки не читаются из БД
+    """
+    selection = select_fields(Client, ClientSummary, fields)
+    key, cached = await response_cache.alookup(request, crud.CLIENT_CACHE_TAGS)
+    if cached:
+        return cached
+    validators = await crud.aio.get_list_validators(db, crud.clients_query, request.url.query)
+    cached = conditional.not_modified(request, validators)
+    if cached:
+        return cached
+    clients = await crud.aio.get_clients(db, skip=skip, limit=limit, cursor=cursor, fields=selection.names)
+    set_next_cursor(response, clients, crud.CLIENT_ORDER, limit)
+    conditional.set_validators(response, validators)
+    return await response_cache.astore(key, render(List[selection.schema], clients), response)
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_clients(export_format: str = Query("ndjson", alias="format", pattern=FORMAT_PATTERN)):
+    """
+    Выгрузка клиентов с контактами в NDJSON или CSV потоком
+    """
+    return export_response("clients", lambda db: crud.clients_query(db).order_by(*crud.CLIENT_ORDER),
+                           models.Client, export_format, nested=("contacts",))
+
+@router.post("/import", response_model=ClientImportJob, status_code=202)
+async def import_clients(
+    file: UploadFile = File(...),
+    chunk_size: int = Query(settings.IMPORT_CHUNK_SIZE, ge=1, le=5000),
+):
     """
-    clients = crud.get_clients(db, skip=skip, limit=limit)
-    return clients
+    Импорт клиентов и контактов из CSV или XLSX
+
+    Файл обрабатывается в фоне пачками по chunk_size строк, каждая пачка в
+    своей транзакции. Ответ сразу возвращает задание; прогресс и отчет об
+    ошибках по строкам - GET /api/clients/import/{job_id}
+    """
+    file_format = client_import.detect_format(file.filename)
+    if file_format is None:
+        raise HTTPException(status_code=400, detail="Supported formats: .csv, .xlsx")
+    # Загрузка уже лежит во временном файле Starlette, но он закрывается
+    # вместе с запросом: копируем блоками в свой
+    target = tempfile.NamedTemporaryFile(suffix="." + file_format, delete=False)
+    with target:
+        await run_in_threadpool(shutil.copyfileobj, file.file, target, 1024 * 1024)
+    return client_import.start_import(target.name, file.filename, file_format, chunk_size)
+
+@router.get("/import/{job_id}", response_model=ClientImportJob)
+async def get_import_job(job_id: str):
+    """
+    Состояние задания импорта: прогресс, счетчики и ошибки по строкам
+    """
+    job = client_import.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
 
 @router.get("/{client_id}", response_model=Client)
-def get_client(
+async def get_client(
     client_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Получить детальную информацию о клиенте
+
+    С If-None-Match / If-Modified-Since и неизменившимся клиентом - ответ 304
     """
-    client = crud.get_client(db, client_id)
+    if conditional.is_conditional(request):
+        validators = await crud.aio.get_record_validators(db, models.Client, client_id)
+        cached = validators and conditional.not_modified(request, validators)
+        if cached:
+            return cached
+    client = await crud.aio.get_client(db, client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
+    conditional.set_validators(response, conditional.record_validators(models.Client, client.id, client.updated_at))
     return client
 
 @router.post("", response_model=Client)
-def create_client(
+async def create_client(
     client: ClientCreate,
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Создать нового клиента
     """
-    return crud.create_client(db, client)
+    return await crud.aio.create_client(db, client)
 
 @router.put("/{client_id}", response_model=Client)
-def update_client(
+async def update_client(
     client_id: int,
     client: ClientUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Обновить информацию о клиенте
     """
-    updated_client = crud.update_client(db, client_id, client)
+    updated_client = await crud.aio.update_client(db, client_id, client)
     if not updated_client:
         raise HTTPException(status_code=404, detail="Client not found")
     return updated_client
 
 @router.delete("/{client_id}")
-def delete_client(
+async def delete_client(
     client_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Удалить клиента
     """
-    success = crud.delete_client(db, client_id)
+    success = await crud.aio.delete_client(db, client_id)
     if not success:
         raise HTTPException(status_code=404, detail="Client not found")
     return {"message": "Client deleted successfully"}
 
 @router.post("/{client_id}/contacts", response_model=Contact)
-def add_contact(
+async def add_contact(
     client_id: int,
     contact: ContactCreate,
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Добавить контакт к клиенту
     """
-    client = crud.get_client(db, client_id)
+    client = await crud.aio.get_client(db, client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
-    return crud.create_contact(db, client_id, contact)
+    return await crud.aio.create_contact(db, client_id, contact)
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends
+from app import crud
+from app.schemas import DashboardSummary
+from app.database import AsyncDB, get_async_db
+
+router = APIRouter()
+
+@router.get("/summary", response_model=DashboardSummary)
+async def get_summary(db: AsyncDB = Depends(get_async_db)):
+    """
+    Сводка для главной панели: количества по статусам, суммы счетов и КП,
+    задачи на неделю
+
+    Числа берутся из таблицы summary_counters (обновляется при записи),
+    поэтому время ответа не зависит от объема данных
+    """
+    return await crud.aio.get_dashboard_summary(db)
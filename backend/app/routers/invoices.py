@@ -1,47 +1,82 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional, Sequence, Union
 from datetime import datetime, timedelta
 
 from app.database import get_db
 from app.models.invoice import Invoice, InvoiceItem, InvoiceStatus
-from app.schemas.invoice import Invoice as InvoiceSchema, InvoiceCreate, InvoiceUpdate
+from app.schemas.invoice import (
+    Invoice as InvoiceSchema, InvoiceCreate, InvoiceUpdate, InvoiceSummary,
+    InvoiceItem as InvoiceItemSchema, InvoiceItemCreate, InvoiceItemPatch,
+)
+from app.pagination import paginate, set_next_cursor
+from app.sequences import next_value
+from app.export import FORMAT_PATTERN, export_response
+from app import conditional
+from app.crud import get_list_validators, get_record_validators
+from app.response_cache import invalidate, invalidate_deleted, response_cache, tag
+from app.fields import FIELDS_DESCRIPTION, load_options, select_fields
+from app.serialization import render
+from app.line_items import apply_item, item_errors, line_amount, lock_document, new_item, shift, sync_items
 
 router = APIRouter(
     prefix="/invoices",
     tags=["invoices"]
 )
 
+# Ключ сортировки списка (новые сверху), под него есть индекс ix_invoices_created_at_id
+INVOICE_ORDER = (Invoice.created_at, Invoice.id)
+
+# Позиции входят в схему Invoice, грузим их одним запросом на всю страницу
+INVOICE_LOAD = (selectinload(Invoice.items),)
+
+# Теги кэша списка
+INVOICE_CACHE_TAGS = (tag(Invoice),)
+
+
+def invoices_query(
+    db: Session,
+    status: Optional[InvoiceStatus] = None,
+    client_id: Optional[int] = None,
+    project_id: Optional[int] = None,
+    fields: Optional[Sequence[str]] = None,
+):
+    """Фильтры списка счетов вместе с позициями (общие для списка и выгрузки); fields - загрузить только эти поля"""
+    query = db.query(Invoice).options(*load_options(Invoice, fields, INVOICE_ORDER, INVOICE_LOAD))
+    if status:
+        query = query.filter(Invoice.status == status)
+    if client_id:
+        query = query.filter(Invoice.client_id == client_id)
+    if project_id:
+        query = query.filter(Invoice.project_id == project_id)
+    return query
+
 
 def generate_invoice_number(db: Session) -> str:
     """Генерация уникального номера счета"""
     today = datetime.now()
     prefix = f"INV-{today.year}{today.month:02d}"
     
-    # Получаем последний счет с таким префиксом
-    last_invoice = db.query(Invoice).filter(
-        Invoice.invoice_number.like(f"{prefix}%")
-    ).order_by(Invoice.id.desc()).first()
-    
-    if last_invoice:
-        last_num = int(last_invoice.invoice_number.split('-')[-1])
-        new_num = last_num + 1
-    else:
-        new_num = 1
+    def last_issued() -> int:
+        # Вызывается один раз на префикс: продолжаем нумерацию уже выданных счетов
+        last_invoice = db.query(Invoice.invoice_number).filter(
+            Invoice.invoice_number.like(f"{prefix}-%")
+        ).order_by(Invoice.invoice_number.desc()).first()
+        return int(last_invoice[0].split('-')[-1]) if last_invoice else 0
     
+    new_num = next_value(db, prefix, start=last_issued)
     return f"{prefix}-{new_num:04d}"
 
 
-def calculate_invoice_totals(invoice_data: InvoiceCreate, items: List[InvoiceItem]):
-    """Расчет итоговых сумм счета"""
-    subtotal = sum(item.quantity * item.price for item in items)
-    
+def calculate_invoice_totals(subtotal: float, discount: Optional[float], tax_rate: Optional[float]):
+    """Расчет итоговых сумм счета по сумме позиций"""
     # Применяем скидку
-    discount_amount = subtotal * (invoice_data.discount / 100)
+    discount_amount = subtotal * ((discount or 0) / 100)
     subtotal_after_discount = subtotal - discount_amount
     
     # Считаем НДС
-    tax_amount = subtotal_after_discount * (invoice_data.tax_rate / 100)
+    tax_amount = subtotal_after_discount * ((tax_rate or 0) / 100)
     
     # Итого
     total = subtotal_after_discount + tax_amount
@@ -53,46 +88,89 @@ def calculate_invoice_totals(invoice_data: InvoiceCreate, items: List[InvoiceIte
     }
 
 
-@router.get("/", response_model=List[InvoiceSchema])
+def shift_invoice_totals(db_invoice: Invoice, delta: float = 0):
+    """Сдвинуть сумму позиций счета на delta и пересчитать скидку, НДС и итог (без пересуммирования строк)"""
+    totals = calculate_invoice_totals(shift(db_invoice.subtotal, delta), db_invoice.discount, db_invoice.tax_rate)
+    for field, value in totals.items():
+        setattr(db_invoice, field, value)
+    db_invoice.updated_at = datetime.utcnow()
+
+
+def get_invoice_item(db: Session, invoice_id: int, item_id: int) -> InvoiceItem:
+    """Позиция счета для изменения; счет блокируется до конца транзакции (см. lock_document)"""
+    if not lock_document(db, Invoice, invoice_id):
+        raise HTTPException(status_code=404, detail="Invoice item not found")
+    db_item = db.query(InvoiceItem).filter(InvoiceItem.id == item_id, InvoiceItem.invoice_id == invoice_id).first()
+    if not db_item:
+        raise HTTPException(status_code=404, detail="Invoice item not found")
+    return db_item
+
+
+@router.get("/", response_model=Union[List[InvoiceSchema], List[InvoiceSummary]])
 def get_invoices(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     status: Optional[InvoiceStatus] = None,
     client_id: Optional[int] = None,
     project_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
-    """Получить список счетов с фильтрацией"""
-    query = db.query(Invoice)
-    
-    if status:
-        query = query.filter(Invoice.status == status)
-    if client_id:
-        query = query.filter(Invoice.client_id == client_id)
-    if project_id:
-        query = query.filter(Invoice.project_id == project_id)
-    
-    # Проверяем просроченные счета
-    now = datetime.utcnow()
-    overdue_invoices = query.filter(
-        Invoice.status == InvoiceStatus.SENT,
-        Invoice.due_date < now
-    ).all()
-    
-    for invoice in overdue_invoices:
-        invoice.status = InvoiceStatus.OVERDUE
-    
-    db.commit()
-    
-    return query.order_by(Invoice.created_at.desc()).offset(skip).limit(limit).all()
+    """
+    Получить список счетов с фильтрацией (курсор следующей страницы - в заголовке X-Next-Cursor, с If-None-Match - 304)
+
+    fields=summary - компактные строки (InvoiceSummary), fields=id,title,... - только эти поля
+    """
+    selection = select_fields(InvoiceSchema, InvoiceSummary, fields)
+    key, cached = response_cache.lookup(request, INVOICE_CACHE_TAGS)
+    if cached:
+        return cached
+    validators = get_list_validators(
+        db, lambda s: invoices_query(s, status, client_id, project_id), request.url.query
+    )
+    cached = conditional.not_modified(request, validators)
+    if cached:
+        return cached
+    # Просроченные счета переводит в Overdue планировщик (app/scheduler.py)
+    query = invoices_query(db, status, client_id, project_id, selection.names)
+    invoices = paginate(query, INVOICE_ORDER, skip, limit, cursor, descending=True).all()
+    set_next_cursor(response, invoices, INVOICE_ORDER, limit)
+    conditional.set_validators(response, validators)
+    return response_cache.store(key, render(List[selection.schema], invoices), response)
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_invoices(
+    status: Optional[InvoiceStatus] = None,
+    client_id: Optional[int] = None,
+    project_id: Optional[int] = None,
+    export_format: str = Query("ndjson", alias="format", pattern=FORMAT_PATTERN),
+):
+    """Выгрузка счетов с позициями в NDJSON или CSV потоком, фильтры как у списка"""
+    return export_response(
+        "invoices",
+        lambda db: invoices_query(db, status, client_id, project_id).order_by(
+            *[column.desc() for column in INVOICE_ORDER]
+        ),
+        Invoice, export_format, nested=("items",),
+    )
 
 
 @router.get("/{invoice_id}", response_model=InvoiceSchema)
-def get_invoice(invoice_id: int, db: Session = Depends(get_db)):
-    """Получить счет по ID"""
-    invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
+def get_invoice(invoice_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    """Получить счет по ID (с If-None-Match / If-Modified-Since и неизменившимся счетом - 304)"""
+    if conditional.is_conditional(request):
+        validators = get_record_validators(db, Invoice, invoice_id)
+        cached = validators and conditional.not_modified(request, validators)
+        if cached:
+            return cached
+    invoice = db.query(Invoice).options(*INVOICE_LOAD).filter(Invoice.id == invoice_id).first()
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
+    conditional.set_validators(response, conditional.record_validators(Invoice, invoice.id, invoice.updated_at))
     return invoice
 
 
@@ -122,22 +200,15 @@ def create_invoice(invoice_data: InvoiceCreate, db: Session = Depends(get_db)):
     # Создаем позиции счета
     items = []
     for item_data in invoice_data.items:
-        db_item = InvoiceItem(
-            invoice_id=db_invoice.id,
-            **item_data.dict()
-        )
+        db_item = new_item(InvoiceItem, {**item_data.dict(), "invoice_id": db_invoice.id})
         db.add(db_item)
         items.append(db_item)
     
-    db.flush()
-    
     # Рассчитываем итоги
-    totals = calculate_invoice_totals(invoice_data, items)
-    db_invoice.subtotal = totals["subtotal"]
-    db_invoice.tax_amount = totals["tax_amount"]
-    db_invoice.total = totals["total"]
+    shift_invoice_totals(db_invoice, sum(line_amount(item) for item in items))
     
     db.commit()
+    invalidate(Invoice)
     db.refresh(db_invoice)
     
     return db_invoice
@@ -145,43 +216,39 @@ def create_invoice(invoice_data: InvoiceCreate, db: Session = Depends(get_db)):
 
 @router.put("/{invoice_id}", response_model=InvoiceSchema)
 def update_invoice(invoice_id: int, invoice_data: InvoiceUpdate, db: Session = Depends(get_db)):
-    """Обновить счет"""
-    db_invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
-    if not db_invoice:
+    """
+    Обновить счет
+
+    Позиции с id изменяются (только если поменялись), без id - добавляются,
+    отсутствующие в списке - удаляются; суммы счета сдвигаются на разницу
+    """
+    # Суммы сдвигаются от прочитанных: сначала блокировка, потом чтение
+    if not lock_document(db, Invoice, invoice_id):
         raise HTTPException(status_code=404, detail="Invoice not found")
+    db_invoice = db.query(Invoice).options(*INVOICE_LOAD).filter(Invoice.id == invoice_id).first()
     
-    # Обновляем поля
-    update_data = invoice_data.dict(exclude_unset=True)
-    items_data = update_data.pop("items", None)
+    if invoice_data.items is not None:
+        errors = item_errors((item.id for item in db_invoice.items), invoice_data.items)
+        if errors:
+            raise HTTPException(status_code=422, detail=errors)
     
+    # Обновляем поля
+    update_data = invoice_data.dict(exclude_unset=True, exclude={"items"})
+    # null в скидке и НДС - без скидки и НДС
+    for field in ("discount", "tax_rate"):
+        if field in update_data and update_data[field] is None:
+            update_data[field] = 0
     for field, value in update_data.items():
         setattr(db_invoice, field, value)
     
-    # Если обновляем позиции
-    if items_data is not None:
-        # Удаляем старые позиции
-        db.query(InvoiceItem).filter(InvoiceItem.invoice_id == invoice_id).delete()
-        
-        # Создаем новые
-        items = []
-        for item_data in items_data:
-            db_item = InvoiceItem(
-                invoice_id=invoice_id,
-                **item_data.dict()
-            )
-            db.add(db_item)
-            items.append(db_item)
-        
-        db.flush()
-        
-        # Пересчитываем итоги
-        totals = calculate_invoice_totals(invoice_data, items)
-        db_invoice.subtotal = totals["subtotal"]
-        db_invoice.tax_amount = totals["tax_amount"]
-        db_invoice.total = totals["total"]
+    # Позиции - по разнице; скидка и НДС могли измениться и без них
+    delta = 0
+    if invoice_data.items is not None:
+        delta = sync_items(db_invoice.items, InvoiceItem, invoice_data.items)
+    shift_invoice_totals(db_invoice, delta)
     
-    db_invoice.updated_at = datetime.utcnow()
     db.commit()
+    invalidate(Invoice)
     db.refresh(db_invoice)
     
     return db_invoice
@@ -196,6 +263,7 @@ def delete_invoice(invoice_id: int, db: Session = Depends(get_db)):
     
     db.delete(db_invoice)
     db.commit()
+    invalidate_deleted(Invoice)
     
     return {"message": "Invoice deleted successfully"}
 
@@ -213,6 +281,51 @@ def mark_invoice_paid(invoice_id: int, payment_method: str, db: Session = Depend
     db_invoice.updated_at = datetime.utcnow()
     
     db.commit()
+    invalidate(Invoice)
     db.refresh(db_invoice)
     
     return db_invoice
+
+
+@router.post("/{invoice_id}/items", response_model=InvoiceItemSchema)
+def create_invoice_item(invoice_id: int, item_data: InvoiceItemCreate, db: Session = Depends(get_db)):
+    """Добавить позицию в счет"""
+    if not lock_document(db, Invoice, invoice_id):
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    db_invoice = db.get(Invoice, invoice_id)
+    
+    db_item = new_item(InvoiceItem, {**item_data.dict(), "invoice_id": invoice_id})
+    db.add(db_item)
+    shift_invoice_totals(db_invoice, line_amount(db_item))
+    
+    db.commit()
+    invalidate(Invoice)
+    db.refresh(db_item)
+    
+    return db_item
+
+
+@router.patch("/{invoice_id}/items/{item_id}", response_model=InvoiceItemSchema)
+def update_invoice_item(invoice_id: int, item_id: int, item_data: InvoiceItemPatch, db: Session = Depends(get_db)):
+    """Изменить позицию счета (только переданные поля)"""
+    db_item = get_invoice_item(db, invoice_id, item_id)
+    shift_invoice_totals(db_item.invoice, apply_item(db_item, item_data.dict(exclude_unset=True)))
+    
+    db.commit()
+    invalidate(Invoice)
+    db.refresh(db_item)
+    
+    return db_item
+
+
+@router.delete("/{invoice_id}/items/{item_id}")
+def delete_invoice_item(invoice_id: int, item_id: int, db: Session = Depends(get_db)):
+    """Удалить позицию счета"""
+    db_item = get_invoice_item(db, invoice_id, item_id)
+    shift_invoice_totals(db_item.invoice, -line_amount(db_item))
+    db.delete(db_item)
+    
+    db.commit()
+    invalidate(Invoice)
+    
+    return {"message": "Invoice item deleted successfully"}
@@ -1,71 +1,118 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app import crud
-from app.schemas import Project, ProjectCreate, ProjectUpdate
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Union
+from app import crud, conditional, models
+from app.schemas import Project, ProjectSummary, ProjectCreate, ProjectUpdate
+from app.database import AsyncDB, get_async_db
+from app.pagination import set_next_cursor
+from app.export import FORMAT_PATTERN, export_response
+from app.response_cache import response_cache
+from app.fields import FIELDS_DESCRIPTION, select_fields
+from app.serialization import render
 
 router = APIRouter()
 
-@router.get("", response_model=List[Project])
-def list_projects(
+@router.get("", response_model=Union[List[Project], List[ProjectSummary]])
+async def list_projects(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     client_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Получить список проектов
+
+    Курсор следующей страницы отдается в заголовке X-Next-Cursor. С
+    If-None-Match и неизменившимся списком - ответ 304 без тела.
+    fields=summary - компактные строки (ProjectSummary), fields=id,name,... -
+    только эти поля; остальные колонки не читаются из БД
     """
-    projects = crud.get_projects(db, skip=skip, limit=limit, client_id=client_id)
-    return projects
+    selection = select_fields(Project, ProjectSummary, fields)
+    key, cached = await response_cache.alookup(request, crud.PROJECT_CACHE_TAGS)
+    if cached:
+        return cached
+    validators = await crud.aio.get_list_validators(
+        db, lambda s: crud.projects_query(s, client_id), request.url.query
+    )
+    cached = conditional.not_modified(request, validators)
+    if cached:
+        return cached
+    projects = await crud.aio.get_projects(db, skip=skip, limit=limit, client_id=client_id, cursor=cursor, fields=selection.names)
+    set_next_cursor(response, projects, crud.PROJECT_ORDER, limit)
+    conditional.set_validators(response, validators)
+    return await response_cache.astore(key, render(List[selection.schema], projects), response)
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_projects(
+    client_id: Optional[int] = None,
+    export_format: str = Query("ndjson", alias="format", pattern=FORMAT_PATTERN),
+):
+    """
+    Выгрузка проектов в NDJSON или CSV потоком, фильтры как у списка
+    """
+    return export_response("projects", lambda db: crud.projects_query(db, client_id).order_by(*crud.PROJECT_ORDER),
+                           models.Project, export_format)
 
 @router.get("/{project_id}", response_model=Project)
-def get_project(
+async def get_project(
     project_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Получить детальную информацию о проекте
+
+    С If-None-Match / If-Modified-Since и неизменившейся записью - ответ 304
     """
-    project = crud.get_project(db, project_id)
+    if conditional.is_conditional(request):
+        validators = await crud.aio.get_record_validators(db, models.Project, project_id)
+        cached = validators and conditional.not_modified(request, validators)
+        if cached:
+            return cached
+    project = await crud.aio.get_project(db, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
+    conditional.set_validators(response, conditional.record_validators(models.Project, project.id, project.updated_at))
     return project
 
 @router.post("", response_model=Project)
-def create_project(
+async def create_project(
     project: ProjectCreate,
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Создать новый проект
     """
-    return crud.create_project(db, project)
+    return await crud.aio.create_project(db, project)
 
 @router.put("/{project_id}", response_model=Project)
-def update_project(
+async def update_project(
     project_id: int,
     project: ProjectUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Обновить информацию о проекте
     """
-    updated_project = crud.update_project(db, project_id, project)
+    updated_project = await crud.aio.update_project(db, project_id, project)
     if not updated_project:
         raise HTTPException(status_code=404, detail="Project not found")
     return updated_project
 
 @router.delete("/{project_id}")
-def delete_project(
+async def delete_project(
     project_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Удалить проект
     """
-    success = crud.delete_project(db, project_id)
+    success = await crud.aio.delete_project(db, project_id)
     if not success:
         raise HTTPException(status_code=404, detail="Project not found")
     return {"message": "Project deleted successfully"}
@@ -1,91 +1,190 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app import crud
-from app.schemas import Proposal, ProposalCreate, ProposalUpdate
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Union
+from app import crud, conditional, models
+from app.schemas import Proposal, ProposalSummary, ProposalCreate, ProposalUpdate, ProposalItem, ProposalItemCreate, ProposalItemPatch
+from app.database import AsyncDB, get_async_db
+from app.pagination import set_next_cursor
+from app.export import FORMAT_PATTERN, export_response
+from app.response_cache import response_cache
+from app.fields import FIELDS_DESCRIPTION, select_fields
+from app.serialization import render
 
 router = APIRouter()
 
-@router.get("", response_model=List[Proposal])
-def list_proposals(
+@router.get("", response_model=Union[List[Proposal], List[ProposalSummary]])
+async def list_proposals(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     client_id: Optional[int] = None,
     status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Получить список коммерческих предложений
+
+    Курсор следующей страницы отдается в заголовке X-Next-Cursor. С
+    If-None-Match и неизменившимся списком - ответ 304 без тела.
+    fields=summary - компактные строки (ProposalSummary), fields=id,name,... -
+    только эти поля; остальные колонки не читаются из БД
     """
-    proposals = crud.get_proposals(
+    selection = select_fields(Proposal, ProposalSummary, fields)
+    key, cached = await response_cache.alookup(request, crud.PROPOSAL_CACHE_TAGS)
+    if cached:
+        return cached
+    validators = await crud.aio.get_list_validators(
+        db, lambda s: crud.proposals_query(s, client_id, status), request.url.query
+    )
+    cached = conditional.not_modified(request, validators)
+    if cached:
+        return cached
+    proposals = await crud.aio.get_proposals(
         db, 
         skip=skip, 
         limit=limit,
         client_id=client_id,
-        status=status
+        status=status,
+        cursor=cursor,
+        fields=selection.names
+    )
+    set_next_cursor(response, proposals, crud.PROPOSAL_ORDER, limit)
+    conditional.set_validators(response, validators)
+    return await response_cache.astore(key, render(List[selection.schema], proposals), response)
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_proposals(
+    client_id: Optional[int] = None,
+    status: Optional[str] = None,
+    export_format: str = Query("ndjson", alias="format", pattern=FORMAT_PATTERN),
+):
+    """
+    Выгрузка КП с позициями в NDJSON или CSV потоком, фильтры как у списка
+    """
+    return export_response(
+        "proposals",
+        lambda db: crud.proposals_query(db, client_id, status).order_by(*crud.PROPOSAL_ORDER),
+        models.Proposal, export_format, nested=("items",),
     )
-    return proposals
 
 @router.get("/{proposal_id}", response_model=Proposal)
-def get_proposal(
+async def get_proposal(
     proposal_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Получить детальную информацию о коммерческом предложении
+
+    С If-None-Match / If-Modified-Since и неизменившейся записью - ответ 304
     """
-    proposal = crud.get_proposal(db, proposal_id)
+    if conditional.is_conditional(request):
+        validators = await crud.aio.get_record_validators(db, models.Proposal, proposal_id)
+        cached = validators and conditional.not_modified(request, validators)
+        if cached:
+            return cached
+    proposal = await crud.aio.get_proposal(db, proposal_id)
     if not proposal:
         raise HTTPException(status_code=404, detail="Proposal not found")
+    conditional.set_validators(response, conditional.record_validators(models.Proposal, proposal.id, proposal.updated_at))
     return proposal
 
 @router.post("", response_model=Proposal)
-def create_proposal(
+async def create_proposal(
     proposal: ProposalCreate,
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Создать новое коммерческое предложение
     """
-    return crud.create_proposal(db, proposal)
+    return await crud.aio.create_proposal(db, proposal)
 
 @router.put("/{proposal_id}", response_model=Proposal)
-def update_proposal(
+async def update_proposal(
     proposal_id: int,
     proposal: ProposalUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Обновить коммерческое предложение
+
+    Позиции с id изменяются (только если поменялись), без id - добавляются,
+    отсутствующие в списке - удаляются; сумма КП сдвигается на разницу
     """
-    updated_proposal = crud.update_proposal(db, proposal_id, proposal)
+    updated_proposal = await crud.aio.update_proposal(db, proposal_id, proposal)
     if not updated_proposal:
         raise HTTPException(status_code=404, detail="Proposal not found")
     return updated_proposal
 
 @router.delete("/{proposal_id}")
-def delete_proposal(
+async def delete_proposal(
     proposal_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Удалить коммерческое предложение
     """
-    success = crud.delete_proposal(db, proposal_id)
+    success = await crud.aio.delete_proposal(db, proposal_id)
     if not success:
         raise HTTPException(status_code=404, detail="Proposal not found")
     return {"message": "Proposal deleted successfully"}
 
 @router.patch("/{proposal_id}/send", response_model=Proposal)
-def send_proposal(
+async def send_proposal(
     proposal_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Отправить коммерческое предложение клиенту
     """
-    proposal = crud.send_proposal(db, proposal_id)
+    proposal = await crud.aio.send_proposal(db, proposal_id)
     if not proposal:
         raise HTTPException(status_code=404, detail="Proposal not found")
     return proposal
+
+@router.post("/{proposal_id}/items", response_model=ProposalItem)
+async def create_proposal_item(
+    proposal_id: int,
+    item: ProposalItemCreate,
+    db: AsyncDB = Depends(get_async_db)
+):
+    """
+    Добавить позицию в коммерческое предложение
+    """
+    db_item = await crud.aio.create_proposal_item(db, proposal_id, item)
+    if not db_item:
+        raise HTTPException(status_code=404, detail="Proposal not found")
+    return db_item
+
+@router.patch("/{proposal_id}/items/{item_id}", response_model=ProposalItem)
+async def update_proposal_item(
+    proposal_id: int,
+    item_id: int,
+    item: ProposalItemPatch,
+    db: AsyncDB = Depends(get_async_db)
+):
+    """
+    Изменить позицию коммерческого предложения (только переданные поля)
+    """
+    db_item = await crud.aio.update_proposal_item(db, proposal_id, item_id, item)
+    if not db_item:
+        raise HTTPException(status_code=404, detail="Proposal item not found")
+    return db_item
+
+@router.delete("/{proposal_id}/items/{item_id}")
+async def delete_proposal_item(
+    proposal_id: int,
+    item_id: int,
+    db: AsyncDB = Depends(get_async_db)
+):
+    """
+    Удалить позицию коммерческого предложения
+    """
+    success = await crud.aio.delete_proposal_item(db, proposal_id, item_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Proposal item not found")
+    return {"message": "Proposal item deleted successfully"}
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, Query, Request, Response
+from typing import List, Literal, Optional
+from app import crud, models
+from app.models import InvoiceStatus
+from app.schemas import RevenueRow
+from app.database import AsyncDB, get_async_db
+from app.response_cache import response_cache, tag
+from app.serialization import render
+
+router = APIRouter()
+
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+# Сводка меняется только вместе со счетами
+REVENUE_CACHE_TAGS = (tag(models.Invoice),)
+
+@router.get("/revenue", response_model=List[RevenueRow])
+async def revenue_report(
+    request: Request,
+    response: Response,
+    month_from: Optional[str] = Query(None, alias="from", pattern=MONTH_PATTERN),
+    month_to: Optional[str] = Query(None, alias="to", pattern=MONTH_PATTERN),
+    group_by: List[Literal["month", "client", "project", "status"]] = Query(["month"]),
+    status: Optional[InvoiceStatus] = None,
+    client_id: Optional[int] = None,
+    project_id: Optional[int] = None,
+    db: AsyncDB = Depends(get_async_db)
+):
+    """
+    Выручка по счетам: число счетов и сумма по месяцу выставления (from/to -
+    YYYY-MM включительно), клиенту, проекту и статусу
+
+    group_by можно передать несколько раз (group_by=month&group_by=client).
+    Отчет читает таблицу revenue_rollup, время ответа не зависит от числа счетов
+    """
+    key, cached = await response_cache.alookup(request, REVENUE_CACHE_TAGS)
+    if cached:
+        return cached
+    rows = await crud.aio.get_revenue(
+        db, month_from, month_to, group_by,
+        status=status.value if status else None, client_id=client_id, project_id=project_id,
+    )
+    return await response_cache.astore(key, render(List[RevenueRow], rows), response)
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List, Literal, Optional
+from app import crud
+from app.schemas import SearchResult
+from app.database import AsyncDB, get_async_db
+
+router = APIRouter()
+
+@router.get("", response_model=List[SearchResult])
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Optional[List[Literal["client", "project", "task", "proposal", "invoice"]]] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncDB = Depends(get_async_db)
+):
+    """
+    Полнотекстовый поиск по клиентам, проектам, задачам, КП и счетам
+
+    Слова запроса ищутся по основе и префиксу («клиент» найдет «клиентами»),
+    результаты отсортированы по релевантности. kind можно передать
+    несколько раз, чтобы ограничить типы
+    """
+    return await crud.aio.search_documents(db, q, kinds=kind, skip=skip, limit=limit)
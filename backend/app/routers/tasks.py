@@ -1,93 +1,181 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app import crud
-from app.schemas import Task, TaskCreate, TaskUpdate
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Union
+from app import crud, conditional, models
+from app.schemas import Task, TaskSummary, TaskCreate, TaskUpdate, TaskBulkCreate, TaskBulkUpdate, TaskBulkComplete
+from app.database import AsyncDB, get_async_db
+from app.pagination import set_next_cursor
+from app.export import FORMAT_PATTERN, export_response
+from app.response_cache import response_cache
+from app.fields import FIELDS_DESCRIPTION, select_fields
+from app.serialization import json_response, render
 
 router = APIRouter()
 
-@router.get("", response_model=List[Task])
-def list_tasks(
+@router.get("", response_model=Union[List[Task], List[TaskSummary]])
+async def list_tasks(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     project_id: Optional[int] = None,
     client_id: Optional[int] = None,
     status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Получить список задач
+
+    Курсор следующей страницы отдается в заголовке X-Next-Cursor. С
+    If-None-Match и неизменившимся списком - ответ 304 без тела.
+    fields=summary - компактные строки (TaskSummary), fields=id,name,... -
+    только эти поля; остальные колонки не читаются из БД
     """
-    tasks = crud.get_tasks(
+    selection = select_fields(Task, TaskSummary, fields)
+    key, cached = await response_cache.alookup(request, crud.TASK_CACHE_TAGS)
+    if cached:
+        return cached
+    validators = await crud.aio.get_list_validators(
+        db, lambda s: crud.tasks_query(s, project_id, client_id, status), request.url.query
+    )
+    cached = conditional.not_modified(request, validators)
+    if cached:
+        return cached
+    tasks = await crud.aio.get_tasks(
         db, 
         skip=skip, 
         limit=limit, 
         project_id=project_id,
         client_id=client_id,
-        status=status
+        status=status,
+        cursor=cursor,
+        fields=selection.names
+    )
+    set_next_cursor(response, tasks, crud.TASK_ORDER, limit)
+    conditional.set_validators(response, validators)
+    return await response_cache.astore(key, render(List[selection.schema], tasks), response)
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_tasks(
+    project_id: Optional[int] = None,
+    client_id: Optional[int] = None,
+    status: Optional[str] = None,
+    export_format: str = Query("ndjson", alias="format", pattern=FORMAT_PATTERN),
+):
+    """
+    Выгрузка задач в NDJSON или CSV потоком, фильтры как у списка
+    """
+    return export_response(
+        "tasks",
+        lambda db: crud.tasks_query(db, project_id, client_id, status).order_by(*crud.TASK_ORDER),
+        models.Task, export_format,
     )
-    return tasks
 
 @router.get("/{task_id}", response_model=Task)
-def get_task(
+async def get_task(
     task_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Получить детальную информацию о задаче
+
+    С If-None-Match / If-Modified-Since и неизменившейся записью - ответ 304
     """
-    task = crud.get_task(db, task_id)
+    if conditional.is_conditional(request):
+        validators = await crud.aio.get_record_validators(db, models.Task, task_id)
+        cached = validators and conditional.not_modified(request, validators)
+        if cached:
+            return cached
+    task = await crud.aio.get_task(db, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+    conditional.set_validators(response, conditional.record_validators(models.Task, task.id, task.updated_at))
     return task
 
 @router.post("", response_model=Task)
-def create_task(
+async def create_task(
     task: TaskCreate,
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Создать новую задачу
     """
-    return crud.create_task(db, task)
+    return await crud.aio.create_task(db, task)
+
+@router.post("/bulk", response_model=List[Task])
+async def create_tasks_bulk(
+    payload: TaskBulkCreate,
+    db: AsyncDB = Depends(get_async_db)
+):
+    """
+    Создать пакет задач (до 1000) одним запросом
+
+    Пакет проверяется целиком: при ошибке в любой строке ничего не
+    создается, ответ 422 с ошибками по строкам. Результат - задачи в
+    порядке строк запроса
+    """
+    return json_response(List[Task], await crud.aio.create_tasks(db, payload.items))
+
+@router.patch("/bulk", response_model=List[Task])
+async def update_tasks_bulk(
+    payload: TaskBulkUpdate,
+    db: AsyncDB = Depends(get_async_db)
+):
+    """
+    Обновить пакет задач: в каждой строке id и изменяемые поля
+    """
+    return json_response(List[Task], await crud.aio.update_tasks(db, payload.items))
+
+@router.post("/bulk-complete", response_model=List[Task])
+async def complete_tasks_bulk(
+    payload: TaskBulkComplete,
+    db: AsyncDB = Depends(get_async_db)
+):
+    """
+    Отметить пакет задач как выполненные
+    """
+    return json_response(List[Task], await crud.aio.complete_tasks(db, payload.ids))
 
 @router.put("/{task_id}", response_model=Task)
-def update_task(
+async def update_task(
     task_id: int,
     task: TaskUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Обновить информацию о задаче
     """
-    updated_task = crud.update_task(db, task_id, task)
+    updated_task = await crud.aio.update_task(db, task_id, task)
     if not updated_task:
         raise HTTPException(status_code=404, detail="Task not found")
     return updated_task
 
 @router.delete("/{task_id}")
-def delete_task(
+async def delete_task(
     task_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Удалить задачу
     """
-    success = crud.delete_task(db, task_id)
+    success = await crud.aio.delete_task(db, task_id)
     if not success:
         raise HTTPException(status_code=404, detail="Task not found")
     return {"message": "Task deleted successfully"}
 
 @router.patch("/{task_id}/complete", response_model=Task)
-def complete_task(
+async def complete_task(
     task_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
     """
     Отметить задачу как выполненную
     """
-    task = crud.complete_task(db, task_id)
+    task = await crud.aio.complete_task(db, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     return task
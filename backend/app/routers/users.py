@@ -5,7 +5,7 @@ from datetime import datetime
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import User as UserSchema, UserUpdate
-from app.auth import get_current_admin_user, get_password_hash
+from app.auth import get_current_admin_user, get_password_hash, invalidate_user
 
 router = APIRouter()
 
@@ -68,6 +68,7 @@ def update_user(
     user.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(user)
+    invalidate_user(user_id)
     
     return user
 
@@ -96,5 +97,6 @@ def delete_user(
     
     db.delete(user)
     db.commit()
+    invalidate_user(user_id)
     
     return {"message": "User deleted successfully"}
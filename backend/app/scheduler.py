@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from datetime import datetime, date
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, settings
+from app.models import Invoice, InvoiceStatus, Proposal
+from app.summary import bump, deltas_for_transition
+from app import revenue
+from app.response_cache import invalidate
+
+logger = logging.getLogger(__name__)
+
+# Статусы КП, которые еще ждут ответа клиента и могут истечь
+PENDING_PROPOSAL_STATUSES = ("draft", "sent")
+
+
+def mark_overdue_invoices(db: Session) -> int:
+    """Перевод отправленных счетов с прошедшим сроком оплаты в Overdue одним UPDATE"""
+    now = datetime.utcnow()
+    rows = db.execute(
+        update(Invoice)
+        .where(Invoice.status == InvoiceStatus.SENT, Invoice.due_date < now)
+        .values(status=InvoiceStatus.OVERDUE, updated_at=now)
+        .returning(Invoice.issue_date, Invoice.client_id, Invoice.project_id, Invoice.total)
+        .execution_options(synchronize_session=False)
+    ).all()
+    # UPDATE мимо ORM: счетчики сводки и сводку выручки обновляем сами
+    totals = [row.total for row in rows]
+    bump(db.connection(), deltas_for_transition("invoices", InvoiceStatus.SENT, InvoiceStatus.OVERDUE, totals))
+    revenue.bump(db.connection(), revenue.deltas_for_transition(rows, InvoiceStatus.SENT, InvoiceStatus.OVERDUE))
+    return len(rows)
+
+
+def expire_proposals(db: Session) -> int:
+    """Перевод КП с истекшим valid_until в статус expired (UPDATE на каждый исходный статус)"""
+    now = datetime.utcnow()
+    changed = 0
+    for status in PENDING_PROPOSAL_STATUSES:
+        totals = db.execute(
+            update(Proposal)
+            .where(Proposal.status == status, Proposal.valid_until < date.today())
+            .values(status="expired", updated_at=now)
+            .returning(Proposal.total)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        bump(db.connection(), deltas_for_transition("proposals", status, "expired", totals))
+        changed += len(totals)
+    return changed
+
+
+# Задача и модель, которую она меняет (для сброса кэша списков)
+JOBS: List[Tuple[Callable[[Session], int], type]] = [
+    (mark_overdue_invoices, Invoice),
+    (expire_proposals, Proposal),
+]
+
+
+def run_jobs() -> None:
+    """Один проход всех периодических задач, каждая в своей транзакции"""
+    for job, model in JOBS:
+        db = SessionLocal()
+        try:
+            changed = job(db)
+            db.commit()
+            if changed:
+                invalidate(model)
+                logger.info("%s: updated %d rows", job.__name__, changed)
+        except Exception:
+            db.rollback()
+            logger.exception("Scheduled job %s failed", job.__name__)
+        finally:
+            db.close()
+
+
+class Scheduler:
+    """Периодический запуск JOBS внутри процесса приложения"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _loop(self) -> None:
+        while True:
+            # Запросы к БД синхронные, выполняем их вне event loop
+            await asyncio.to_thread(run_jobs)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+scheduler = Scheduler(interval=settings.SCHEDULER_INTERVAL_SECONDS)
@@ -5,6 +5,9 @@ from app.schemas.client import (
     ClientUpdate,
     Contact,
     ContactCreate,
+    ClientImportJob,
+    ClientSummary,
+    ImportRowError,
 )
 
 # Project schemas
@@ -12,6 +15,7 @@ from app.schemas.project import (
     Project,
     ProjectCreate,
     ProjectUpdate,
+    ProjectSummary,
 )
 
 # Task schemas
@@ -19,6 +23,11 @@ from app.schemas.task import (
     Task,
     TaskCreate,
     TaskUpdate,
+    TaskBulkCreate,
+    TaskBulkUpdate,
+    TaskBulkUpdateItem,
+    TaskBulkComplete,
+    TaskSummary,
 )
 
 # Proposal schemas
@@ -28,6 +37,9 @@ from app.schemas.proposal import (
     ProposalUpdate,
     ProposalItem,
     ProposalItemCreate,
+    ProposalItemUpdate,
+    ProposalItemPatch,
+    ProposalSummary,
 )
 
 # Invoice schemas
@@ -37,6 +49,9 @@ from app.schemas.invoice import (
     InvoiceUpdate,
     InvoiceItem,
     InvoiceItemCreate,
+    InvoiceItemUpdate,
+    InvoiceItemPatch,
+    InvoiceSummary,
 )
 
 # User schemas
@@ -49,6 +64,22 @@ from app.schemas.user import (
     LoginRequest,
 )
 
+# Search schemas
+from app.schemas.search import SearchResult
+
+# Calendar schemas
+from app.schemas.calendar import CalendarEvent
+
+# Report schemas
+from app.schemas.reports import RevenueRow
+
+# Dashboard schemas
+from app.schemas.dashboard import (
+    DashboardSummary,
+    StatusCounts,
+    AmountCounts,
+)
+
 __all__ = [
     # Client
     'Client',
@@ -56,26 +87,41 @@ __all__ = [
     'ClientUpdate',
     'Contact',
     'ContactCreate',
+    'ClientImportJob',
+    'ClientSummary',
+    'ImportRowError',
     # Project
     'Project',
     'ProjectCreate',
     'ProjectUpdate',
+    'ProjectSummary',
     # Task
     'Task',
     'TaskCreate',
     'TaskUpdate',
+    'TaskBulkCreate',
+    'TaskBulkUpdate',
+    'TaskBulkUpdateItem',
+    'TaskBulkComplete',
+    'TaskSummary',
     # Proposal
     'Proposal',
     'ProposalCreate',
     'ProposalUpdate',
     'ProposalItem',
     'ProposalItemCreate',
+    'ProposalItemUpdate',
+    'ProposalItemPatch',
+    'ProposalSummary',
     # Invoice
     'Invoice',
     'InvoiceCreate',
     'InvoiceUpdate',
     'InvoiceItem',
     'InvoiceItemCreate',
+    'InvoiceItemUpdate',
+    'InvoiceItemPatch',
+    'InvoiceSummary',
     # User
     'User',
     'UserCreate',
@@ -83,4 +129,14 @@ __all__ = [
     'Token',
     'TokenData',
     'LoginRequest',
+    # Search
+    'SearchResult',
+    # Calendar
+    'CalendarEvent',
+    # Reports
+    'RevenueRow',
+    # Dashboard
+    'DashboardSummary',
+    'StatusCounts',
+    'AmountCounts',
 ]
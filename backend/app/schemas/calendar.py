@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date
+
+class CalendarEvent(BaseModel):
+    kind: str  # task (срок задачи), invoice (срок оплаты), proposal (КП действительно до)
+    id: int
+    title: str
+    date: date
+    status: str
+    priority: Optional[str] = None  # только у задач
+    assignee: Optional[str] = None  # только у задач
+    client_id: Optional[int] = None
+    project_id: Optional[int] = None
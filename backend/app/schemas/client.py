@@ -61,3 +61,43 @@ class Client(ClientBase):
 
     class Config:
         from_attributes = True
+
+# Компактная строка списка (?fields=summary): без контактов и длинных полей
+class ClientSummary(BaseModel):
+    id: int
+    name: str
+    contact_person: str
+    phone: str
+    email: Optional[str] = None
+    status: str
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+# Client import schemas
+class ImportFieldError(BaseModel):
+    field: str
+    msg: str
+
+class ImportRowError(BaseModel):
+    row: int
+    errors: List[ImportFieldError]
+
+class ClientImportJob(BaseModel):
+    id: str
+    filename: str
+    format: str
+    status: str  # queued, running, done, failed
+    progress: Optional[float] = None
+    rows_processed: int
+    clients_created: int
+    contacts_created: int
+    error_count: int
+    errors: List[ImportRowError] = []
+    detail: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
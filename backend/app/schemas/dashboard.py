@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import Dict
+from datetime import date
+
+class StatusCounts(BaseModel):
+    total: int = 0
+    by_status: Dict[str, int] = {}
+
+class AmountCounts(StatusCounts):
+    amount_by_status: Dict[str, float] = {}
+
+class DashboardSummary(BaseModel):
+    clients: StatusCounts
+    projects: StatusCounts
+    tasks: StatusCounts
+    proposals: AmountCounts
+    invoices: AmountCounts
+    # Счета: отправленные и просроченные / оплаченные
+    outstanding_total: float = 0
+    paid_total: float = 0
+    # Незавершенные задачи со сроком на текущей неделе (пн-вс)
+    tasks_due_this_week: int = 0
+    week_start: date
+    week_end: date
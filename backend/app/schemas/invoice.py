@@ -16,6 +16,20 @@ class InvoiceItemCreate(InvoiceItemBase):
     pass
 
 
+# Позиция в полном обновлении счета: с id - изменение существующей, без id - новая
+class InvoiceItemUpdate(InvoiceItemBase):
+    id: Optional[int] = None
+
+
+# Частичное изменение одной позиции (PATCH /invoices/{id}/items/{item_id})
+class InvoiceItemPatch(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    quantity: Optional[float] = None
+    unit: Optional[str] = None
+    price: Optional[float] = None
+
+
 class InvoiceItem(InvoiceItemBase):
     id: int
     invoice_id: int
@@ -52,7 +66,7 @@ class InvoiceUpdate(BaseModel):
     terms: Optional[str] = None
     payment_method: Optional[str] = None
     paid_date: Optional[datetime] = None
-    items: Optional[List[InvoiceItemCreate]] = None
+    items: Optional[List[InvoiceItemUpdate]] = None
 
 
 class Invoice(InvoiceBase):
@@ -71,3 +85,21 @@ class Invoice(InvoiceBase):
 
     class Config:
         from_attributes = True
+
+
+# Компактная строка списка (?fields=summary): без позиций и текстов
+class InvoiceSummary(BaseModel):
+    id: int
+    invoice_number: str
+    client_id: int
+    project_id: Optional[int] = None
+    title: str
+    status: InvoiceStatus
+    due_date: datetime
+    paid_date: Optional[datetime] = None
+    total: float
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
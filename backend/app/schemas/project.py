@@ -29,3 +29,16 @@ class Project(ProjectBase):
 
     class Config:
         from_attributes = True
+
+# Компактная строка списка (?fields=summary): без описания
+class ProjectSummary(BaseModel):
+    id: int
+    client_id: int
+    name: str
+    status: str
+    our_budget: Optional[float] = None
+    budget_currency: str
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
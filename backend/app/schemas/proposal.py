@@ -12,6 +12,18 @@ class ProposalItemBase(BaseModel):
 class ProposalItemCreate(ProposalItemBase):
     pass
 
+# Позиция в полном обновлении КП: с id - изменение существующей, без id - новая
+class ProposalItemUpdate(ProposalItemBase):
+    id: Optional[int] = None
+
+# Частичное изменение одной позиции (PATCH /proposals/{id}/items/{item_id})
+class ProposalItemPatch(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    quantity: Optional[float] = None
+    unit: Optional[str] = None
+    price: Optional[float] = None
+
 class ProposalItem(ProposalItemBase):
     id: int
     proposal_id: int
@@ -42,7 +54,7 @@ class ProposalUpdate(BaseModel):
     terms: Optional[str] = None
     notes: Optional[str] = None
     discount: Optional[float] = None
-    items: Optional[List[ProposalItemCreate]] = None
+    items: Optional[List[ProposalItemUpdate]] = None
 
 class Proposal(ProposalBase):
     id: int
@@ -54,3 +66,17 @@ class Proposal(ProposalBase):
 
     class Config:
         from_attributes = True
+
+# Компактная строка списка (?fields=summary): без позиций и текстов
+class ProposalSummary(BaseModel):
+    id: int
+    client_id: int
+    number: Optional[str] = None
+    title: str
+    status: str
+    valid_until: Optional[date] = None
+    total: float
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class RevenueRow(BaseModel):
+    # Заполнены только поля из group_by
+    month: Optional[str] = None  # YYYY-MM выставления счета
+    client_id: Optional[int] = None
+    project_id: Optional[int] = None
+    status: Optional[str] = None
+    invoices: int
+    amount: float
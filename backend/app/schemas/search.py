@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+
+class SearchResult(BaseModel):
+    kind: str  # client, project, task, proposal, invoice
+    id: int
+    title: str
+    score: float
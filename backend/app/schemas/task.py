@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime, date
 
 class TaskBase(BaseModel):
@@ -32,3 +32,33 @@ class Task(TaskBase):
 
     class Config:
         from_attributes = True
+
+# Компактная строка списка (?fields=summary): без описания
+class TaskSummary(BaseModel):
+    id: int
+    title: str
+    project_id: Optional[int] = None
+    client_id: Optional[int] = None
+    status: str
+    priority: str
+    due_date: Optional[date] = None
+    assignee: Optional[str] = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+# Максимальный размер пакета в bulk-эндпоинтах
+TASK_BULK_LIMIT = 1000
+
+class TaskBulkCreate(BaseModel):
+    items: List[TaskCreate] = Field(min_length=1, max_length=TASK_BULK_LIMIT)
+
+class TaskBulkUpdateItem(TaskUpdate):
+    id: int
+
+class TaskBulkUpdate(BaseModel):
+    items: List[TaskBulkUpdateItem] = Field(min_length=1, max_length=TASK_BULK_LIMIT)
+
+class TaskBulkComplete(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=TASK_BULK_LIMIT)
@@ -0,0 +1,236 @@
+"""
+Полнотекстовый поиск по клиентам, проектам, задачам, КП и счетам.
+
+Индекс - одна таблица search_index, строка на документ, id строки кодирует
+тип и id записи (id * 8 + код типа):
+  SQLite     - виртуальная таблица FTS5; русского стеммера в FTS5 нет,
+               поэтому в индекс пишутся основы слов (snowball), а запрос
+               ищет основы по префиксу; ранжирование bm25
+  PostgreSQL - таблица с колонкой tsvector ('russian') и GIN-индексом,
+               ранжирование ts_rank_cd
+
+Индекс обновляется при записи: ORM-изменения ловит обработчик after_flush,
+массовые вставки (bulk-эндпоинты, импорт) вызывают index_documents сами.
+
+Использование:
+  python -m app.search   # перестроить индекс по данным
+"""
+import functools
+import re
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.database import settings
+from app.models import Client, Invoice, Project, Proposal, Task
+
+WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class Document(NamedTuple):
+    kind: str
+    code: int
+    # Поля, изменение которых требует переиндексации
+    fields: Tuple[str, ...]
+    # Запись -> (заголовок, текст, подпись в результатах поиска)
+    build: Callable[[object], Tuple[str, str, str]]
+
+
+def _join(*parts) -> str:
+    return " ".join(str(part) for part in parts if part)
+
+
+def _digits(value: Optional[str]) -> Optional[str]:
+    # "+7 (900) 123-45-67" -> "79001234567 9001234567": телефон ищется и
+    # целиком, и без кода страны
+    digits = re.sub(r"\D", "", value or "")
+    return _join(digits, digits[-10:] if len(digits) > 10 else None)
+
+
+DOCUMENTS: Dict[type, Document] = {
+    Client: Document("client", 1, ("name", "contact_person", "notes", "inn", "phone"), lambda o: (
+        o.name, _join(o.contact_person, o.inn, o.phone, _digits(o.phone), o.notes), o.name,
+    )),
+    Project: Document("project", 2, ("name", "description"), lambda o: (
+        o.name, _join(o.description), o.name,
+    )),
+    Task: Document("task", 3, ("title", "description"), lambda o: (
+        o.title, _join(o.description), o.title,
+    )),
+    Proposal: Document("proposal", 4, ("title", "number", "description"), lambda o: (
+        _join(o.number, o.title), _join(o.description), _join(o.number, o.title),
+    )),
+    Invoice: Document("invoice", 5, ("title", "invoice_number", "description"), lambda o: (
+        _join(o.invoice_number, o.title), _join(o.description), _join(o.invoice_number, o.title),
+    )),
+}
+KINDS = {document.kind: document for document in DOCUMENTS.values()}
+_BY_CODE = {document.code: document for document in DOCUMENTS.values()}
+
+
+def doc_id(document: Document, ref_id: int) -> int:
+    return ref_id * 8 + document.code
+
+
+_stem = None
+
+
+def stem_words(value: str) -> List[str]:
+    """Слова в нижнем регистре, приведенные к основе (snowball, если установлен)"""
+    global _stem
+    if _stem is None:
+        try:
+            import snowballstemmer
+            # Словарь слов невелик, а стеммер на чистом Python медленный
+            _stem = functools.lru_cache(maxsize=100000)(snowballstemmer.stemmer("russian").stemWord)
+        except ImportError:
+            # Без стеммера поиск работает по префиксам исходных слов
+            _stem = lambda word: word
+    return [_stem(word.replace("ё", "е")) for word in WORD.findall(value.lower())]
+
+
+def _is_postgres(conn: Connection) -> bool:
+    return conn.dialect.name == "postgresql"
+
+
+def create_index(conn: Connection) -> None:
+    if _is_postgres(conn):
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS search_index ("
+            " id BIGINT PRIMARY KEY, label TEXT, title TEXT, body TEXT,"
+            " tsv TSVECTOR GENERATED ALWAYS AS ("
+            "  setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||"
+            "  setweight(to_tsvector('russian', coalesce(body, '')), 'B')) STORED)"
+        ))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_search_index_tsv ON search_index USING GIN (tsv)"))
+    else:
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+            " title, body, label UNINDEXED,"
+            " tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        ))
+
+
+def _row(conn: Connection, document: Document, obj) -> dict:
+    title, body, label = document.build(obj)
+    if not _is_postgres(conn):
+        title, body = " ".join(stem_words(title or "")), " ".join(stem_words(body or ""))
+    return {"id": doc_id(document, obj.id), "title": title, "body": body, "label": label or ""}
+
+
+def remove_documents(conn: Connection, ids: Sequence[int]) -> None:
+    if ids:
+        key = "id" if _is_postgres(conn) else "rowid"
+        conn.execute(text(f"DELETE FROM search_index WHERE {key} = :id"), [{"id": i} for i in ids])
+
+
+def index_documents(conn: Connection, model: type, objects: Iterable, replace: bool = True) -> None:
+    """Добавление/замена документов; objects - ORM-объекты, строки select() или словари"""
+    document = DOCUMENTS[model]
+    rows = [
+        _row(conn, document, SimpleNamespace(**obj) if isinstance(obj, dict) else obj)
+        for obj in objects
+    ]
+    if not rows:
+        return
+    if replace:
+        remove_documents(conn, [row["id"] for row in rows])
+    key = "id" if _is_postgres(conn) else "rowid"
+    conn.execute(text(
+        f"INSERT INTO search_index ({key}, title, body, label) VALUES (:id, :title, :body, :label)"
+    ), rows)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_changes(session: Session, flush_context) -> None:
+    changed: Dict[type, list] = {}
+    removed = []
+    for obj in session.new:
+        if type(obj) in DOCUMENTS:
+            changed.setdefault(type(obj), []).append(obj)
+    for obj in session.dirty:
+        document = DOCUMENTS.get(type(obj))
+        if document is None or obj in session.deleted:
+            continue
+        state = inspect(obj)
+        if any(state.attrs[field].history.has_changes() for field in document.fields):
+            changed.setdefault(type(obj), []).append(obj)
+    for obj in session.deleted:
+        if type(obj) in DOCUMENTS:
+            removed.append(doc_id(DOCUMENTS[type(obj)], obj.id))
+    if changed or removed:
+        conn = session.connection()
+        remove_documents(conn, removed)
+        for model, objects in changed.items():
+            index_documents(conn, model, objects)
+
+
+def search(conn: Connection, q: str, kinds: Optional[Sequence[str]] = None, skip: int = 0, limit: int = 20) -> List[dict]:
+    """
+    Документы по запросу q, лучшие первыми: [{kind, id, title, score}].
+
+    Слова ищутся по основе, последнее - еще и по префиксу (запрос по мере
+    ввода). Ранжируются только SEARCH_MAX_CANDIDATES самых свежих
+    совпадений: для частых слов стоимость запроса не растет с объемом индекса.
+    """
+    words = WORD.findall(q.lower())
+    if not words:
+        return []
+    params = {"limit": limit, "skip": skip, "candidates": settings.SEARCH_MAX_CANDIDATES}
+    codes = [KINDS[kind].code for kind in kinds or () if kind in KINDS]
+    kind_filter = f" AND {{key}} % 8 IN ({', '.join(str(code) for code in codes)})" if codes else ""
+    if _is_postgres(conn):
+        # Стемминг выполняет to_tsquery('russian')
+        params["query"] = " & ".join([*words[:-1], f"{words[-1]}:*"])
+        sql = (
+            "WITH query AS (SELECT to_tsquery('russian', :query) AS q),"
+            " candidates AS (SELECT id FROM search_index, query WHERE tsv @@ q"
+            + kind_filter.format(key="id") + " ORDER BY id DESC LIMIT :candidates)"
+            " SELECT s.id, s.label, ts_rank_cd(s.tsv, query.q) AS score"
+            " FROM candidates JOIN search_index s ON s.id = candidates.id, query"
+            " ORDER BY score DESC, s.id DESC LIMIT :limit OFFSET :skip"
+        )
+    else:
+        stems = stem_words(" ".join(words))
+        params["query"] = " ".join([*(f'"{stem}"' for stem in stems[:-1]), f'"{stems[-1]}"*'])
+        match = "search_index MATCH :query" + kind_filter.format(key="rowid")
+        # Нижняя граница rowid по свежим совпадениям - ограничение для FTS5,
+        # bm25 считается только для строк выше нее (меньше - лучше;
+        # совпадение в заголовке весит больше)
+        sql = (
+            "SELECT rowid, label, -bm25(search_index, 10.0, 1.0) AS score"
+            f" FROM search_index WHERE {match} AND rowid >= coalesce(("
+            f"  SELECT min(rowid) FROM (SELECT rowid FROM search_index WHERE {match}"
+            "   ORDER BY rowid DESC LIMIT :candidates)), 0)"
+            " ORDER BY bm25(search_index, 10.0, 1.0), rowid DESC LIMIT :limit OFFSET :skip"
+        )
+    return [
+        {"kind": _BY_CODE[row[0] % 8].kind, "id": row[0] // 8, "title": row[1], "score": row[2]}
+        for row in conn.execute(text(sql), params)
+    ]
+
+
+def rebuild(conn: Connection, batch_size: int = 1000) -> int:
+    """Полная перестройка индекса по таблицам; транзакцией управляет вызывающий"""
+    create_index(conn)
+    conn.execute(text("DELETE FROM search_index"))
+    total = 0
+    for model, document in DOCUMENTS.items():
+        columns = [model.id, *[getattr(model, field) for field in document.fields]]
+        result = conn.execution_options(yield_per=batch_size).execute(select(*columns))
+        for rows in result.partitions():
+            index_documents(conn, model, rows, replace=False)
+            total += len(rows)
+    return total
+
+
+if __name__ == "__main__":
+    from app.database import Base, engine
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        count = rebuild(conn)
+    print(f"Проиндексировано документов: {count}")
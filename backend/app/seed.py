@@ -0,0 +1,434 @@
+"""
+Генератор синтетических данных для проверок на объемах, близких к боевым.
+
+Заполняет все таблицы app/models согласованными данными: клиенты с
+контактами, проекты, задачи по проектам, КП и счета с позициями (суммы
+посчитаны так же, как при записи через API), пользователи-исполнители.
+Объемы задаются числом клиентов и соотношениями (--tasks - задач на
+проект, --items - позиций на документ и т.д.).
+
+Клиенты делятся на чанки по --chunk; чанк генерируется в отдельном
+процессе своим random.Random(seed, номер чанка) с заранее известными
+диапазонами id, поэтому результат не зависит от --workers. Строки пишутся
+массовыми INSERT через Core (одна транзакция на чанк), мимо обработчиков
+after_flush: счетчики сводки, сводка выручки, поисковый индекс и счетчики
+номеров документов пересчитываются один раз в конце. При одинаковых
+--seed и --until данные совпадают.
+
+База должна быть пустой (кроме пользователей).
+
+Использование:
+  python -m app.seed --clients 1000
+  python -m app.seed --clients 200000 --invoices 2.5 --workers 8
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Connection
+
+from app.models import (
+    Client, Contact, Invoice, InvoiceItem, InvoiceStatus, NumberSequence, Project, Proposal, ProposalItem,
+    Task, User,
+)
+
+
+class SeedConfig(NamedTuple):
+    clients: int = 1000
+    contacts: float = 1.5  # на клиента
+    projects: float = 2  # на клиента
+    tasks: float = 5  # на проект
+    proposals: float = 1  # на клиента
+    invoices: float = 2.5  # на клиента
+    items: float = 3  # позиций на КП и на счет
+    users: int = 20
+    years: int = 3  # глубина истории
+    until: date = date.today()
+    chunk: int = 2000  # клиентов в чанке
+    seed: int = 42
+
+
+# Порядок вставки - по внешним ключам
+MODELS = (Client, Contact, Project, Task, Proposal, ProposalItem, Invoice, InvoiceItem)
+
+FIRST_NAMES = ("Александр", "Дмитрий", "Максим", "Сергей", "Андрей", "Алексей", "Иван", "Михаил",
+               "Елена", "Ольга", "Наталья", "Анна", "Мария", "Татьяна", "Ирина", "Екатерина")
+LAST_NAMES = ("Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов",
+              "Новиков", "Федоров", "Морозов", "Волков", "Алексеев", "Лебедев", "Семенов", "Егоров")
+LATIN = {"Иванов": "ivanov", "Смирнов": "smirnov", "Кузнецов": "kuznetsov", "Попов": "popov",
+         "Васильев": "vasiliev", "Петров": "petrov", "Соколов": "sokolov", "Михайлов": "mikhailov",
+         "Новиков": "novikov", "Федоров": "fedorov", "Морозов": "morozov", "Волков": "volkov",
+         "Алексеев": "alekseev", "Лебедев": "lebedev", "Семенов": "semenov", "Егоров": "egorov"}
+COMPANY_FORMS = ("ООО", "ООО", "ООО", "ИП", "АО")
+COMPANY_WORDS = ("Север", "Вектор", "Альфа", "Гранит", "Стройинвест", "Технопарк", "Меридиан", "Восход",
+                 "Профи", "Континент", "Орион", "Спектр", "Атлант", "Эталон", "Ресурс", "Квант")
+COMPANY_SUFFIXES = ("", "", "Групп", "Плюс", "Трейд", "Сервис", "Строй", "Медиа")
+CITIES = ("Москва", "Санкт-Петербург", "Казань", "Екатеринбург", "Новосибирск", "Краснодар", "Самара")
+STREETS = ("ул. Ленина", "ул. Мира", "пр. Победы", "ул. Садовая", "ул. Гагарина", "наб. Речная")
+POSITIONS = ("Директор", "Маркетолог", "Менеджер", "Бухгалтер", "Руководитель отдела продаж", "Ассистент")
+PROJECT_KINDS = ("Контекстная реклама", "SEO-продвижение", "Таргетированная реклама", "Разработка сайта",
+                 "SMM", "Email-рассылки", "Аналитика", "Редизайн лендинга")
+TASK_VERBS = ("Подготовить", "Согласовать", "Запустить", "Проверить", "Обновить", "Настроить", "Собрать")
+TASK_OBJECTS = ("отчет за месяц", "рекламные кампании", "семантическое ядро", "креативы", "лендинг",
+                "аналитику целей", "контент-план", "бриф с клиентом", "счет на оплату", "медиаплан")
+# Услуга, единица, диапазон цены (в сотнях рублей)
+SERVICES = (
+    ("Ведение рекламной кампании", "мес", (150, 900)),
+    ("Настройка аналитики", "шт", (50, 300)),
+    ("Разработка баннеров", "шт", (10, 60)),
+    ("Копирайтинг", "час", (10, 30)),
+    ("SEO-аудит", "шт", (100, 500)),
+    ("Верстка страницы", "шт", (80, 400)),
+    ("Консультация", "час", (20, 50)),
+    ("Рекламный бюджет", "шт", (100, 3000)),
+)
+PAYMENT_METHODS = ("bank_transfer", "bank_transfer", "bank_transfer", "card", "cash")
+
+
+def _weighted(rng: random.Random, choices: Dict[str, int]) -> str:
+    return rng.choices(list(choices), weights=list(choices.values()))[0]
+
+
+def _between(rng: random.Random, start: datetime, end: datetime) -> datetime:
+    if end <= start:
+        return start
+    return start + timedelta(seconds=rng.randrange(int((end - start).total_seconds())))
+
+
+def _person(rng: random.Random) -> Tuple[str, str]:
+    """ФИО и латинский логин для почты"""
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    # Женские имена в списке - вторая половина
+    female = FIRST_NAMES.index(first) >= len(FIRST_NAMES) // 2
+    return f"{first} {last}{'а' if female else ''}", f"{LATIN[last]}{rng.randrange(1, 1000)}"
+
+
+def _phone(rng: random.Random) -> str:
+    return f"+7 9{rng.randrange(10, 100)} {rng.randrange(100, 1000)}-{rng.randrange(10, 100)}-{rng.randrange(10, 100)}"
+
+
+def _parents(rng: random.Random, total: int, parents: Sequence, at_least_one: bool = False) -> List:
+    """Родитель для каждой из total дочерних строк, сгруппировано по родителю"""
+    chosen = list(parents[:total]) if at_least_one else []
+    chosen += [rng.choice(parents) for _ in range(total - len(chosen))] if parents else []
+    order = {id(parent): position for position, parent in enumerate(parents)}
+    return sorted(chosen, key=lambda parent: order[id(parent)])
+
+
+def chunk_counts(config: SeedConfig, clients: int) -> Dict[type, int]:
+    """Число строк каждой модели в чанке из clients клиентов"""
+    projects = round(config.projects * clients)
+    proposals = round(config.proposals * clients)
+    invoices = round(config.invoices * clients)
+    return {
+        Client: clients,
+        Contact: round(config.contacts * clients),
+        Project: projects,
+        Task: round(config.tasks * projects),
+        Proposal: proposals,
+        ProposalItem: round(config.items * proposals),
+        Invoice: invoices,
+        InvoiceItem: round(config.items * invoices),
+    }
+
+
+def chunk_ranges(config: SeedConfig, index: int) -> Dict[type, range]:
+    """Диапазоны id чанка: чанк k начинается после k полных чанков"""
+    clients = min(config.chunk, config.clients - index * config.chunk)
+    full = chunk_counts(config, config.chunk)
+    return {
+        model: range(index * full[model] + 1, index * full[model] + 1 + count)
+        for model, count in chunk_counts(config, clients).items()
+    }
+
+
+def user_names(config: SeedConfig) -> List[str]:
+    rng = random.Random(config.seed)
+    return [_person(rng)[0] for _ in range(config.users)] or [None]
+
+
+def generate_chunk(config: SeedConfig, index: int) -> Dict[type, List[dict]]:
+    """Строки всех моделей для чанка index"""
+    from app.routers.invoices import calculate_invoice_totals
+
+    rng = random.Random(config.seed * 1_000_003 + index)
+    ids = chunk_ranges(config, index)
+    assignees = user_names(config)
+    until = datetime.combine(config.until, datetime.min.time()) + timedelta(hours=18)
+    start = until - timedelta(days=365 * config.years)
+    span = (until - start).total_seconds()
+    rows: Dict[type, List[dict]] = {model: [] for model in MODELS}
+
+    clients = rows[Client]
+    for client_id in ids[Client]:
+        # Время создания растет с id, как в живой базе
+        created = start + timedelta(seconds=int(span * (client_id - 1) / config.clients * 0.9))
+        created += timedelta(minutes=rng.randrange(600))
+        person, login = _person(rng)
+        name = f"{rng.choice(COMPANY_WORDS)}{rng.choice(COMPANY_SUFFIXES)}"
+        form = rng.choice(COMPANY_FORMS)
+        clients.append({
+            "id": client_id,
+            "name": f"ИП {person}" if form == "ИП" else f"{form} «{name}»",
+            "contact_person": person,
+            "email": f"{login}@example.ru",
+            "phone": _phone(rng),
+            "telegram": f"@{login}" if rng.random() < 0.4 else None,
+            "whatsapp": None,
+            "status": _weighted(rng, {"lead": 30, "active": 55, "archive": 15}),
+            "inn": "".join(str(rng.randrange(10)) for _ in range(12 if form == "ИП" else 10)),
+            "address": f"г. {rng.choice(CITIES)}, {rng.choice(STREETS)}, д. {rng.randrange(1, 150)}",
+            "website": f"https://{login}.ru" if rng.random() < 0.5 else None,
+            "notes": None,
+            "created_at": created,
+            "updated_at": _between(rng, created, until),
+            "last_contact": _between(rng, created, until),
+        })
+
+    for contact_id, client in zip(ids[Contact], _parents(rng, len(ids[Contact]), clients)):
+        person, login = _person(rng)
+        rows[Contact].append({
+            "id": contact_id, "client_id": client["id"], "name": person, "position": rng.choice(POSITIONS),
+            "phone": _phone(rng), "email": f"{login}@example.ru", "telegram": None, "whatsapp": None,
+            "created_at": _between(rng, client["created_at"], until),
+        })
+
+    projects_by_client = defaultdict(list)
+    for project_id, client in zip(ids[Project], _parents(rng, len(ids[Project]), clients)):
+        created = _between(rng, client["created_at"], until)
+        project = {
+            "id": project_id, "client_id": client["id"], "name": rng.choice(PROJECT_KINDS),
+            "status": _weighted(rng, {"active": 50, "completed": 35, "paused": 15}),
+            "our_budget": rng.randrange(30, 500) * 1000.0, "ad_budget": rng.choice((None, rng.randrange(50, 2000) * 1000.0)),
+            "budget_currency": "RUB", "description": None, "created_at": created, "updated_at": _between(rng, created, until),
+        }
+        rows[Project].append(project)
+        projects_by_client[client["id"]].append(project)
+
+    for task_id, project in zip(ids[Task], _parents(rng, len(ids[Task]), rows[Project])):
+        created = _between(rng, project["created_at"], until)
+        due = created.date() + timedelta(days=rng.randrange(1, 60))
+        if due < config.until - timedelta(days=14):
+            status = _weighted(rng, {"completed": 80, "cancelled": 5, "in_progress": 10, "new": 5})
+        else:
+            status = _weighted(rng, {"new": 40, "in_progress": 40, "completed": 20})
+        completed_at = None
+        if status == "completed":
+            completed_at = _between(rng, created, min(until, datetime.combine(due, datetime.min.time()) + timedelta(days=7)))
+        rows[Task].append({
+            "id": task_id, "title": f"{rng.choice(TASK_VERBS)} {rng.choice(TASK_OBJECTS)}", "description": None,
+            "project_id": project["id"], "client_id": project["client_id"], "status": status,
+            "priority": _weighted(rng, {"low": 25, "medium": 45, "high": 22, "critical": 8}),
+            "due_date": due, "completed_at": completed_at, "assignee": rng.choice(assignees),
+            "created_at": created, "updated_at": completed_at or _between(rng, created, until),
+        })
+
+    def items(model: type, documents: List[dict], key: str) -> Dict[int, float]:
+        # Позиции документов; возвращает сумму позиций по документу
+        subtotals: Dict[int, float] = defaultdict(float)
+        for item_id, document in zip(ids[model], _parents(rng, len(ids[model]), documents, at_least_one=True)):
+            name, unit, (low, high) = rng.choice(SERVICES)
+            quantity = float(rng.randrange(1, 40)) if unit == "час" else float(rng.choice((1, 1, 1, 2, 3, 5)))
+            price = rng.randrange(low, high) * 100.0
+            row = {"id": item_id, key: document["id"], "name": name, "description": None,
+                   "quantity": quantity, "unit": unit, "price": price, "created_at": document["created_at"]}
+            if model is ProposalItem:
+                row["total"] = quantity * price
+            rows[model].append(row)
+            subtotals[document["id"]] += quantity * price
+        return subtotals
+
+    for proposal_id, client in zip(ids[Proposal], _parents(rng, len(ids[Proposal]), clients)):
+        created = _between(rng, client["created_at"], until)
+        valid_until = created.date() + timedelta(days=rng.choice((14, 30, 30, 60)))
+        status = _weighted(rng, {"draft": 10, "sent": 30, "accepted": 35, "rejected": 15})
+        if status in ("draft", "sent") and valid_until < config.until:
+            status = "expired"
+        rows[Proposal].append({
+            "id": proposal_id, "client_id": client["id"], "title": f"Коммерческое предложение: {rng.choice(PROJECT_KINDS)}",
+            "number": f"KP-{created:%Y%m}-{proposal_id:04d}", "status": status, "valid_until": valid_until,
+            "description": None, "terms": None, "notes": None, "discount": float(rng.choice((0, 0, 0, 5, 10))),
+            "created_at": created, "updated_at": _between(rng, created, until),
+        })
+    subtotals = items(ProposalItem, rows[Proposal], "proposal_id")
+    for proposal in rows[Proposal]:
+        proposal["subtotal"] = subtotals.get(proposal["id"], 0.0)
+        proposal["total"] = proposal["subtotal"] * (1 - proposal["discount"] / 100)
+
+    for invoice_id, client in zip(ids[Invoice], _parents(rng, len(ids[Invoice]), clients)):
+        issued = _between(rng, client["created_at"], until)
+        due = issued + timedelta(days=rng.choice((5, 10, 14, 30)))
+        projects = projects_by_client[client["id"]]
+        status, paid = InvoiceStatus.SENT, None
+        if until - issued < timedelta(days=7) and rng.random() < 0.3:
+            status = InvoiceStatus.DRAFT
+        elif rng.random() < 0.04:
+            status = InvoiceStatus.CANCELLED
+        elif rng.random() < (0.85 if due < until else 0.4):
+            status, paid = InvoiceStatus.PAID, _between(rng, issued, min(until, due + timedelta(days=10)))
+        elif due < until:
+            status = InvoiceStatus.OVERDUE
+        rows[Invoice].append({
+            "id": invoice_id, "invoice_number": f"INV-{issued:%Y%m}-{invoice_id:04d}", "client_id": client["id"],
+            "project_id": rng.choice(projects)["id"] if projects and rng.random() < 0.8 else None,
+            "title": f"Счет за услуги: {rng.choice(PROJECT_KINDS)}", "description": None,
+            "issue_date": issued, "due_date": due, "paid_date": paid,
+            "tax_rate": 20.0 if rng.random() < 0.6 else 0.0, "discount": float(rng.choice((0, 0, 0, 0, 5, 10))),
+            "status": status, "payment_method": rng.choice(PAYMENT_METHODS) if paid else None,
+            "notes": None, "terms": "Оплата в течение срока действия счета",
+            "created_at": issued, "updated_at": paid or issued,
+        })
+    subtotals = items(InvoiceItem, rows[Invoice], "invoice_id")
+    for invoice in rows[Invoice]:
+        invoice.update(calculate_invoice_totals(subtotals.get(invoice["id"], 0.0), invoice["discount"], invoice["tax_rate"]))
+    return rows
+
+
+def write_chunk(config: SeedConfig, index: int) -> Tuple[int, Dict[str, int]]:
+    """Генерация и вставка чанка (в процессе-воркере); возвращает число строк и последние номера документов"""
+    from app.database import engine
+
+    rows = generate_chunk(config, index)
+    numbers: Dict[str, int] = {}
+    for model, column in ((Proposal, "number"), (Invoice, "invoice_number")):
+        for row in rows[model]:
+            prefix, value = row[column].rsplit("-", 1)
+            numbers[prefix] = max(numbers.get(prefix, 0), int(value))
+    # Генерация идет параллельно, запись в SQLite - по очереди: ждем блокировку сколько нужно
+    with engine.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("PRAGMA busy_timeout=600000")
+        for model in MODELS:
+            if rows[model]:
+                conn.execute(insert(model), rows[model])
+    return sum(len(model_rows) for model_rows in rows.values()), numbers
+
+
+def seed_users(conn: Connection, config: SeedConfig, password: str) -> int:
+    """Пользователи-исполнители задач; уже существующие логины пропускаются"""
+    from app.auth import get_password_hash
+
+    existing = set(conn.execute(select(User.username)).scalars())
+    hashed = get_password_hash(password)  # bcrypt медленный: один хэш на всех
+    now = datetime.utcnow()
+    rows = [
+        {"email": f"user{i}@example.ru", "username": f"user{i}", "full_name": name, "hashed_password": hashed,
+         "role": "manager" if i % 5 == 1 else "employee", "is_active": True, "created_at": now, "updated_at": now}
+        for i, name in enumerate(user_names(config), start=1) if name and f"user{i}" not in existing
+    ]
+    if rows:
+        conn.execute(insert(User), rows)
+    return len(rows)
+
+
+def store_numbers(conn: Connection, numbers: Dict[str, int]) -> None:
+    """Счетчики номеров документов: новые счета и КП продолжают нумерацию после сгенерированных"""
+    table = NumberSequence.__table__
+    for name, value in numbers.items():
+        current = conn.execute(select(table.c.value).where(table.c.name == name)).scalar()
+        if current is None:
+            conn.execute(table.insert().values(name=name, value=value))
+        elif current < value:
+            conn.execute(table.update().where(table.c.name == name).values(value=value))
+
+
+def reset_id_sequences(conn: Connection) -> None:
+    """PostgreSQL: id вставлены явно, сдвигаем serial-последовательности за максимум"""
+    if conn.dialect.name != "postgresql":
+        return
+    for model in MODELS:
+        table = model.__tablename__
+        conn.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+        )
+
+
+def seed(config: SeedConfig, workers: int, password: str, build_search: bool = True, log=print) -> int:
+    """Заполнение пустой базы; возвращает число вставленных строк"""
+    from app import revenue, search, summary
+    from app.database import engine
+
+    with engine.connect() as conn:
+        for model in MODELS:
+            if conn.execute(select(func.count()).select_from(model)).scalar():
+                raise RuntimeError(f"Таблица {model.__tablename__} не пуста")
+    with engine.begin() as conn:
+        seed_users(conn, config, password)
+
+    chunks = (config.clients + config.chunk - 1) // config.chunk
+    total, numbers, t0 = 0, {}, time.perf_counter()
+    if workers > 1 and chunks > 1:
+        # spawn: воркеры открывают собственные подключения к базе
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = [executor.submit(write_chunk, config, index) for index in range(chunks)]
+            results = (future.result() for future in as_completed(futures))
+            for done, (count, chunk_numbers) in enumerate(results, start=1):
+                total += count
+                for name, value in chunk_numbers.items():
+                    numbers[name] = max(numbers.get(name, 0), value)
+                log(f"чанк {done}/{chunks}: {total} строк, {time.perf_counter() - t0:.1f} с")
+    else:
+        for index in range(chunks):
+            count, chunk_numbers = write_chunk(config, index)
+            total += count
+            for name, value in chunk_numbers.items():
+                numbers[name] = max(numbers.get(name, 0), value)
+            log(f"чанк {index + 1}/{chunks}: {total} строк, {time.perf_counter() - t0:.1f} с")
+
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        store_numbers(conn, numbers)
+        reset_id_sequences(conn)
+        summary.recompute(conn)
+        revenue.rebuild(conn)
+    log(f"счетчики и сводка выручки: {time.perf_counter() - t0:.1f} с")
+    if build_search:
+        t0 = time.perf_counter()
+        with engine.begin() as conn:
+            search.rebuild(conn)
+        log(f"поисковый индекс: {time.perf_counter() - t0:.1f} с")
+    return total
+
+
+if __name__ == "__main__":
+    from app.database import Base, engine
+    from app.migrations import upgrade
+
+    defaults = SeedConfig()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=defaults.clients)
+    parser.add_argument("--contacts", type=float, default=defaults.contacts, help="контактов на клиента")
+    parser.add_argument("--projects", type=float, default=defaults.projects, help="проектов на клиента")
+    parser.add_argument("--tasks", type=float, default=defaults.tasks, help="задач на проект")
+    parser.add_argument("--proposals", type=float, default=defaults.proposals, help="КП на клиента")
+    parser.add_argument("--invoices", type=float, default=defaults.invoices, help="счетов на клиента")
+    parser.add_argument("--items", type=float, default=defaults.items, help="позиций на КП и на счет")
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--years", type=int, default=defaults.years, help="глубина истории")
+    parser.add_argument("--until", type=date.fromisoformat, default=defaults.until, help="последний день истории")
+    parser.add_argument("--chunk", type=int, default=defaults.chunk, help="клиентов в чанке")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--password", default="password", help="пароль пользователей user1..userN")
+    parser.add_argument("--no-search", action="store_true", help="не строить поисковый индекс")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    upgrade(engine)
+    config = SeedConfig(**{field: getattr(args, field) for field in SeedConfig._fields})
+    t0 = time.perf_counter()
+    try:
+        count = seed(config, args.workers, args.password, build_search=not args.no_search)
+    except RuntimeError as exc:
+        print(f"ERROR: {exc}")
+        sys.exit(1)
+    print(f"Вставлено строк: {count} за {time.perf_counter() - t0:.1f} с")
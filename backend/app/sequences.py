@@ -0,0 +1,47 @@
+from typing import Callable
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models import NumberSequence
+
+_table = NumberSequence.__table__
+
+
+def _create_sequence(db: Session, name: str, start: int) -> None:
+    """Создание счетчика, если его еще нет (параллельная вставка не ошибка)"""
+    dialect = db.get_bind().dialect.name
+    values = {"name": name, "value": start}
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        db.execute(insert(_table).values(**values).on_conflict_do_nothing(index_elements=["name"]))
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        db.execute(insert(_table).values(**values).on_conflict_do_nothing(index_elements=["name"]))
+    else:
+        try:
+            with db.begin_nested():
+                db.execute(_table.insert().values(**values))
+        except IntegrityError:
+            pass
+
+
+def next_value(db: Session, name: str, start: Callable[[], int] = lambda: 0) -> int:
+    """
+    Атомарное получение следующего номера счетчика name.
+
+    Один UPDATE ... RETURNING: строка счетчика блокируется до конца
+    транзакции, поэтому параллельные вызовы получают разные номера без
+    повторов и ретраев. start() вызывается один раз при создании счетчика
+    и возвращает последний уже выданный номер.
+    """
+    stmt = (
+        update(_table)
+        .where(_table.c.name == name)
+        .values(value=_table.c.value + 1)
+        .returning(_table.c.value)
+    )
+    value = db.execute(stmt).scalar()
+    if value is None:
+        _create_sequence(db, name, start())
+        value = db.execute(stmt).scalar_one()
+    return value
@@ -0,0 +1,163 @@
+"""
+Счетчики сводки для главной панели (таблица summary_counters).
+
+Счетчики обновляются инкрементально в той же транзакции, что и запись:
+ORM-изменения клиентов, проектов, задач, КП и счетов учитываются
+обработчиком after_flush, массовые UPDATE/INSERT мимо ORM вызывают
+bump() сами. recompute() пересчитывает все с нуля.
+
+Использование:
+  python -m app.summary   # полный пересчет
+"""
+import enum
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, event, func, inspect, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models import Client, Invoice, Project, Proposal, SummaryCounter, Task
+
+_table = SummaryCounter.__table__
+
+# Модель -> (префикс ключа, колонка суммы или None)
+TRACKED = {
+    Client: ("clients", None),
+    Project: ("projects", None),
+    Task: ("tasks", None),
+    Proposal: ("proposals", "total"),
+    Invoice: ("invoices", "total"),
+}
+
+
+def _status_key(status) -> str:
+    return status.value if isinstance(status, enum.Enum) else str(status)
+
+
+def contribution(prefix: str, status, amount: Optional[float]) -> Dict[str, float]:
+    """Вклад одной записи в счетчики"""
+    key = _status_key(status)
+    values = {f"{prefix}.count": 1, f"{prefix}.status.{key}": 1}
+    if amount is not None:
+        values[f"{prefix}.amount.{key}"] = amount or 0
+    return values
+
+
+def _merge(deltas: Dict[str, float], values: Dict[str, float], sign: int) -> None:
+    for key, value in values.items():
+        deltas[key] += sign * value
+
+
+def committed_value(obj, key: str):
+    """Значение атрибута до текущего flush"""
+    history = inspect(obj).attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(obj, key)
+
+
+def bump(conn: Connection, deltas: Dict[str, float]) -> None:
+    """Атомарное приращение счетчиков: INSERT ... ON CONFLICT DO UPDATE value = value + delta"""
+    # Ключи по порядку: транзакции, задевающие одни и те же строки
+    # (invoices.count и т.п.), блокируют их в одном порядке - без взаимоблокировок
+    rows = [{"key": key, "value": value} for key, value in sorted(deltas.items()) if value]
+    if not rows:
+        return
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(_table).values(rows)
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=["key"],
+        set_={"value": _table.c.value + stmt.excluded.value},
+    ))
+
+
+@event.listens_for(Session, "after_flush")
+def _track_changes(session: Session, flush_context) -> None:
+    # В after_flush new/dirty/deleted и история атрибутов еще в состоянии
+    # до flush, а значения по умолчанию (status) уже подставлены INSERT'ом
+    deltas: Dict[str, float] = defaultdict(float)
+    for obj in session.new:
+        if type(obj) in TRACKED:
+            prefix, amount = TRACKED[type(obj)]
+            _merge(deltas, contribution(prefix, obj.status, getattr(obj, amount) if amount else None), 1)
+    for obj in session.deleted:
+        if type(obj) in TRACKED:
+            prefix, amount = TRACKED[type(obj)]
+            _merge(deltas, contribution(
+                prefix, committed_value(obj, "status"), committed_value(obj, amount) if amount else None
+            ), -1)
+    for obj in session.dirty:
+        if type(obj) not in TRACKED or obj in session.deleted:
+            continue
+        prefix, amount = TRACKED[type(obj)]
+        keys = ("status", amount) if amount else ("status",)
+        state = inspect(obj)
+        if not any(state.attrs[key].history.has_changes() for key in keys):
+            continue
+        _merge(deltas, contribution(
+            prefix, committed_value(obj, "status"), committed_value(obj, amount) if amount else None
+        ), -1)
+        _merge(deltas, contribution(prefix, obj.status, getattr(obj, amount) if amount else None), 1)
+    if any(deltas.values()):
+        bump(session.connection(), deltas)
+
+
+def deltas_for_rows(prefix: str, statuses: Iterable, sign: int = 1) -> Dict[str, float]:
+    """Счетчики для массовой вставки/удаления записей без сумм (задачи и т.п.)"""
+    deltas: Dict[str, float] = defaultdict(float)
+    for status in statuses:
+        _merge(deltas, contribution(prefix, status, None), sign)
+    return deltas
+
+
+def deltas_for_status_changes(prefix: str, changes: Iterable[Tuple]) -> Dict[str, float]:
+    """Счетчики для массовой смены статусов: пары (старый, новый)"""
+    deltas: Dict[str, float] = defaultdict(float)
+    for old_status, new_status in changes:
+        if old_status != new_status:
+            _merge(deltas, contribution(prefix, old_status, None), -1)
+            _merge(deltas, contribution(prefix, new_status, None), 1)
+    return deltas
+
+
+def deltas_for_transition(prefix: str, old_status, new_status, amounts: Iterable[float]) -> Dict[str, float]:
+    """Счетчики для массовой смены статуса (UPDATE ... RETURNING total)"""
+    deltas: Dict[str, float] = defaultdict(float)
+    for amount in amounts:
+        _merge(deltas, contribution(prefix, old_status, amount), -1)
+        _merge(deltas, contribution(prefix, new_status, amount), 1)
+    return deltas
+
+
+def recompute(conn: Connection) -> Dict[str, float]:
+    """Полный пересчет счетчиков по таблицам; транзакцией управляет вызывающий"""
+    counters: Dict[str, float] = defaultdict(float)
+    for model, (prefix, amount) in TRACKED.items():
+        columns = [model.status, func.count()]
+        if amount:
+            columns.append(func.coalesce(func.sum(getattr(model, amount)), 0))
+        for row in conn.execute(select(*columns).group_by(model.status)):
+            _merge(counters, contribution(prefix, row[0], row[2] if amount else None), row[1])
+    conn.execute(delete(_table))
+    if counters:
+        conn.execute(_table.insert(), [{"key": k, "value": v} for k, v in counters.items()])
+    return counters
+
+
+def read_counters(db: Session) -> Dict[str, float]:
+    return dict(db.execute(select(_table.c.key, _table.c.value)).all())
+
+
+if __name__ == "__main__":
+    from app.database import Base, engine
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        result = recompute(conn)
+    print(f"Пересчитано счетчиков: {len(result)}")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Пакетное создание задач против создания по одной
+Создает --size задач через POST /api/tasks (по одной) и через
+POST /api/tasks/bulk, затем завершает их PATCH /{id}/complete и
+POST /api/tasks/bulk-complete. Печатает время и задач в секунду.
+Код 1, если пакетный запрос выполнил больше QUERY_BUDGET SQL-запросов
+(их число не должно зависеть от размера пакета) или детектор N+1
+(app/query_stats.py) принял пакетную запись за N+1.
+Использование:
+  python -m benchmarks.bulk_tasks --size 1000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bulk_tasks.db")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import query_stats
+from app.database import async_engine, engine
+from app.main import app
+
+# SQL-запросов на пакетный запрос при любом --size
+QUERY_BUDGET = {"POST /api/tasks/bulk": 6, "POST /api/tasks/bulk-complete": 6}
+
+
+def task(i: int) -> dict:
+    return {"title": f"Задача {i}", "priority": "high" if i % 3 else "low", "assignee": "bench"}
+
+
+def report(name: str, size: int, seconds: float, queries: int = None, n_plus_one: int = 0) -> bool:
+    """Печать строки; False, если запрос вышел за QUERY_BUDGET или отмечен как N+1"""
+    line = f"{name:<28} {seconds * 1000:>9.0f} мс {size / seconds:>10.0f} задач/с"
+    if queries is None:
+        print(line)
+        return True
+    budget = QUERY_BUDGET[name]
+    ok = queries <= budget and not n_plus_one
+    print(f"{line} {queries:>5} SQL (бюджет {budget}), N+1: {n_plus_one}{'' if ok else '  FAIL'}")
+    return ok
+
+
+class QueryCounter:
+    """Число SQL-запросов к синхронному и асинхронному движку"""
+
+    def __init__(self):
+        self.count = 0
+        self.engines = [engine] + ([async_engine.sync_engine] if async_engine is not None else [])
+        for target in self.engines:
+            event.listen(target, "before_cursor_execute", self.count_query)
+
+    def count_query(self, *args):
+        self.count += 1
+
+    def take(self) -> int:
+        count, self.count = self.count, 0
+        return count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1000, help="задач в пакете (до 1000)")
+    args = parser.parse_args()
+
+    ok = True
+    with TestClient(app) as client:
+        queries = QueryCounter()
+        t0 = time.perf_counter()
+        single_ids = [client.post("/api/tasks", json=task(i)).json()["id"] for i in range(args.size)]
+        report("POST /api/tasks x N", args.size, time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        queries.take()
+        warned = query_stats.n_plus_one
+        response = client.post("/api/tasks/bulk", json={"items": [task(i) for i in range(args.size)]})
+        response.raise_for_status()
+        bulk_ids = [row["id"] for row in response.json()]
+        ok &= report("POST /api/tasks/bulk", args.size, time.perf_counter() - t0, queries.take(),
+                     query_stats.n_plus_one - warned)
+
+        t0 = time.perf_counter()
+        for task_id in single_ids:
+            client.patch(f"/api/tasks/{task_id}/complete")
+        report("PATCH /{id}/complete x N", args.size, time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        queries.take()
+        warned = query_stats.n_plus_one
+        client.post("/api/tasks/bulk-complete", json={"ids": bulk_ids}).raise_for_status()
+        ok &= report("POST /api/tasks/bulk-complete", args.size, time.perf_counter() - t0, queries.take(),
+                     query_stats.n_plus_one - warned)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Календарь месяца при растущей истории
+Для каждого объема из --rows дозаполняет задачи, счета и КП: по --per-day
+сроков каждой сущности в день, новые строки - все дальше в прошлое от
+запрашиваемого месяца (история растет, событий в месяце столько же). Затем
+--repeat раз запрашивает GET /api/calendar за месяц (кэш ответов выключен):
+время ответа не должно зависеть от объема истории.
+Использование:
+  python -m benchmarks.calendar --rows 10000 100000 1000000
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "calendar.db")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.database import SessionLocal
+from app.main import app
+from app.models import Client, Invoice, Proposal, Task
+
+# Запрашиваемый месяц; история уходит от его конца в прошлое
+MONTH = {"from": "2024-06-01", "to": "2024-06-30"}
+END = date(2024, 6, 30)
+
+
+def seed(start_id: int, rows: int, per_day: int) -> None:
+    # Напрямую в БД, мимо счетчиков сводки и поиска: важны только даты
+    db = SessionLocal()
+    ids = range(start_id, start_id + rows)
+    due = {i: END - timedelta(days=(i - 1) // per_day) for i in ids}
+    db.execute(insert(Task), [
+        {"id": i, "title": f"Задача {i}", "due_date": due[i], "assignee": f"user{i % 20}"} for i in ids
+    ])
+    db.execute(insert(Invoice), [
+        {"id": i, "invoice_number": f"INV-{i}", "client_id": 1, "title": f"Счет {i}",
+         "due_date": datetime.combine(due[i], datetime.min.time()) + timedelta(hours=12)} for i in ids
+    ])
+    db.execute(insert(Proposal), [
+        {"id": i, "client_id": 1, "title": f"КП {i}", "valid_until": due[i]} for i in ids
+    ])
+    db.commit()
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000], help="строк каждой сущности")
+    parser.add_argument("--per-day", type=int, default=3, help="сроков каждой сущности в день")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    db.execute(insert(Client), [{"id": 1, "name": "Клиент", "contact_person": "Иван", "phone": "+7"}])
+    db.commit()
+    db.close()
+
+    seeded = 0
+    with TestClient(app) as client:
+        print(f"{'история':>9} {'событий':>8} {'p50':>9} {'p95':>9}")
+        for rows in sorted(args.rows):
+            seed(seeded + 1, rows - seeded, args.per_day)
+            seeded = rows
+            timings = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                response = client.get("/api/calendar", params=MONTH)
+                timings.append(time.perf_counter() - t0)
+                response.raise_for_status()
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95)]
+            print(f"{rows:>9} {len(response.json()):>8} {statistics.median(timings) * 1000:>7.2f}мс {p95 * 1000:>7.2f}мс")
+
+
+if __name__ == "__main__":
+    main()
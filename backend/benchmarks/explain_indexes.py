@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Проверка планов запросов списков через EXPLAIN QUERY PLAN (SQLite)
+Выполняет запросы списков с каждым фильтром, собирает их SQL и падает с
+кодом 1, если план читает таблицу целиком (SCAN без индекса) или
+сортирует во временном B-дереве вместо чтения индекса по порядку.
+Отдельно компилирует UNION календаря под PostgreSQL и проверяет, что
+типы колонок частей совпадают (перечисление invoicestatus и VARCHAR в
+одной колонке PostgreSQL не объединяет).
+Использование:
+  python -m benchmarks.explain_indexes
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date, datetime
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "explain.db")
+
+from sqlalchemy import event, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.sqltypes import NullType
+
+from app import crud
+from app.database import SessionLocal, engine
+from app.main import app  # noqa: F401 - создание схемы и миграции
+from app.crud.calendar import calendar_query
+from app.models import Invoice, InvoiceStatus
+from app.pagination import encode_cursor, paginate
+from app.routers.invoices import INVOICE_LOAD, INVOICE_ORDER
+from app.scheduler import mark_overdue_invoices
+
+CURSOR = encode_cursor([10])
+INVOICE_CURSOR = encode_cursor([datetime(2030, 1, 1), 10])
+
+
+def invoices(db, cursor=None, **filters):
+    query = db.query(Invoice).options(*INVOICE_LOAD)
+    for column, value in filters.items():
+        query = query.filter(getattr(Invoice, column) == value)
+    return paginate(query, INVOICE_ORDER, 0, 100, cursor, descending=True).all()
+
+
+# Название -> вызов, который выполняет запрос(ы) списка
+CASES = {
+    "clients": lambda db: crud.get_clients(db),
+    "clients cursor": lambda db: crud.get_clients(db, cursor=CURSOR),
+    "projects client_id": lambda db: crud.get_projects(db, client_id=1),
+    "projects client_id cursor": lambda db: crud.get_projects(db, client_id=1, cursor=CURSOR),
+    "tasks project_id": lambda db: crud.get_tasks(db, project_id=1),
+    "tasks client_id": lambda db: crud.get_tasks(db, client_id=1),
+    "tasks status": lambda db: crud.get_tasks(db, status="new"),
+    "tasks status cursor": lambda db: crud.get_tasks(db, status="new", cursor=CURSOR),
+    "proposals client_id": lambda db: crud.get_proposals(db, client_id=1),
+    "proposals status": lambda db: crud.get_proposals(db, status="sent"),
+    "invoices": lambda db: invoices(db),
+    "invoices cursor": lambda db: invoices(db, cursor=INVOICE_CURSOR),
+    "invoices status": lambda db: invoices(db, status=InvoiceStatus.SENT),
+    "invoices client_id": lambda db: invoices(db, client_id=1),
+    "invoices project_id": lambda db: invoices(db, project_id=1),
+    "overdue sweep": mark_overdue_invoices,
+    "dashboard tasks due": lambda db: crud.count_tasks_due(db, date(2024, 1, 1), date(2024, 1, 7)),
+    "calendar month": lambda db: crud.get_calendar_events(db, date(2024, 1, 1), date(2024, 1, 31)),
+    "calendar assignee": lambda db: crud.get_calendar_events(db, date(2024, 1, 1), date(2024, 1, 31), "Анна"),
+}
+
+# Списки без фильтров читают таблицу в порядке первичного ключа (rowid)
+# и останавливаются на LIMIT - в плане это тоже SCAN
+ORDERED_SCANS = {"clients"}
+
+
+def seed(db):
+    # По одной строке, чтобы сработали selectinload по contacts/items
+    db.execute(text("INSERT INTO clients (id, name, contact_person, phone) VALUES (1, 'c', 'c', '1')"))
+    db.execute(text("INSERT INTO proposals (id, client_id, title) VALUES (1, 1, 'p')"))
+    db.execute(text("INSERT INTO invoices (id, client_id, invoice_number, created_at, status) VALUES (1, 1, 'INV', '2020-01-01', 'SENT')"))
+    db.execute(text("INSERT INTO projects (id, client_id, name) VALUES (1, 1, 'p')"))
+    db.execute(text("INSERT INTO tasks (id, project_id, client_id, title, status) VALUES (1, 1, 1, 't', 'new')"))
+    db.execute(text("INSERT INTO proposals (id, client_id, title, status) VALUES (2, 1, 'p', 'sent')"))
+    db.commit()
+
+
+def bad_steps(plan, allow_scan=False):
+    for _, _, _, detail in plan:
+        full_scan = detail.startswith("SCAN") and "USING" not in detail and not allow_scan
+        if full_scan or "TEMP B-TREE" in detail:
+            yield detail
+
+
+# UNION ALL, которые должны собираться и в PostgreSQL
+UNIONS = {
+    "calendar union": calendar_query(date(2024, 1, 1), date(2024, 1, 31)),
+}
+
+
+def union_type_conflicts(query, dialect):
+    """Колонки UNION, у частей которого разные типы в dialect (NULL не считается)"""
+    query.compile(dialect=dialect)
+    columns = zip(*(select.selected_columns for select in query.selects))
+    for parts in columns:
+        types = {column.type.compile(dialect=dialect) for column in parts if not isinstance(column.type, NullType)}
+        if len(types) > 1:
+            yield f"{parts[0].name}: {', '.join(sorted(types))}"
+
+
+def main() -> int:
+    db = SessionLocal()
+    seed(db)
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE")):
+            statements.append((statement, parameters))
+
+    failed = False
+    for name, case in CASES.items():
+        statements.clear()
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            case(db)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+        db.rollback()
+        for statement, parameters in statements:
+            plan = db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+            bad = list(bad_steps(plan, allow_scan=name in ORDERED_SCANS))
+            failed |= bool(bad)
+            summary = "; ".join(row[3] for row in plan)
+            print(f"{'FAIL' if bad else 'OK  '} {name:<28} {summary}")
+    db.close()
+
+    dialect = postgresql.dialect()
+    for name, query in UNIONS.items():
+        conflicts = list(union_type_conflicts(query, dialect))
+        failed |= bool(conflicts)
+        print(f"{'FAIL' if conflicts else 'OK  '} {name + ' (postgresql)':<28} {'; '.join(conflicts) or 'types match'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Полные строки списков против fields=summary
+Заполняет --rows клиентов (с контактами), проектов, задач, КП и счетов (с
+позициями) с длинными текстовыми полями и для каждого списка сравнивает
+страницу --limit строк: полную схему и fields=summary. Печатает размер
+ответа и задержку p50 (кэш ответов выключен, ETag не используется).
+Использование:
+  python -m benchmarks.fields --rows 2000 --limit 100
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "fields.db")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.database import SessionLocal
+from app.main import app
+from app.models import Client, Contact, Invoice, InvoiceItem, Project, Proposal, ProposalItem, Task
+
+PATHS = ["/api/clients", "/api/projects", "/api/tasks", "/api/proposals", "/invoices/"]
+
+DUE = datetime(2025, 2, 1)
+TEXT = "Длинный текст заметки о клиенте и условиях работы. " * 40
+
+
+def seed(rows: int) -> None:
+    # Напрямую в БД: через API заполнение заняло бы минуты
+    db = SessionLocal()
+    ids = range(1, rows + 1)
+    db.execute(insert(Client), [
+        {"id": i, "name": f"Клиент {i}", "contact_person": "Иван", "phone": "+7", "notes": TEXT,
+         "address": "Москва, ул. Ленина, 1"} for i in ids
+    ])
+    db.execute(insert(Contact), [
+        {"client_id": i, "name": f"Контакт {j}", "phone": "+7"} for i in ids for j in range(2)
+    ])
+    db.execute(insert(Project), [
+        {"id": i, "client_id": i, "name": f"Проект {i}", "description": TEXT} for i in ids
+    ])
+    db.execute(insert(Task), [
+        {"id": i, "project_id": i, "client_id": i, "title": f"Задача {i}", "description": TEXT} for i in ids
+    ])
+    db.execute(insert(Proposal), [
+        {"id": i, "client_id": i, "title": f"КП {i}", "number": f"KP-{i}", "description": TEXT,
+         "terms": TEXT, "notes": TEXT, "subtotal": 1000, "total": 1000} for i in ids
+    ])
+    db.execute(insert(ProposalItem), [
+        {"proposal_id": i, "name": f"Услуга {j}", "description": TEXT, "price": 100, "total": 100}
+        for i in ids for j in range(5)
+    ])
+    db.execute(insert(Invoice), [
+        {"id": i, "invoice_number": f"INV-{i}", "client_id": i, "project_id": i, "title": f"Счет {i}",
+         "due_date": DUE, "description": TEXT, "notes": TEXT, "terms": TEXT, "total": 1000} for i in ids
+    ])
+    db.execute(insert(InvoiceItem), [
+        {"invoice_id": i, "name": f"Услуга {j}", "description": TEXT, "price": 100}
+        for i in ids for j in range(5)
+    ])
+    db.commit()
+    db.close()
+
+
+def measure(client: TestClient, path: str, params: dict, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        response = client.get(path, params=params)
+        timings.append(time.perf_counter() - t0)
+        response.raise_for_status()
+    return len(response.content), statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    seed(args.rows)
+    with TestClient(app) as client:
+        print(f"{'список':<16} {'полный':>10} {'summary':>10} {'размер':>8} {'полный':>9} {'summary':>9} {'время':>7}")
+        for path in PATHS:
+            full_size, full_time = measure(client, path, {"limit": args.limit}, args.repeat)
+            summary_size, summary_time = measure(client, path, {"limit": args.limit, "fields": "summary"}, args.repeat)
+            print(f"{path:<16} {full_size / 1024:>8.1f}КБ {summary_size / 1024:>8.1f}КБ {summary_size / full_size:>7.0%}"
+                  f" {full_time * 1000:>7.1f}мс {summary_time * 1000:>7.1f}мс {summary_time / full_time:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Правка одной позиции сметы: полная перезапись против изменения по разнице
+Создает КП и счет по --items позиций и --repeat раз меняет цену одной
+позиции тремя способами:
+  replace  - PUT с позициями без id (как раньше: все строки удаляются и
+             вставляются заново)
+  diff     - PUT с id позиций (обновляется одна строка)
+  patch    - PATCH /{id}/items/{item_id}
+Печатает число измененных строк позиций за запрос и задержку p50 (вместе
+с GET документа перед каждой правкой).
+Использование:
+  python -m benchmarks.line_items --items 300
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "line_items.db")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import engine
+from app.main import app
+
+ITEM_FIELDS = ("id", "name", "description", "quantity", "unit", "price")
+
+
+class RowCounter:
+    """Строки позиций, затронутые INSERT/UPDATE/DELETE"""
+
+    def __init__(self):
+        self.rows = 0
+        self.contexts = set()
+        event.listen(engine, "after_cursor_execute", self.count)
+
+    def count(self, conn, cursor, statement, parameters, context, executemany):
+        verb = statement.split(None, 1)[0]
+        # rowcount у executemany и RETURNING ненадежен, а вставка пачкой
+        # выполняется несколькими курсорами одного контекста - считаем
+        # строки параметров по одному разу на контекст
+        if verb in ("INSERT", "UPDATE", "DELETE") and "_items" in statement.split("(", 1)[0] \
+                and id(context) not in self.contexts:
+            self.contexts.add(id(context))
+            self.rows += len(context.compiled_parameters)
+
+
+def measure(counter: RowCounter, request, repeat: int):
+    timings, rows = [], 0
+    for i in range(repeat):
+        counter.rows = 0
+        counter.contexts.clear()
+        t0 = time.perf_counter()
+        request(i).raise_for_status()
+        timings.append(time.perf_counter() - t0)
+        rows += counter.rows
+    return rows / repeat, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    counter = RowCounter()
+    with TestClient(app) as client:
+        client_id = client.post("/api/clients", json={"name": "Клиент", "contact_person": "Иван", "phone": "+7"}).json()["id"]
+        items = [{"name": f"Позиция {j}", "price": 100, "quantity": 2} for j in range(args.items)]
+        documents = {
+            "КП": ("/api/proposals", client.post("/api/proposals", json={
+                "title": "КП", "client_id": client_id, "items": items,
+            }).json()),
+            "счет": ("/invoices", client.post("/invoices/", json={
+                "title": "Счет", "client_id": client_id, "due_date": "2030-01-01T00:00:00", "items": items,
+            }).json()),
+        }
+
+        print(f"{'документ':<8} {'способ':<8} {'строк':>7} {'p50':>9}")
+        for name, (path, document) in documents.items():
+            url = f"{path}/{document['id']}"
+
+            def current_items():
+                return [{key: item[key] for key in ITEM_FIELDS} for item in client.get(url).json()["items"]]
+
+            def replace(i):
+                body = [{key: value for key, value in item.items() if key != "id"} for item in current_items()]
+                body[0]["price"] = 100 + i
+                return client.put(url, json={"items": body})
+
+            def diff(i):
+                body = current_items()
+                body[0]["price"] = 200 + i
+                return client.put(url, json={"items": body})
+
+            def patch(i):
+                return client.patch(f"{url}/items/{current_items()[0]['id']}", json={"price": 300 + i})
+
+            for method, request in (("replace", replace), ("diff", diff), ("patch", patch)):
+                rows, p50 = measure(counter, request, args.repeat)
+                print(f"{name:<8} {method:<8} {rows:>7.0f} {p50 * 1000:>7.1f}мс")
+
+
+if __name__ == "__main__":
+    main()
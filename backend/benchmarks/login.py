@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Всплеск входов: задержка логина и остальных эндпоинтов
+Сравнивает хеширование в потоке запроса (PASSWORD_HASH_WORKERS=0) и в пуле
+процессов: p99 /api/auth/login и p99 GET /api/projects, который идет
+параллельно с логинами.
+Использование:
+  python -m benchmarks.login --logins 50 --others 20 --duration 10 --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.async_db import percentile
+
+USERNAME = "bench"
+PASSWORD = "bench-password"
+
+
+async def drive(logins: int, others: int, duration: float) -> dict:
+    import httpx
+    from app.auth import password_hasher
+    from app.main import app
+
+    login_ms, other_ms = [], []
+    rejected = 0
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            deadline = time.perf_counter() + duration
+
+            async def login():
+                nonlocal rejected
+                while time.perf_counter() < deadline:
+                    t0 = time.perf_counter()
+                    response = await client.post("/api/auth/login", json={"username": USERNAME, "password": PASSWORD})
+                    if response.status_code == 503:
+                        rejected += 1
+                        await asyncio.sleep(0.05)
+                        continue
+                    login_ms.append((time.perf_counter() - t0) * 1000)
+
+            async def other():
+                while time.perf_counter() < deadline:
+                    t0 = time.perf_counter()
+                    await client.get("/api/projects?limit=20")
+                    other_ms.append((time.perf_counter() - t0) * 1000)
+
+            await asyncio.gather(*[login() for _ in range(logins)], *[other() for _ in range(others)])
+    stats = password_hasher.stats()
+
+    return {
+        "logins": len(login_ms),
+        "rejected": rejected,
+        "login_p50_ms": percentile(login_ms, 0.5) if login_ms else None,
+        "login_p99_ms": percentile(login_ms, 0.99) if login_ms else None,
+        "other_requests": len(other_ms),
+        "other_p99_ms": percentile(other_ms, 0.99),
+        "hasher": stats,
+    }
+
+
+def seed(rounds: int):
+    from passlib.context import CryptContext
+    from app.database import SessionLocal, engine, Base
+    from app.models import User
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+    db.add(User(email="bench@example.com", username=USERNAME, full_name="Bench",
+                hashed_password=context.hash(PASSWORD)))
+    db.commit()
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=50, help="одновременных логинов")
+    parser.add_argument("--others", type=int, default=20, help="одновременных клиентов GET /api/projects")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(drive(args.logins, args.others, args.duration))))
+        return
+
+    url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_login.db")
+    os.environ.update(DATABASE_URL=url, BCRYPT_ROUNDS=str(args.rounds))
+    seed(args.rounds)
+
+    print(f"{args.logins} логинов + {args.others} клиентов GET /api/projects, {args.duration:.0f} с, bcrypt rounds={args.rounds}")
+    print(f"{'хеширование':>16} {'логинов':>8} {'503':>5} {'login p50':>10} {'login p99':>10} {'other p99':>10}")
+    for workers in (0, args.workers):
+        env = dict(os.environ, PASSWORD_HASH_WORKERS=str(workers), SCHEDULER_ENABLED="false")
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.login", "--worker", "--logins", str(args.logins),
+             "--others", str(args.others), "--duration", str(args.duration)],
+            env=env, check=True, capture_output=True, text=True,
+        )
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        name = "в потоке" if workers == 0 else f"пул x{workers}"
+        login_p50 = f"{r['login_p50_ms']:.0f}" if r["login_p50_ms"] is not None else "-"
+        login_p99 = f"{r['login_p99_ms']:.0f}" if r["login_p99_ms"] is not None else "-"
+        print(f"{name:>16} {r['logins']:>8} {r['rejected']:>5} {login_p50:>10} {login_p99:>10} {r['other_p99_ms']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Накладные расходы метрик на запрос
+Гоняет --requests вызовов минимального ASGI-приложения (маршрут уже
+найден, ответ из двух сообщений) напрямую и через MetricsMiddleware и
+печатает разницу на запрос - чистую стоимость middleware без сети и
+роутинга; отдельно - замер ожидания соединения в пуле (TimedQueuePool
+против QueuePool) и время сборки /metrics при --routes сериях.
+Код 1, если middleware дороже BUDGET_US микросекунд на запрос.
+Использование:
+  python -m benchmarks.metrics --requests 200000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "metrics.db")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from app import metrics
+from app.database import TimedQueuePool
+
+BUDGET_US = 20
+
+
+class Route:
+    path_format = "/api/clients/{client_id}"
+
+
+ROUTE = Route()
+START = {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]}
+BODY = {"type": "http.response.body", "body": b"{}"}
+
+
+async def endpoint(scope, receive, send):
+    scope["route"] = ROUTE
+    await send(START)
+    await send(BODY)
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+async def run(app, requests: int) -> float:
+    """Секунд на запрос"""
+    t0 = time.perf_counter()
+    for _ in range(requests):
+        scope = {"type": "http", "method": "GET", "path": "/api/clients/1"}
+        await app(scope, receive, send)
+    return (time.perf_counter() - t0) / requests
+
+
+def checkout_cost(poolclass, checkouts: int) -> float:
+    """Секунд на connect()/close() из прогретого пула"""
+    engine = create_engine(os.environ["DATABASE_URL"], poolclass=poolclass, pool_size=1)
+    engine.connect().close()
+    t0 = time.perf_counter()
+    for _ in range(checkouts):
+        engine.connect().close()
+    elapsed = (time.perf_counter() - t0) / checkouts
+    engine.dispose()
+    return elapsed
+
+
+async def render_cost(routes: int) -> float:
+    for i in range(routes):
+        for status in (200, 404):
+            metrics.observe_request("GET", f"/api/route{i}/{{id}}", status, 0.01)
+    metrics.render()  # первый вызов импортирует модули приложения
+    t0 = time.perf_counter()
+    text = metrics.render()
+    elapsed = time.perf_counter() - t0
+    print(f"/metrics: {routes * 2} серий, {len(text) // 1024} КиБ, {elapsed * 1000:.1f} мс")
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--routes", type=int, default=100, help="маршрутов для замера /metrics")
+    args = parser.parse_args()
+
+    wrapped = metrics.MetricsMiddleware(endpoint)
+    base, measured = [], []
+    for _ in range(args.rounds):
+        base.append(asyncio.run(run(endpoint, args.requests)))
+        measured.append(asyncio.run(run(wrapped, args.requests)))
+    overhead = (statistics.median(measured) - statistics.median(base)) * 1e6
+    print(f"без middleware  {statistics.median(base) * 1e6:6.2f} мкс/запрос")
+    print(f"с middleware    {statistics.median(measured) * 1e6:6.2f} мкс/запрос")
+    print(f"накладные       {overhead:6.2f} мкс/запрос (бюджет {BUDGET_US})")
+
+    checkouts = args.requests // 10
+    plain, timed = checkout_cost(QueuePool, checkouts), checkout_cost(TimedQueuePool, checkouts)
+    print(f"пул соединений  {(timed - plain) * 1e6:6.2f} мкс/checkout ({plain * 1e6:.1f} -> {timed * 1e6:.1f})")
+
+    asyncio.run(render_cost(args.routes))
+    return 1 if overhead > BUDGET_US else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк пагинации списков: skip/limit против курсора
+Использование:
+  python -m benchmarks.pagination --rows 1000000
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.database import Base
+from app.models import Client, Invoice
+from app.pagination import encode_cursor, paginate
+from app.routers.invoices import INVOICE_ORDER
+
+CHUNK = 50_000
+
+
+def seed(engine, rows: int):
+    start = datetime(2020, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Client), [{"id": 1, "name": "Seed", "contact_person": "Seed", "phone": "+7"}])
+    for offset in range(0, rows, CHUNK):
+        size = min(CHUNK, rows - offset)
+        with engine.begin() as conn:
+            conn.execute(insert(Client), [
+                {
+                    "id": offset + i + 2,
+                    "name": f"Client {offset + i}",
+                    "contact_person": "Иван Иванов",
+                    "phone": "+7 900 000-00-00",
+                }
+                for i in range(size)
+            ])
+            conn.execute(insert(Invoice), [
+                {
+                    "id": offset + i + 1,
+                    "invoice_number": f"INV-BENCH-{offset + i}",
+                    "client_id": 1,
+                    "title": "Счет",
+                    "due_date": start,
+                    "created_at": start + timedelta(seconds=offset + i),
+                }
+                for i in range(size)
+            ])
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_pagination.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    print(f"Заполнение {args.rows} строк в {path} ...")
+    seed(engine, args.rows)
+    db = sessionmaker(bind=engine)()
+
+    limit = args.limit
+    pages = [p for p in (1, 10, 100, 500, 1000, 5000) if (p - 1) * limit < args.rows]
+    print(f"{'страница':>10} {'clients skip':>14} {'clients cursor':>15} {'invoices skip':>15} {'invoices cursor':>16}  (мс, медиана)")
+    for page in pages:
+        skip = (page - 1) * limit
+        # Курсор, который клиент получил бы на предыдущей странице
+        client_cursor = encode_cursor([skip + 1]) if skip else None
+        last_created = datetime(2020, 1, 1) + timedelta(seconds=args.rows - skip)
+        invoice_cursor = encode_cursor([last_created, args.rows - skip + 1]) if skip else None
+
+        def invoices(cursor=None, skip=0):
+            return paginate(db.query(Invoice), INVOICE_ORDER, skip, limit, cursor, descending=True).all()
+
+        results = (
+            timed(lambda: crud.get_clients(db, skip=skip, limit=limit), args.repeat),
+            timed(lambda: crud.get_clients(db, limit=limit, cursor=client_cursor), args.repeat),
+            timed(lambda: invoices(skip=skip), args.repeat),
+            timed(lambda: invoices(cursor=invoice_cursor), args.repeat),
+        )
+        db.expunge_all()
+        print(f"{page:>10} {results[0]:>14.2f} {results[1]:>15.2f} {results[2]:>15.2f} {results[3]:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
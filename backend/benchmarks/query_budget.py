@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Проверка бюджета SQL-запросов на эндпоинт
+Поднимает приложение на временной SQLite, заполняет по PAGE записей
+с вложенными контактами/позициями и падает с кодом 1, если какой-то
+эндпоинт выполнил больше запросов, чем для него объявлено. Повторные
+запросы с If-None-Match должны получать 304 за один запрос. Кэш ответов
+(app/response_cache.py) выключен: иначе он отвечает на повтор сам, и путь
+ETag через get_list_validators не выполняется.
+Использование:
+  python -m benchmarks.query_budget
+"""
+
+import os
+import sys
+import tempfile
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "query_budget.db")
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import engine, async_engine
+from app.main import app
+
+PAGE = 100
+
+# Эндпоинт -> максимально допустимое число запросов
+# (списки - плюс запрос версии для ETag)
+BUDGETS = {
+    "/api/clients": 3,
+    "/api/clients/1": 2,
+    "/api/projects": 2,
+    "/api/tasks": 2,
+    "/api/proposals": 3,
+    "/api/proposals/1": 2,
+    "/invoices/": 3,
+    "/invoices/1": 2,
+    "/api/dashboard/summary": 2,
+    "/api/calendar?from=2030-01-01&to=2030-01-31": 1,
+}
+
+# Повтор с If-None-Match: ответ 304 по одному запросу версии
+REVALIDATE_BUDGET = 1
+REVALIDATED = [path for path in BUDGETS if not path.startswith(("/api/dashboard", "/api/calendar"))]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def seed(client: TestClient):
+    for i in range(PAGE):
+        client_id = client.post("/api/clients", json={
+            "name": f"Клиент {i}", "contact_person": "Иван", "phone": "+7",
+        }).json()["id"]
+        for j in range(2):
+            client.post(f"/api/clients/{client_id}/contacts", json={"name": f"Контакт {j}", "phone": "+7"})
+        project_id = client.post("/api/projects", json={"name": f"Проект {i}", "client_id": client_id}).json()["id"]
+        client.post("/api/tasks", json={"title": f"Задача {i}", "project_id": project_id})
+        items = [{"name": f"Позиция {j}", "price": 100} for j in range(3)]
+        client.post("/api/proposals", json={"title": f"КП {i}", "client_id": client_id, "items": items})
+        client.post("/invoices/", json={
+            "title": f"Счет {i}", "client_id": client_id, "due_date": "2030-01-01T00:00:00", "items": items,
+        })
+
+
+def main() -> int:
+    client = TestClient(app)
+    seed(client)
+
+    counter = QueryCounter()
+    # При DB_ASYNC=true async-роутеры ходят в БД через async_engine
+    engines = [engine] + ([async_engine.sync_engine] if async_engine is not None else [])
+    for target in engines:
+        event.listen(target, "before_cursor_execute", counter)
+    failed = False
+    try:
+        for path, budget in BUDGETS.items():
+            counter.count = 0
+            response = client.get(path, params={"limit": PAGE} if not path[-1].isdigit() else None)
+            ok = response.status_code == 200 and counter.count <= budget
+            failed |= not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {path:<20} {counter.count:>3} запросов (бюджет {budget}), HTTP {response.status_code}")
+        for path in REVALIDATED:
+            params = {"limit": PAGE} if not path[-1].isdigit() else None
+            etag = client.get(path, params=params).headers.get("etag")
+            counter.count = 0
+            response = client.get(path, params=params, headers={"If-None-Match": etag or ""})
+            ok = response.status_code == 304 and counter.count <= REVALIDATE_BUDGET
+            failed |= not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {path + ' (304)':<20} {counter.count:>3} запросов (бюджет {REVALIDATE_BUDGET}), HTTP {response.status_code}")
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", counter)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
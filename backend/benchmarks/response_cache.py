@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Кэш ответов списков: повторные запросы с кэшем и без
+Создает --projects проектов по --tasks задач и --requests раз запрашивает
+GET /api/tasks?project_id=X и GET /api/proposals?client_id=Y по кругу -
+как открытые вкладки браузера. Печатает время запроса без кэша, с кэшем
+и счетчики кэша; затем проверяет, что запись сбрасывает закэшированный список.
+Использование:
+  python -m benchmarks.response_cache --projects 20 --tasks 100
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "response_cache.db")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.response_cache import LocalBackend, response_cache
+from app.database import settings
+
+
+def seed(client: TestClient, projects: int, tasks: int) -> list:
+    paths = []
+    for i in range(projects):
+        client_id = client.post("/api/clients", json={
+            "name": f"Клиент {i}", "contact_person": "Иван", "phone": "+7",
+        }).json()["id"]
+        project_id = client.post("/api/projects", json={"name": f"Проект {i}", "client_id": client_id}).json()["id"]
+        client.post("/api/tasks/bulk", json={"items": [
+            {"title": f"Задача {j}", "project_id": project_id, "client_id": client_id} for j in range(tasks)
+        ]}).raise_for_status()
+        items = [{"name": f"Позиция {j}", "price": 100} for j in range(3)]
+        for j in range(5):
+            client.post("/api/proposals", json={"title": f"КП {j}", "client_id": client_id, "items": items})
+        paths += [f"/api/tasks?project_id={project_id}", f"/api/proposals?client_id={client_id}"]
+    return paths
+
+
+def measure(client: TestClient, paths: list, requests: int) -> list:
+    timings = []
+    for i in range(requests):
+        t0 = time.perf_counter()
+        client.get(paths[i % len(paths)]).raise_for_status()
+        timings.append(time.perf_counter() - t0)
+    return timings
+
+
+def report(name: str, timings: list) -> None:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95)]
+    print(f"{name:<12} p50 {statistics.median(timings) * 1000:>7.2f} мс  p95 {p95 * 1000:>7.2f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--tasks", type=int, default=100, help="задач в проекте")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        paths = seed(client, args.projects, args.tasks)
+        backend = response_cache.backend
+
+        response_cache.backend = None
+        report("без кэша", measure(client, paths, args.requests))
+
+        response_cache.backend = backend or LocalBackend(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL)
+        measure(client, paths, len(paths))  # прогрев
+        report("с кэшем", measure(client, paths, args.requests))
+        print(response_cache.stats())
+
+        # Запись сбрасывает список: новая задача видна в следующем ответе
+        project_id = int(paths[0].rsplit("=", 1)[1])
+        path = f"/api/tasks?project_id={project_id}&limit=1000"
+        before = len(client.get(path).json())
+        client.post("/api/tasks", json={"title": "Новая", "project_id": project_id}).raise_for_status()
+        after = len(client.get(path).json())
+        print(f"инвалидация: {'OK' if after == before + 1 else 'FAIL'} ({before} -> {after})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Отчет о выручке: сводка revenue_rollup против загрузки всех счетов
+Заполняет --invoices счетов за --months месяцев по --clients клиентам,
+пересчитывает сводку (python -m app.revenue) и сравнивает:
+  invoices - загрузить все Invoice и сгруппировать по месяцу и клиенту
+             в Python (как отчет пришлось бы строить без сводки)
+  rollup   - GET /api/reports/revenue?group_by=month&group_by=client
+             (кэш ответов выключен)
+Печатает p50, время пересчета и сверки сводки.
+Использование:
+  python -m benchmarks.revenue --invoices 100000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "revenue.db")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app import revenue
+from app.database import SessionLocal, engine
+from app.main import app
+from app.models import Client, Invoice, InvoiceStatus
+
+START = datetime(2022, 1, 1)
+
+
+def seed(invoices: int, months: int, clients: int) -> None:
+    # Напрямую в БД: сводку затем пересчитываем целиком
+    db = SessionLocal()
+    db.execute(insert(Client), [
+        {"id": i, "name": f"Клиент {i}", "contact_person": "Иван", "phone": "+7"} for i in range(1, clients + 1)
+    ])
+    rng = random.Random(1)
+    statuses = list(InvoiceStatus)
+    db.execute(insert(Invoice), [
+        {"id": i, "invoice_number": f"INV-{i}", "client_id": rng.randint(1, clients), "title": f"Счет {i}",
+         "issue_date": START + timedelta(days=rng.randrange(months * 30)), "due_date": START,
+         "status": rng.choice(statuses), "total": rng.randint(1, 1000) * 100.0}
+        for i in range(1, invoices + 1)
+    ])
+    db.commit()
+    db.close()
+
+
+def load_invoices() -> dict:
+    db = SessionLocal()
+    report = defaultdict(float)
+    for invoice in db.query(Invoice):
+        report[(invoice.issue_date.strftime("%Y-%m"), invoice.client_id)] += invoice.total
+    db.close()
+    return report
+
+
+def p50(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invoices", type=int, default=100000)
+    parser.add_argument("--months", type=int, default=36)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    seed(args.invoices, args.months, args.clients)
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        rows = revenue.rebuild(conn)
+    print(f"пересчет сводки: {time.perf_counter() - t0:.2f} с, строк {rows}")
+
+    with TestClient(app) as client:
+        params = {"group_by": ["month", "client"]}
+        report = client.get("/api/reports/revenue", params=params).json()
+        expected = load_invoices()
+        assert len(report) == len(expected)
+        assert all(abs(expected[(row["month"], row["client_id"])] - row["amount"]) < 0.01 for row in report)
+        slow = p50(load_invoices, args.repeat)
+        fast = p50(lambda: client.get("/api/reports/revenue", params=params).raise_for_status(), args.repeat * 10)
+    print(f"invoices  p50 {slow * 1000:>9.1f} мс")
+    print(f"rollup    p50 {fast * 1000:>9.1f} мс  ({slow / fast:.0f}x)")
+
+    t0 = time.perf_counter()
+    with engine.connect() as conn:
+        problems = revenue.check(conn)
+    print(f"сверка: {time.perf_counter() - t0:.2f} с, расхождений {len(problems)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Задержка полнотекстового поиска на большом индексе
+Заполняет временную БД --docs задачами из случайных слов (частоты по
+Ципфу), перестраивает индекс и в отдельном процессе, как после перезапуска
+сервера, измеряет GET /api/search (p50/p95/p99).
+Использование:
+  python -m benchmarks.search --docs 1000000 --queries 200
+"""
+
+import argparse
+import itertools
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.async_db import percentile
+
+LETTERS = "абвгдежзиклмнопрстуфхцчшэюя"
+ENDINGS = ["", "а", "ы", "ом", "ами", "ов", "у", "е"]
+
+
+class Vocabulary:
+    """Синтетический словарь с распределением частот по закону Ципфа"""
+
+    def __init__(self, size: int, seed: int = 42):
+        rng = random.Random(seed)
+        self.stems = list({"".join(rng.choices(LETTERS, k=rng.randint(4, 9))) for _ in range(size)})
+        self.cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(self.stems) + 1)))
+
+    def words(self, rng: random.Random, count: int) -> str:
+        stems = rng.choices(self.stems, cum_weights=self.cum_weights, k=count)
+        return " ".join(stem + rng.choice(ENDINGS) for stem in stems)
+
+
+def seed(docs: int, vocabulary: Vocabulary) -> None:
+    from sqlalchemy import insert
+    from app.database import engine
+    from app.main import app  # noqa: F401 - создание схемы и индекса
+    from app.models import Task
+    from app.search import rebuild
+
+    rng = random.Random(42)
+    batch = 50000
+    with engine.begin() as conn:
+        for start in range(0, docs, batch):
+            conn.execute(insert(Task), [
+                {"title": vocabulary.words(rng, 4), "description": vocabulary.words(rng, 12), "status": "new"}
+                for i in range(start, min(docs, start + batch))
+            ])
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        rebuild(conn)
+    print(f"Индекс: {docs} документов за {time.perf_counter() - t0:.0f} с")
+    # Перенос WAL в основной файл: замеры - в установившемся режиме, а не
+    # сразу после записи гигабайта
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def measure(vocabulary: Vocabulary, queries: int) -> None:
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    rng = random.Random(7)
+    with TestClient(app) as client:
+        for name, words in (("одно слово", 1), ("два слова", 2), ("три слова", 3)):
+            samples = []
+            for _ in range(queries):
+                t0 = time.perf_counter()
+                client.get("/api/search", params={"q": vocabulary.words(rng, words), "limit": 20}).raise_for_status()
+                samples.append((time.perf_counter() - t0) * 1000)
+            print(f"{name:<12} p50 {percentile(samples, 0.5):7.1f} мс  p95 {percentile(samples, 0.95):7.1f} мс"
+                  f"  p99 {percentile(samples, 0.99):7.1f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--vocabulary", type=int, default=20000, help="различных слов")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    vocabulary = Vocabulary(args.vocabulary)
+    if args.worker:
+        measure(vocabulary, args.queries)
+        return
+
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "search.db")
+    os.environ.setdefault("SCHEDULER_ENABLED", "false")
+    seed(args.docs, vocabulary)
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.search", "--worker", "--queries", str(args.queries),
+         "--vocabulary", str(args.vocabulary)],
+        check=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
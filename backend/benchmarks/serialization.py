@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Время сериализации ответов на 1000 строк по схемам app/schemas
+Для каждой схемы ответа строит --rows ORM-объектов в памяти (КП и счета -
+с --items позициями, клиенты - с двумя контактами) и сравнивает:
+  fastapi  - путь FastAPI до изменений: response_model (проверка и dump в
+             словари) + JSONResponse (json.dumps)
+  orjson   - тот же путь с ORJSONResponse (ответы-объекты)
+  adapter  - TypeAdapter схемы: ORM-объекты сразу в JSON (списки)
+Печатает мс на 1000 строк (лучшее из --repeat) и ускорение.
+Использование:
+  python -m benchmarks.serialization --rows 1000 --items 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "serialization.db"))
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app import models, schemas
+from app.serialization import render
+
+NOW = datetime(2025, 1, 15, 12, 30)
+
+
+def client_row(i: int, items: int) -> models.Client:
+    client = models.Client(
+        id=i, name=f"ООО «Клиент {i}»", contact_person="Иван Петров", email=f"client{i}@example.com",
+        phone="+7 900 123-45-67", status="active", inn="7701234567", address="Москва, ул. Ленина, 1",
+        notes="Постоянный клиент", created_at=NOW, updated_at=NOW, last_contact=NOW,
+    )
+    client.contacts = [
+        models.Contact(id=i * 2 + j, client_id=i, name=f"Контакт {j}", position="Менеджер",
+                       phone="+7 900 000-00-00", email="contact@example.com", created_at=NOW)
+        for j in range(2)
+    ]
+    return client
+
+
+def project_row(i: int, items: int) -> models.Project:
+    return models.Project(
+        id=i, client_id=i, name=f"Проект {i}", description="Разработка сайта", status="in_progress",
+        our_budget=150000.0, ad_budget=50000.0, budget_currency="RUB", created_at=NOW, updated_at=NOW,
+    )
+
+
+def task_row(i: int, items: int) -> models.Task:
+    return models.Task(
+        id=i, project_id=i, client_id=i, title=f"Задача {i}", description="Подготовить макеты",
+        status="in_progress", priority="high", due_date=datetime(2025, 1, 20), assignee="Анна", created_at=NOW, updated_at=NOW,
+    )
+
+
+def proposal_row(i: int, items: int) -> models.Proposal:
+    proposal = models.Proposal(
+        id=i, client_id=i, title=f"КП {i}", number=f"KP-202501-{i:04d}", status="sent",
+        valid_until=date(2025, 2, 15), description="Коммерческое предложение", subtotal=50000.0,
+        discount=5.0, total=47500.0, created_at=NOW, updated_at=NOW,
+    )
+    proposal.items = [
+        models.ProposalItem(id=i * items + j, proposal_id=i, name=f"Услуга {j}", quantity=2.0,
+                            unit="шт", price=5000.0, total=10000.0)
+        for j in range(items)
+    ]
+    return proposal
+
+
+def invoice_row(i: int, items: int) -> models.Invoice:
+    invoice = models.Invoice(
+        id=i, invoice_number=f"INV-202501-{i:04d}", client_id=i, project_id=i, title=f"Счет {i}",
+        issue_date=NOW, due_date=NOW + timedelta(days=14), subtotal=50000.0, tax_rate=20.0,
+        tax_amount=10000.0, discount=0.0, total=60000.0, status=models.InvoiceStatus.SENT,
+        created_at=NOW, updated_at=NOW,
+    )
+    invoice.items = [
+        models.InvoiceItem(id=i * items + j, invoice_id=i, name=f"Услуга {j}", quantity=2.0,
+                           unit="шт", price=5000.0, created_at=NOW)
+        for j in range(items)
+    ]
+    return invoice
+
+
+def user_row(i: int, items: int) -> models.User:
+    return models.User(
+        id=i, email=f"user{i}@example.com", username=f"user{i}", full_name="Анна Смирнова",
+        role="employee", is_active=True, created_at=NOW, updated_at=NOW, last_login=NOW,
+    )
+
+
+def search_row(i: int, items: int) -> dict:
+    return {"kind": "task", "id": i, "title": f"Задача {i}", "score": 1.5}
+
+
+# Схема ответа -> построитель строки
+CASES = [
+    (schemas.Client, client_row),
+    (schemas.Project, project_row),
+    (schemas.Task, task_row),
+    (schemas.Proposal, proposal_row),
+    (schemas.Invoice, invoice_row),
+    (schemas.User, user_row),
+    (schemas.SearchResult, search_row),
+]
+
+
+def best(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def fastapi_path(field, rows, response_class):
+    content = asyncio.run(serialize_response(field=field, response_content=rows))
+    return response_class(content).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=5, help="позиций в КП и счете")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    scale = 1000 / args.rows
+    print(f"{'схема':<14} {'fastapi':>9} {'orjson':>9} {'adapter':>9} {'ускорение':>10}   мс на 1000 строк")
+    for schema, build in CASES:
+        rows = [build(i, args.items) for i in range(1, args.rows + 1)]
+        field = create_model_field(name="Response", type_=List[schema], mode="serialization")
+        before = fastapi_path(field, rows, JSONResponse)
+        after = render(List[schema], rows)
+        # Одинаковые данные на выходе (форматирование JSON у путей разное)
+        assert json.loads(before) == json.loads(after), schema.__name__
+        fastapi = best(lambda: fastapi_path(field, rows, JSONResponse), args.repeat) * scale
+        orjson = best(lambda: fastapi_path(field, rows, ORJSONResponse), args.repeat) * scale
+        adapter = best(lambda: render(List[schema], rows), args.repeat) * scale
+        print(f"{schema.__name__:<14} {fastapi * 1000:>9.2f} {orjson * 1000:>9.2f} {adapter * 1000:>9.2f} {fastapi / adapter:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -51,12 +51,14 @@ export async function getClients(params?: {
   status?: string
   skip?: number
   limit?: number
+  fields?: string
 }) {
   const queryParams = new URLSearchParams()
   if (params?.search) queryParams.append('search', params.search)
   if (params?.status) queryParams.append('status', params.status)
   if (params?.skip) queryParams.append('skip', params.skip.toString())
   if (params?.limit) queryParams.append('limit', params.limit.toString())
+  if (params?.fields) queryParams.append('fields', params.fields)
 
   const query = queryParams.toString()
   return fetchAPI(`/api/clients${query ? `?${query}` : ''}`)
@@ -105,11 +107,13 @@ export async function getProjects(params?: {
   status?: string
   skip?: number
   limit?: number
+  fields?: string
 }) {
   const queryParams = new URLSearchParams()
   if (params?.status) queryParams.append('status', params.status)
   if (params?.skip) queryParams.append('skip', params.skip.toString())
   if (params?.limit) queryParams.append('limit', params.limit.toString())
+  if (params?.fields) queryParams.append('fields', params.fields)
 
   const query = queryParams.toString()
   return fetchAPI(`/api/projects${query ? `?${query}` : ''}`)
@@ -145,6 +149,7 @@ export async function getTasks(params?: {
   assignee?: string
   skip?: number
   limit?: number
+  fields?: string
 }) {
   const queryParams = new URLSearchParams()
   if (params?.status) queryParams.append('status', params.status)
@@ -152,6 +157,7 @@ export async function getTasks(params?: {
   if (params?.assignee) queryParams.append('assignee', params.assignee)
   if (params?.skip) queryParams.append('skip', params.skip.toString())
   if (params?.limit) queryParams.append('limit', params.limit.toString())
+  if (params?.fields) queryParams.append('fields', params.fields)
 
   const query = queryParams.toString()
   return fetchAPI(`/api/tasks${query ? `?${query}` : ''}`)
@@ -185,10 +191,12 @@ export async function deleteTask(id: string) {
 export async function getProposals(params?: {
   skip?: number
   limit?: number
+  fields?: string
 }) {
   const queryParams = new URLSearchParams()
   if (params?.skip) queryParams.append('skip', params.skip.toString())
   if (params?.limit) queryParams.append('limit', params.limit.toString())
+  if (params?.fields) queryParams.append('fields', params.fields)
 
   const query = queryParams.toString()
   return fetchAPI(`/api/proposals${query ? `?${query}` : ''}`)
@@ -217,3 +225,73 @@ export async function deleteProposal(id: string) {
     method: 'DELETE',
   })
 }
+
+export async function createProposalItem(id: string, data: any) {
+  return fetchAPI(`/api/proposals/${id}/items`, {
+    method: 'POST',
+    body: JSON.stringify(data),
+  })
+}
+
+export async function updateProposalItem(id: string, itemId: string, data: any) {
+  return fetchAPI(`/api/proposals/${id}/items/${itemId}`, {
+    method: 'PATCH',
+    body: JSON.stringify(data),
+  })
+}
+
+export async function deleteProposalItem(id: string, itemId: string) {
+  return fetchAPI(`/api/proposals/${id}/items/${itemId}`, {
+    method: 'DELETE',
+  })
+}
+
+// Dashboard API
+export async function getDashboardSummary() {
+  return fetchAPI('/api/dashboard/summary')
+}
+
+// Reports API
+export async function getRevenueReport(params?: {
+  from?: string
+  to?: string
+  group_by?: string[]
+  status?: string
+  client_id?: number
+  project_id?: number
+}) {
+  const queryParams = new URLSearchParams()
+  if (params?.from) queryParams.append('from', params.from)
+  if (params?.to) queryParams.append('to', params.to)
+  params?.group_by?.forEach((group) => queryParams.append('group_by', group))
+  if (params?.status) queryParams.append('status', params.status)
+  if (params?.client_id) queryParams.append('client_id', params.client_id.toString())
+  if (params?.project_id) queryParams.append('project_id', params.project_id.toString())
+
+  const query = queryParams.toString()
+  return fetchAPI(`/api/reports/revenue${query ? `?${query}` : ''}`)
+}
+
+// Calendar API
+export async function getCalendar(from: string, to: string, params?: {
+  assignee?: string
+}) {
+  const queryParams = new URLSearchParams({ from, to })
+  if (params?.assignee) queryParams.append('assignee', params.assignee)
+
+  return fetchAPI(`/api/calendar?${queryParams.toString()}`)
+}
+
+// Search API
+export async function search(q: string, params?: {
+  kind?: string[]
+  skip?: number
+  limit?: number
+}) {
+  const queryParams = new URLSearchParams({ q })
+  params?.kind?.forEach((kind) => queryParams.append('kind', kind))
+  if (params?.skip) queryParams.append('skip', params.skip.toString())
+  if (params?.limit) queryParams.append('limit', params.limit.toString())
+
+  return fetchAPI(`/api/search?${queryParams.toString()}`)
+}